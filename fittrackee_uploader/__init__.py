@@ -1,9 +1,35 @@
 """Initialise package."""
 
-from .uploader import Uploader
+# pylint: disable=import-outside-toplevel
+
+
+def __getattr__(name: str):
+    """
+    Import the GUI on first use, so headless commands never load PyQt6.
+
+    Parameters
+    ----------
+    name : str
+        Name of the attribute.
+
+    Returns
+    -------
+    type
+        The ``Uploader`` class.
+    """
+    if name == "Uploader":
+        from .uploader import Uploader
+
+        return Uploader
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def main():
-    ul = Uploader()
+    """Run the command line interface, which starts the GUI without a command."""
+    from .cli import main as cli_main
+
+    return cli_main()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,141 @@
+"""Cache of the profile, sports and equipment of the user."""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+from .fittrackee import FitTrackee
+
+#: API paths of the cached resources.
+RESOURCES = {"profile": "api/auth/profile", "sports": "api/sports", "equipment": "api/equipments"}
+
+#: Age in seconds after which a cached resource is not shown any more until it is fetched again.
+MAX_AGE = 30 * 86400
+
+
+class ApiCache:
+    """
+    Resources of the API stored on disk, so the window can show them before the server answers.
+
+    Every resource keeps the ETag and the time of its last answer. Refreshing one sends the ETag back, so a server
+    supporting it answers ``304 Not Modified`` without the data.
+
+    Parameters
+    ----------
+    path : str | Path
+        JSON file holding the cache.
+    max_age : float
+        Age in seconds after which a cached resource is not used any more.
+    """
+
+    def __init__(self, path: str | Path, max_age: float = MAX_AGE) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        path : str | Path
+            JSON file holding the cache.
+        max_age : float
+            Age in seconds after which a cached resource is not used any more.
+        """
+        self.path = Path(path)
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.content = {"server": "", "resources": {}}
+        if self.path.is_file():
+            try:
+                with self.path.open(encoding="utf-8") as cache_file:
+                    self.content = json.load(cache_file)
+            except (OSError, ValueError):
+                pass
+
+    def _entry(self, server: str, name: str) -> dict | None:
+        """
+        Get the cached answer of a resource.
+
+        Parameters
+        ----------
+        server : str
+            URL of the server.
+        name : str
+            Name of the resource in ``RESOURCES``.
+
+        Returns
+        -------
+        dict | None
+            Data, ETag and time of the answer, None if it is not cached for this server.
+        """
+        if self.content["server"] != server:
+            return None
+        return self.content["resources"].get(name)
+
+    def get(self, server: str, name: str) -> dict | None:
+        """
+        Get a cached resource.
+
+        Parameters
+        ----------
+        server : str
+            URL of the server.
+        name : str
+            Name of the resource in ``RESOURCES``.
+
+        Returns
+        -------
+        dict | None
+            Data of the resource, None if it is not cached or too old.
+        """
+        with self.lock:
+            entry = self._entry(server, name)
+            if entry is None or time.time() - entry["fetched"] > self.max_age:
+                return None
+            return entry["data"]
+
+    def refresh(self, api: FitTrackee, name: str) -> tuple[int, bool]:
+        """
+        Fetch a resource again, sending the cached ETag.
+
+        Parameters
+        ----------
+        api : FitTrackee
+            API with the URL and token set.
+        name : str
+            Name of the resource in ``RESOURCES``.
+
+        Returns
+        -------
+        tuple[int, bool]
+            Status of the answer and whether the data changed.
+        """
+        with self.lock:
+            entry = self._entry(api.url, name)
+        status, data, etag = api.get_json(RESOURCES[name], None if entry is None else entry["etag"])
+        if status not in (200, 304) or (status == 304 and entry is None):
+            return status, False
+        with self.lock:
+            if self.content["server"] != api.url:
+                self.content = {"server": api.url, "resources": {}}
+            changed = status == 200 and (entry is None or entry["data"] != data)
+            if status == 304:
+                data = entry["data"]
+            self.content["resources"][name] = {"data": data, "etag": etag, "fetched": time.time()}
+            self.save()
+        return status, changed
+
+    def clear(self) -> None:
+        """Forget all resources, when the user logs out."""
+        with self.lock:
+            self.content = {"server": "", "resources": {}}
+            self.save()
+
+    def save(self) -> None:
+        """Write the cache."""
+        with self.lock:
+            try:
+                temp_path = self.path.with_suffix(".tmp")
+                temp_path.write_text(json.dumps(self.content), encoding="utf-8")
+                temp_path.replace(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,39 @@
+"""Move uploaded workout files out of the upload folder."""
+
+import os
+
+from .configuration import Configuration
+
+
+def archive_file(config: Configuration, path: str, sport_name: str = "", title: str = "") -> str | None:
+    """
+    Move an uploaded file to the uploaded folder if the configuration asks for it.
+
+    Parameters
+    ----------
+    config : Configuration
+        Configuration with the move after upload options.
+    path : str
+        Path to the uploaded file.
+    sport_name : str
+        Label of the sport of the workout, added to the file name if enabled.
+    title : str
+        Title of the workout, added to the file name if enabled.
+
+    Returns
+    -------
+    str | None
+        New path of the file or None if it was not moved.
+    """
+    if not config.move_after_upload or not os.path.isdir(config.uploaded_folder):
+        return None
+    file_name = os.path.basename(path)
+    if config.add_info_to_file_name:
+        sport_name = sport_name.split("(")[0]
+        sport_name = sport_name.lower().replace(" ", "")
+        new_file_name = f"{os.path.splitext(file_name)[0]}_{sport_name}_{title}{os.path.splitext(file_name)[1]}"
+    else:
+        new_file_name = file_name
+    new_file_path = os.path.join(config.uploaded_folder, new_file_name)
+    os.rename(path, new_file_path)
+    return new_file_path
@@ -0,0 +1,540 @@
+"""Upload a folder of workouts without the GUI."""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .archive import archive_file
+from .configuration import Configuration
+from .fittrackee import FitTrackee
+from .remoteindex import RemoteIndex
+from .workout.cache import WorkoutCache
+from .workout.loader import Loader
+from .workout.reduce import ReductionReport, reduce_gpx
+from .workout.scanner import FolderScanner
+from .zipbatch import Chunk, ZipPacker, upload_chunk
+
+# pylint: disable=too-many-arguments,too-few-public-methods
+
+
+def upload_workout(
+    api: FitTrackee, workout, sport_id: int, equipment_id: str, title: str, notes: str, gpx: bytes | None = None
+) -> bool:
+    """
+    Upload a workout, with its GPX track if it has GPS records.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API.
+    workout : Workout
+        Workout to upload.
+    sport_id : int
+        Sport ID.
+    equipment_id : str
+        Equipment ID.
+    title : str
+        Title for workout.
+    notes : str
+        Notes to accompany the workout.
+    gpx : bytes | None
+        GPX payload prepared in advance, read from the workout if None.
+
+    Returns
+    -------
+    bool
+        Boolean indicating whether adding workout was successful or not.
+    """
+    if len(workout.points) == 0:
+        date = workout.getDate().strftime("%Y-%m-%d %H:%M")
+        duration = workout.getTime().total_seconds()
+        distance = workout.getDistance()
+        return api.add_workout_no_gpx(date, duration, distance, sport_id, title, notes, workout.ascent, workout.descent)
+    if gpx is not None:
+        return api.add_workout(gpx, sport_id, equipment_id, title, notes)
+    with workout.openGPX() as gpx:
+        return api.add_workout(gpx, sport_id, equipment_id, title, notes)
+
+
+def find_item(items: list | None, label: str, key: str = "label") -> dict | None:
+    """
+    Find a sport or an item of equipment by its label.
+
+    Parameters
+    ----------
+    items : list | None
+        Sports or equipment as returned by the API.
+    label : str
+        Label to look for, compared without case.
+    key : str
+        Key of the label in the items.
+
+    Returns
+    -------
+    dict | None
+        Matching item or None.
+    """
+    for item in items or []:
+        if item[key].lower() == label.lower():
+            return item
+    return None
+
+
+def skip_duplicates(loader: Loader, index: RemoteIndex, files: list[str]) -> tuple[list[str], int]:
+    """
+    Leave out the files already uploaded, reading only their summary.
+
+    Workouts not found from their summary are checked again once parsed, so this only spares parsing the files
+    recognised here.
+
+    Parameters
+    ----------
+    loader : Loader
+        Loader for the workout files.
+    index : RemoteIndex
+        Index of the workouts on the server.
+    files : list[str]
+        Paths of the workout files.
+
+    Returns
+    -------
+    tuple[list[str], int]
+        Paths of the files left to upload and number of files left out.
+    """
+    remaining = []
+    for path in files:
+        try:
+            workout = loader.loadFile(path, lazy=True)
+            duplicate = None if workout is None else index.findDuplicate(workout, decode=False)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Reported when the file is parsed
+            duplicate = None
+        if duplicate is None:
+            remaining.append(path)
+        else:
+            print(f"Already uploaded as {duplicate}: {path}")
+    return remaining, len(files) - len(remaining)
+
+
+class BatchSetup:
+    """
+    Server, sport and equipment the batch uploads with.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API.
+    sport : dict
+        Sport of the workouts.
+    equipment_id : str
+        Equipment ID, empty for none.
+    """
+
+    def __init__(self, api: FitTrackee, sport: dict, equipment_id: str) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        api : FitTrackee
+            Logged in API.
+        sport : dict
+            Sport of the workouts.
+        equipment_id : str
+            Equipment ID, empty for none.
+        """
+        self.api = api
+        self.sport = sport
+        self.equipment_id = equipment_id
+
+
+def setup_batch(args: argparse.Namespace, config: Configuration) -> BatchSetup | None:
+    """
+    Log in and look up the sport and equipment given on the command line.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+    config : Configuration
+        Configuration with the server and token.
+
+    Returns
+    -------
+    BatchSetup | None
+        Server, sport and equipment, None if not logged in or the sport or equipment is unknown.
+    """
+    api = FitTrackee(pool_size=args.uploads)
+    api.setUrl(config.server_url)
+    api.setToken(config.token)
+    if config.token == "" or not api.getUserInfo():
+        print("Not logged in, log in once with the GUI to store a token.")
+        return None
+    sport = find_item(api.get_sports(True), args.sport)
+    if sport is None:
+        print(f"Unknown sport: '{args.sport}'")
+        return None
+    equipment_id = ""
+    if args.equipment is not None:
+        equipment = find_item(api.get_equipment(True), args.equipment)
+        if equipment is None:
+            print(f"Unknown equipment: '{args.equipment}'")
+            return None
+        equipment_id = equipment["id"]
+    return BatchSetup(api, sport, equipment_id)
+
+
+class BatchReport:
+    """
+    Outcome of the uploads, reported from the upload threads.
+
+    Attributes
+    ----------
+    counts : dict[str, int]
+        Number of files uploaded, failed, skipped and already uploaded.
+    total_bytes : int
+        Size of the files uploaded.
+    payload : ReductionReport
+        Size of the payloads before and after the reduction of their points.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the class."""
+        self.counts = {"uploaded": 0, "failed": 0, "skipped": 0, "duplicates": 0}
+        self.total_bytes = 0
+        self.payload = ReductionReport()
+        self.lock = threading.Lock()
+
+    def add(self, path: str, ok: bool, size: int = 0, error: Exception | str | None = None) -> None:
+        """
+        Report the upload of a file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        ok : bool
+            Whether the workout was uploaded.
+        size : int
+            Size of the file.
+        error : Exception | str | None
+            Reason of the failure.
+        """
+        with self.lock:
+            if ok:
+                self.counts["uploaded"] += 1
+                self.total_bytes += size
+                print(f"Uploaded: {path}")
+            else:
+                self.counts["failed"] += 1
+                print(f"Failed: {path}" if error is None else f"Failed: {path}: {error}")
+
+    def count(self, name: str, number: int = 1) -> None:
+        """
+        Count files not uploaded.
+
+        Parameters
+        ----------
+        name : str
+            ``failed``, ``skipped`` or ``duplicates``.
+        number : int
+            Number of files.
+        """
+        with self.lock:
+            self.counts[name] += number
+
+    def addReduction(self, reduced: ReductionReport) -> None:
+        """
+        Add the reduction of a payload.
+
+        Parameters
+        ----------
+        reduced : ReductionReport
+            Size of the payload before and after the reduction.
+        """
+        with self.lock:
+            self.payload += reduced
+
+    def summary(self, files: int, elapsed: float, reduced: bool) -> None:
+        """
+        Print the totals and the throughput.
+
+        Parameters
+        ----------
+        files : int
+            Number of files found.
+        elapsed : float
+            Duration of the batch in seconds.
+        reduced : bool
+            Whether the points of the payloads were reduced.
+        """
+        counts = self.counts
+        print(
+            f"{files} files in {elapsed:.1f} s: {counts['uploaded']} uploaded, {counts['failed']} failed, "
+            f"{counts['skipped']} skipped, {counts['duplicates']} already uploaded"
+        )
+        if reduced:
+            print(f"Payload reduced: {self.payload}")
+        if elapsed > 0:
+            print(
+                f"Throughput: {counts['uploaded'] / elapsed:.2f} workouts/s, "
+                f"{self.total_bytes / 1024**2 / elapsed:.2f} MiB/s"
+            )
+
+
+class BatchUploader:
+    """
+    Upload the parsed workouts, one by one or as archives, run in worker threads.
+
+    Every upload holds a slot, taken by the caller before submitting it and released once the request is done, so
+    few parsed workouts wait for an upload.
+
+    Parameters
+    ----------
+    setup : BatchSetup
+        Server, sport and equipment.
+    config : Configuration
+        Configuration with the upload options.
+    title : str
+        Title of the workouts.
+    report : BatchReport
+        Outcome of the uploads.
+    slots : int
+        Number of uploads submitted at most.
+    """
+
+    def __init__(self, setup: BatchSetup, config: Configuration, title: str, report: BatchReport, slots: int) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        setup : BatchSetup
+            Server, sport and equipment.
+        config : Configuration
+            Configuration with the upload options.
+        title : str
+            Title of the workouts.
+        report : BatchReport
+            Outcome of the uploads.
+        slots : int
+            Number of uploads submitted at most.
+        """
+        self.setup = setup
+        self.config = config
+        self.title = title
+        self.report = report
+        self.reduction = config.reduction
+        self.slots = threading.BoundedSemaphore(slots)
+
+    def reduce(self, workout) -> bytes | None:
+        """
+        Write the payload of a workout with its points reduced, if the configuration asks for it.
+
+        Parameters
+        ----------
+        workout : Workout
+            Workout to upload.
+
+        Returns
+        -------
+        bytes | None
+            GPX payload, None to upload the workout as it is.
+        """
+        if self.reduction is None or len(workout.points) == 0:
+            return None
+        gpx, reduced = reduce_gpx(workout, self.reduction)
+        self.report.addReduction(reduced)
+        return gpx
+
+    def acquire(self) -> None:
+        """Take a slot for an upload, waiting for one to be released."""
+        self.slots.acquire()  # pylint: disable=consider-using-with
+
+    def upload(self, path: str, workout) -> None:
+        """
+        Upload a single workout and move its file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        workout : Workout
+            Parsed workout.
+        """
+        sport = self.setup.sport
+        error = None
+        size = 0
+        try:
+            size = os.path.getsize(path)
+            notes = workout.getStats() if self.config.add_stats else ""
+            ok = upload_workout(
+                self.setup.api, workout, sport["id"], self.setup.equipment_id, self.title, notes, self.reduce(workout)
+            )
+            if ok:
+                archive_file(self.config, path, sport["label"], self.title)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            ok = False
+            error = e
+        finally:
+            self.slots.release()
+        self.report.add(path, ok, size, error)
+
+    def uploadArchive(self, chunk: Chunk, notes: dict[str, str]) -> None:
+        """
+        Upload an archive, set the title and notes of its workouts and move their files.
+
+        FitTrackee takes a single title and notes for the whole archive, so notes of their own, like the statistics of
+        every workout, are set afterwards with one request per workout, together with the title if the server ignored
+        it.
+
+        Parameters
+        ----------
+        chunk : Chunk
+            Archive to upload.
+        notes : dict[str, str]
+            Notes of the workout of every file in the archive.
+        """
+        api = self.setup.api
+        sport = self.setup.sport
+        try:
+            results = upload_chunk(api, chunk, sport["id"], self.setup.equipment_id, self.title)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            results = dict.fromkeys(chunk.paths, e)
+        finally:
+            self.slots.release()
+        for path, workout_id in results.items():
+            if not isinstance(workout_id, str):
+                self.report.add(path, False, error=workout_id or "Not created from the archive")
+                continue
+            try:
+                size = os.path.getsize(path)
+                # The title was sent with the archive, servers ignoring it get it here
+                title = "" if api.title_in_data else self.title
+                fields = {key: value for key, value in (("title", title), ("notes", notes.get(path, ""))) if value}
+                if fields and not api.update_workout(workout_id, fields):
+                    self.report.add(path, False, error=f"Uploaded as {workout_id} but title and notes not set")
+                    continue
+                archive_file(self.config, path, sport["label"], self.title)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.report.add(path, False, error=e)
+                continue
+            self.report.add(path, True, size)
+
+
+def batch_loop(
+    loader: Loader,
+    files: list[str],
+    uploader: BatchUploader,
+    packer: ZipPacker | None,
+    index: RemoteIndex | None,
+    args: argparse.Namespace,
+) -> None:
+    """
+    Parse the files in worker processes and hand them to the upload threads as they are parsed.
+
+    Parameters
+    ----------
+    loader : Loader
+        Loader for the workout files.
+    files : list[str]
+        Paths of the workout files left to upload.
+    uploader : BatchUploader
+        Uploader of the workouts.
+    packer : ZipPacker | None
+        Packer of the archives, None to upload the workouts one by one.
+    index : RemoteIndex | None
+        Index of the workouts on the server, None to upload duplicates.
+    args : argparse.Namespace
+        Parsed arguments, with the number of workers and uploads.
+    """
+    # Notes of the workouts packed in the archive being filled, handed over with it
+    notes = {}
+    with ThreadPoolExecutor(max_workers=args.uploads, thread_name_prefix="upload") as executor:
+
+        def submit_archive(chunk: Chunk) -> None:
+            uploader.acquire()
+            executor.submit(uploader.uploadArchive, chunk, {path: notes.pop(path, "") for path in chunk.paths})
+
+        for path, workout, error in loader.loadFiles(files, args.workers):
+            if error is not None or workout is None:
+                uploader.report.count("failed" if error is not None else "skipped")
+                if error is not None:
+                    print(f"Failed to load: {path}: {error}")
+                continue
+            duplicate = None if index is None else index.findDuplicate(workout)
+            if duplicate is not None:
+                uploader.report.count("duplicates")
+                print(f"Already uploaded as {duplicate}: {path}")
+                continue
+            if packer is None or len(workout.points) == 0:
+                uploader.acquire()
+                executor.submit(uploader.upload, path, workout)
+                continue
+            try:
+                chunk = packer.add(path, workout, uploader.reduce(workout))
+            except ValueError as e:
+                uploader.report.add(path, False, error=e)
+                continue
+            notes[path] = workout.getStats() if uploader.config.add_stats else ""
+            if chunk is not None:
+                submit_archive(chunk)
+        chunk = packer.flush() if packer is not None else None
+        if chunk is not None:
+            submit_archive(chunk)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Parse all workouts of a folder in parallel and upload them.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status, 0 if every workout was uploaded.
+    """
+    config = Configuration()
+    folder = args.folder or config.folder
+    if not os.path.isdir(folder):
+        print(f"Folder not found: '{folder}'")
+        return 2
+    setup = setup_batch(args, config)
+    if setup is None:
+        return 2
+
+    index = None
+    if not args.allow_duplicates:
+        index = RemoteIndex(config.workout_index_path)
+        try:
+            index.sync(setup.api)
+        except requests.RequestException as e:
+            print(f"Workout index not updated, duplicates may be missed: {e}")
+
+    files = FolderScanner(Loader.filetypes, config.scan_subfolders).scan(folder).added
+    report = BatchReport()
+    # Bounds the parsed workouts waiting for an upload slot
+    uploader = BatchUploader(setup, config, args.title, report, 2 * args.uploads)
+    packer = ZipPacker(setup.api.get_config() or {}) if args.zip else None
+
+    start = time.perf_counter()
+    loader = Loader(WorkoutCache(config.cache_folder, config.cache_size * 1024**2))
+    pending = files
+    if index is not None:
+        pending, duplicates = skip_duplicates(loader, index, files)
+        report.count("duplicates", duplicates)
+    batch_loop(loader, pending, uploader, packer, index, args)
+    elapsed = time.perf_counter() - start
+    if index is not None:
+        index.close()
+
+    report.summary(len(files), elapsed, uploader.reduction is not None)
+    return 0 if report.counts["failed"] == 0 else 1
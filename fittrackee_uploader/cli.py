@@ -0,0 +1,249 @@
+"""Command line interface."""
+
+import argparse
+
+from .configuration import Configuration
+from .startup import StartupTrace
+
+# Commands import what they need when they run, so starting the GUI does not load them
+# pylint: disable=import-outside-toplevel
+
+#: Most tiles downloaded by a single ``seed-tiles`` run, bulk downloads are against the OpenStreetMap tile policy.
+MAX_SEED_TILES = 2000
+
+
+def cache_stats(args: argparse.Namespace) -> None:
+    """
+    Print statistics of the workout cache.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+    """
+    from .workout.cache import WorkoutCache
+
+    config = Configuration()
+    cache = WorkoutCache(config.cache_folder, config.cache_size * 1024**2)
+    if args.clear:
+        cache.clear()
+    stats = cache.getStats()
+    print(f"Folder:   {stats['folder']}")
+    print(f"Entries:  {stats['entries']}")
+    print(f"Size:     {stats['size'] / 1024**2:.1f} MiB of {stats['max_size'] / 1024**2:.0f} MiB")
+    print(f"Hits:     {stats['hits']}")
+    print(f"Misses:   {stats['misses']}")
+    print(f"Hit rate: {stats['hit_rate']:.1%}")
+
+
+def seed_tiles(args: argparse.Namespace) -> int:
+    """
+    Download the map tiles of an area ahead of time, to see it on the map offline.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status.
+    """
+    from .tilecache import MAX_ZOOM, TileCache
+
+    config = Configuration()
+    tiles = TileCache(config.tile_cache_folder, config.tile_cache_size * 1024**2, config.tile_ttl * 86400)
+    bbox = (args.min_lat, args.min_lon, args.max_lat, args.max_lon)
+    min_zoom, max_zoom = args.zoom
+    if not 0 <= min_zoom <= max_zoom <= MAX_ZOOM:
+        print(f"Zoom levels must be between 0 and {MAX_ZOOM}")
+        return 2
+    zooms = range(min_zoom, max_zoom + 1)
+    count = tiles.countTiles(bbox, zooms)
+    if count > args.max_tiles:
+        print(f"The area has {count} tiles, more than --max-tiles {args.max_tiles}, choose a smaller area or zoom")
+        return 2
+
+    def progress(done: int, total: int) -> None:
+        print(f"\r{done}/{total} tiles", end="", flush=True)
+
+    fetched = tiles.seed(bbox, zooms, progress=progress)
+    print()
+    stats = tiles.getStats()
+    print(f"Downloaded: {fetched} of {count} tiles")
+    print(
+        f"Cached:     {stats['tiles']} tiles, {stats['size'] / 1024**2:.1f} MiB of {stats['max_size'] / 1024**2:.0f} MiB"
+    )
+    return 0
+
+
+def outbox_status(args: argparse.Namespace) -> int:
+    """
+    List the uploads left in the outbox, and run them with ``--flush``.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status, 1 if an upload is still pending.
+    """
+    from .fittrackee import FitTrackee
+    from .outbox import FAILED, Outbox
+
+    config = Configuration()
+    outbox = Outbox(config.outbox_folder)
+    outbox.purge()
+    if args.flush:
+        api = FitTrackee()
+        api.setUrl(config.server_url)
+        api.setToken(config.token)
+        if config.token == "" or not api.getUserInfo():
+            print("Not logged in, log in once with the GUI to store a token.")
+            return 2
+        for entry in outbox.getPending():
+            try:
+                outbox.process(entry["id"], api, config)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Recorded in the outbox and listed below
+                pass
+    pending = outbox.getPending()
+    for entry in pending:
+        error = f" - {entry['error']}" if entry["state"] == FAILED else ""
+        print(f"{entry['id']:>5} {entry['state']:<8} {entry['step']:<8} {entry['path']}{error}")
+    print(f"{len(pending)} uploads pending")
+    return 1 if pending else 0
+
+
+def batch_upload(args: argparse.Namespace) -> int:
+    """
+    Upload all workouts of a folder without the GUI.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status.
+    """
+    from .batch import run_batch
+
+    return run_batch(args)
+
+
+def watch_folder(args: argparse.Namespace) -> int:
+    """
+    Upload the workouts arriving in a folder without the GUI.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status.
+    """
+    from .watch import run_watch
+
+    return run_watch(args)
+
+
+def main(argv: list[str] | None = None) -> int | None:
+    """
+    Run the command given on the command line, or the GUI if there is none.
+
+    Parameters
+    ----------
+    argv : list[str] | None
+        Command line arguments, defaults to ``sys.argv``.
+
+    Returns
+    -------
+    int | None
+        Exit status of the command.
+    """
+    parser = argparse.ArgumentParser(prog="fittrackee-uploader", description="Upload workout files to FitTrackee.")
+    parser.add_argument(
+        "--startup-trace", action="store_true", help="Print the time taken by every import and step of the GUI start."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    parser_cache = subparsers.add_parser("cache-stats", help="Show statistics of the workout cache.")
+    parser_cache.add_argument("--clear", action="store_true", help="Remove all cached workouts first.")
+    parser_cache.set_defaults(func=cache_stats)
+    parser_tiles = subparsers.add_parser("seed-tiles", help="Download the map tiles of an area for offline use.")
+    parser_tiles.add_argument("min_lat", type=float, help="Southern latitude.")
+    parser_tiles.add_argument("min_lon", type=float, help="Western longitude.")
+    parser_tiles.add_argument("max_lat", type=float, help="Northern latitude.")
+    parser_tiles.add_argument("max_lon", type=float, help="Eastern longitude.")
+    parser_tiles.add_argument(
+        "--zoom", type=int, nargs=2, default=(10, 15), metavar=("MIN", "MAX"), help="Zoom levels, default 10 to 15."
+    )
+    parser_tiles.add_argument(
+        "--max-tiles", type=int, default=MAX_SEED_TILES, help=f"Refuse larger areas, default {MAX_SEED_TILES}."
+    )
+    parser_tiles.set_defaults(func=seed_tiles)
+    parser_outbox = subparsers.add_parser("outbox", help="List the uploads not finished yet.")
+    parser_outbox.add_argument("--flush", action="store_true", help="Run the pending uploads first.")
+    parser_outbox.set_defaults(func=outbox_status)
+    parser_batch = subparsers.add_parser("batch", help="Upload all workouts of a folder without the GUI.")
+    parser_batch.add_argument("folder", nargs="?", help="Folder with the workouts, defaults to the configured one.")
+    parser_batch.add_argument("--sport", required=True, help="Sport of the workouts, as labelled in FitTrackee.")
+    parser_batch.add_argument("--equipment", help="Equipment used for the workouts.")
+    parser_batch.add_argument("--title", default="", help="Title of the workouts.")
+    parser_batch.add_argument("--workers", type=int, help="Processes parsing the files, defaults to one per CPU.")
+    parser_batch.add_argument("--uploads", type=int, default=4, help="Concurrent uploads.")
+    parser_batch.add_argument(
+        "--zip",
+        action="store_true",
+        help=(
+            "Send the workouts in zip archives, as many per request as the server allows. The statistics added to "
+            "the notes take one more request per workout, unless add_stats is off."
+        ),
+    )
+    parser_batch.add_argument(
+        "--allow-duplicates",
+        action="store_true",
+        help="Upload workouts matching one already on the server by start time, duration and distance.",
+    )
+    parser_batch.set_defaults(func=batch_upload)
+    parser_watch = subparsers.add_parser("watch", help="Upload the workouts arriving in a folder until stopped.")
+    parser_watch.add_argument("folder", nargs="?", help="Folder to watch, defaults to the configured one.")
+    parser_watch.add_argument(
+        "--sport", help="Sport of the workouts whose file does not tell it, as labelled in FitTrackee."
+    )
+    parser_watch.add_argument("--equipment", help="Equipment used for the workouts.")
+    parser_watch.add_argument("--title", default="", help="Title of the workouts.")
+    parser_watch.add_argument("--uploads", type=int, default=2, help="Concurrent uploads.")
+    parser_watch.add_argument(
+        "--settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it is uploaded."
+    )
+    parser_watch.add_argument(
+        "--poll", type=float, help="Scan every POLL seconds instead of using inotify, for network shares."
+    )
+    parser_watch.add_argument(
+        "--new-only", action="store_true", help="Ignore the files already in the folder when the watch starts."
+    )
+    parser_watch.add_argument(
+        "--allow-duplicates",
+        action="store_true",
+        help="Upload workouts matching one already on the server by start time, duration and distance.",
+    )
+    parser_watch.set_defaults(func=watch_folder)
+    args = parser.parse_args(argv)
+    if args.command is None:
+        trace = StartupTrace(args.startup_trace)
+        with trace.phase("import GUI"):
+            from .uploader import Uploader
+
+        Uploader(trace)
+        return None
+    return args.func(args)
@@ -2,9 +2,15 @@
 
 import json
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from config_path import ConfigPath
 
+if TYPE_CHECKING:
+    from .workout.reduce import Reduction
+
+# pylint: disable=import-outside-toplevel
+
 
 class Configuration:
     """Configuration class."""
@@ -19,6 +25,17 @@ class Configuration:
     add_info_to_file_name = False
     add_stats = True
     auto_skip = False
+    cache_size = 256  # MiB
+    prefetch_depth = 2
+    tile_cache_size = 512  # MiB
+    tile_ttl = 30  # days
+    upload_workers = 2
+    scan_subfolders = False
+    reduce_points = False
+    min_point_interval = 5.0  # seconds
+    min_point_distance = 5.0  # metres
+    stop_radius = 10.0  # metres
+    stop_time = 30.0  # seconds
     used_names: set[str] = set()
 
     def __init__(self):
@@ -65,11 +82,131 @@ class Configuration:
                     self.auto_skip = self.config["auto_skip"]
                 except:
                     pass
+                try:
+                    self.cache_size = self.config["cache_size"]
+                except:
+                    pass
+                try:
+                    self.prefetch_depth = self.config["prefetch_depth"]
+                except:
+                    pass
+                try:
+                    self.tile_cache_size = self.config["tile_cache_size"]
+                except:
+                    pass
+                try:
+                    self.tile_ttl = self.config["tile_ttl"]
+                except:
+                    pass
+                try:
+                    self.upload_workers = self.config["upload_workers"]
+                except:
+                    pass
+                try:
+                    self.scan_subfolders = self.config["scan_subfolders"]
+                except:
+                    pass
+                try:
+                    self.reduce_points = self.config["reduce_points"]
+                except:
+                    pass
+                try:
+                    self.min_point_interval = self.config["min_point_interval"]
+                except:
+                    pass
+                try:
+                    self.min_point_distance = self.config["min_point_distance"]
+                except:
+                    pass
+                try:
+                    self.stop_radius = self.config["stop_radius"]
+                except:
+                    pass
+                try:
+                    self.stop_time = self.config["stop_time"]
+                except:
+                    pass
                 try:
                     self.used_names = set(self.config["used_names"])
                 except:
                     pass
 
+    @property
+    def cache_folder(self) -> Path:
+        """
+        Folder of the workout cache, next to the configuration file.
+
+        Returns
+        -------
+        Path
+            Path to the cache folder.
+        """
+        return self.path.parent / "cache"
+
+    @property
+    def tile_cache_folder(self) -> Path:
+        """
+        Folder of the map tile cache, next to the configuration file.
+
+        Returns
+        -------
+        Path
+            Path to the tile cache folder.
+        """
+        return self.path.parent / "tiles"
+
+    @property
+    def outbox_folder(self) -> Path:
+        """
+        Folder of the upload journal and its payloads, next to the configuration file.
+
+        Returns
+        -------
+        Path
+            Path to the outbox folder.
+        """
+        return self.path.parent / "outbox"
+
+    @property
+    def api_cache_path(self) -> Path:
+        """
+        File of the cached profile, sports and equipment, next to the configuration file.
+
+        Returns
+        -------
+        Path
+            Path to the API cache.
+        """
+        return self.path.parent / "api_cache.json"
+
+    @property
+    def workout_index_path(self) -> Path:
+        """
+        Database of the workouts already on the server, next to the configuration file.
+
+        Returns
+        -------
+        Path
+            Path to the workout index.
+        """
+        return self.path.parent / "workouts.sqlite"
+
+    @property
+    def reduction(self) -> "Reduction | None":
+        """
+        Reduction of the points of the tracks before the upload.
+
+        Returns
+        -------
+        Reduction | None
+            Settings of the reduction, None if the whole tracks are uploaded.
+        """
+        if not self.reduce_points:
+            return None
+        from .workout.reduce import Reduction
+
+        return Reduction(self.min_point_interval, self.min_point_distance, self.stop_radius, self.stop_time)
+
     def saveConfig(self):
         """Save configuration."""
         self.config["server_url"] = self.server_url
@@ -81,6 +218,17 @@ class Configuration:
         self.config["add_info_to_file_name"] = self.add_info_to_file_name
         self.config["add_stats"] = self.add_stats
         self.config["auto_skip"] = self.auto_skip
+        self.config["cache_size"] = self.cache_size
+        self.config["prefetch_depth"] = self.prefetch_depth
+        self.config["tile_cache_size"] = self.tile_cache_size
+        self.config["tile_ttl"] = self.tile_ttl
+        self.config["upload_workers"] = self.upload_workers
+        self.config["scan_subfolders"] = self.scan_subfolders
+        self.config["reduce_points"] = self.reduce_points
+        self.config["min_point_interval"] = self.min_point_interval
+        self.config["min_point_distance"] = self.min_point_distance
+        self.config["stop_radius"] = self.stop_radius
+        self.config["stop_time"] = self.stop_time
         self.config["used_names"] = list(self.used_names)
 
         json_conf = json.dumps(self.config, indent=4)
@@ -1,35 +1,95 @@
 """Interact with FitTrackee API."""
 
-from pathlib import Path
+import logging
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from json import dumps
+from typing import BinaryIO
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+#: Seconds to wait for the connection to the server.
+CONNECT_TIMEOUT = 5
+
+#: Seconds to wait for data from the server, long enough for it to process a large workout.
+READ_TIMEOUT = 120
+
+#: Methods retried after a failed or rejected request, POST is only retried when it could not connect.
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"})
+
+#: Statuses of a busy or restarting server, worth retrying.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+#: Characters of the answer of the server kept in the log of a rejected request.
+LOG_BODY_SIZE = 500
+
+logger = logging.getLogger(__name__)
 
 
 class FitTrackee:
     """
     FitTrackee class.
 
+    All requests go through one session, so connections to the server are kept alive and reused between calls and
+    threads.
+
     Parameters
     ----------
-    timeout : int | float
-        Timeout for connection in seconds.
+    timeout : int | float | tuple[float, float]
+        Timeouts in seconds to connect and to read, or one for both.
+    pool_size : int
+        Connections kept open, at least the number of concurrent uploads.
+    retries : int
+        Retries of a failed request.
+    backoff : float
+        Backoff factor in seconds, retries wait ``backoff * 2 ** (retry - 1)``.
     """
 
     url = ""
     token = None
     token_header = None
     user = None
+    title_in_data = None
 
-    def __init__(self, timeout: int | float = 10000):
+    def __init__(
+        self,
+        timeout: int | float | tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
         """
         Initialise the class.
 
         Parameters
         ----------
-        timeout : int | float
-            Timeout for connection in seconds.
+        timeout : int | float | tuple[float, float]
+            Timeouts in seconds to connect and to read, or one for both.
+        pool_size : int
+            Connections kept open, at least the number of concurrent uploads.
+        retries : int
+            Retries of a failed request.
+        backoff : float
+            Backoff factor in seconds, retries wait ``backoff * 2 ** (retry - 1)``.
         """
         self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """Close the connections to the server."""
+        self.session.close()
 
     def setUrl(self, url: str) -> None:
         """
@@ -56,6 +116,7 @@ class FitTrackee:
         """
         self.token = token
         self.token_header = {"Authorization": f"Bearer {self.token}"}
+        self.session.headers.update(self.token_header)
 
     def login(self, url: str, email: str, password: str) -> bool:
         """
@@ -79,7 +140,7 @@ class FitTrackee:
         self.setUrl(url)
         url = self.url + "api/auth/login"
         json = {"email": email, "password": password}
-        resp = requests.post(url, json=json, timeout=self.timeout)
+        resp = self.session.post(url, json=json, timeout=self.timeout)
         if resp.status_code == 200:
             json = resp.json()
             self.token = json["auth_token"]
@@ -88,6 +149,43 @@ class FitTrackee:
             return self.getUserInfo()
         return False
 
+    def get_config(self) -> dict | None:
+        """
+        Get the configuration of the server, with the limits of the uploads.
+
+        Returns
+        -------
+        dict | None
+            Configuration or None.
+        """
+        url = self.url + "api/config"
+        resp = self.session.get(url, timeout=self.timeout)
+        if resp.status_code == 200:
+            return resp.json()["data"]
+        return None
+
+    def get_json(self, path: str, etag: str | None = None) -> tuple[int, dict | None, str | None]:
+        """
+        Get a resource of the API, only if it changed since it was last fetched.
+
+        Parameters
+        ----------
+        path : str
+            Path of the resource, relative to the server URL.
+        etag : str | None
+            ETag of the copy held by the caller, sent in ``If-None-Match``.
+
+        Returns
+        -------
+        tuple[int, dict | None, str | None]
+            Status of the answer, its data if it is 200 and the ETag of the resource.
+        """
+        headers = {} if etag is None else {"If-None-Match": etag}
+        resp = self.session.get(self.url + path, headers=headers, timeout=self.timeout)
+        if resp.status_code == 200:
+            return 200, resp.json()["data"], resp.headers.get("ETag")
+        return resp.status_code, None, resp.headers.get("ETag", etag)
+
     def getUserInfo(self) -> bool:
         """
         Get user information.
@@ -98,23 +196,183 @@ class FitTrackee:
             Boolean indicating whether login was successful.
         """
         url = self.url + "api/auth/profile"
-        resp = requests.get(url, headers=self.token_header, timeout=self.timeout)
+        resp = self.session.get(url, timeout=self.timeout)
         if resp.status_code == 200:
             json = resp.json()
             self.user = json["data"]["username"]
             return True
         return False
 
+    def _uploadData(self, sport_id: int, equipment_id: str, notes: str, title: str) -> str:
+        """
+        Build the ``data`` field of a workout upload.
+
+        Parameters
+        ----------
+        sport_id : int
+            Sport ID.
+        equipment_id : str
+            Equipment ID.
+        notes : str
+            Notes to accompany the workout.
+        title : str
+            Title for workout, left out once the server is known to ignore it.
+
+        Returns
+        -------
+        str
+            JSON encoded data.
+        """
+        data = {"sport_id": sport_id, "notes": notes}
+        if equipment_id != "":
+            data["equipment_ids"] = [equipment_id]
+        if title != "" and self.title_in_data is not False:
+            data["title"] = title
+        return dumps(data)
+
+    def _checkTitle(self, workout: dict, title: str) -> None:
+        """
+        Record whether the server took the title from the upload data, the first time one is sent.
+
+        Parameters
+        ----------
+        workout : dict
+            Workout created by the upload.
+        title : str
+            Title sent with the upload.
+        """
+        if title != "" and self.title_in_data is None:
+            self.title_in_data = workout.get("title") == title
+
+    def post_workout(
+        self, gpx: str | bytes | BinaryIO, sport_id: int = 0, equipment_id: str = "", notes: str = "", title: str = ""
+    ) -> dict | None:
+        """
+        Create a workout from a GPX file.
+
+        The title is sent with the file, which the server applies in the same request if it supports it. Whether it
+        does is checked on the first upload with a title, if not the title must be set with ``set_title``.
+
+        Parameters
+        ----------
+        gpx : str | bytes | BinaryIO
+            GPX data for workout, file-like objects are read as they are sent.
+        sport_id : int
+            Sport ID.
+        equipment_id : str
+            Equipment ID.
+        notes : str
+            Notes to accompany the workout.
+        title : str
+            Title for workout.
+
+        Returns
+        -------
+        dict | None
+            New workout, with its ``id`` and ``title``, or None if the server rejected it.
+        """
+        url = self.url + "api/workouts"
+        file = {"file": ("workout.gpx", gpx), "data": (None, self._uploadData(sport_id, equipment_id, notes, title))}
+        resp = self.session.post(url, files=file, timeout=self.timeout)
+        if resp.status_code == 201:
+            workout = resp.json()["data"]["workouts"][0]
+            self._checkTitle(workout, title)
+            return workout
+        print(resp.json())
+        return None
+
+    def set_title(self, workout_id: str, title: str) -> bool:
+        """
+        Rename a workout, setting the same title again has no further effect.
+
+        Parameters
+        ----------
+        workout_id : str
+            Workout ID.
+        title : str
+            Title for workout.
+
+        Returns
+        -------
+        bool
+            Boolean indicating whether renaming the workout was successful or not.
+        """
+        return self.update_workout(workout_id, {"title": title})
+
+    def update_workout(self, workout_id: str, data: dict) -> bool:
+        """
+        Change fields of a workout, such as its title or notes.
+
+        Parameters
+        ----------
+        workout_id : str
+            Workout ID.
+        data : dict
+            New values of the fields.
+
+        Returns
+        -------
+        bool
+            Boolean indicating whether changing the workout was successful or not.
+        """
+        url = self.url + "api/workouts/" + workout_id
+        resp = self.session.patch(url, json=data, timeout=self.timeout)
+        return resp.status_code == 200
+
+    def post_archive(
+        self, archive: bytes | BinaryIO, sport_id: int = 0, equipment_id: str = "", notes: str = "", title: str = ""
+    ) -> list[dict] | None:
+        """
+        Create workouts from a zip archive of GPX files in a single request.
+
+        Parameters
+        ----------
+        archive : bytes | BinaryIO
+            Zip archive within the limits given by ``get_config``.
+        sport_id : int
+            Sport ID.
+        equipment_id : str
+            Equipment ID.
+        notes : str
+            Notes to accompany every workout.
+        title : str
+            Title for every workout, see ``post_workout``.
+
+        Returns
+        -------
+        list[dict] | None
+            New workouts, in no particular order, empty if the server accepted the archive without listing them, or
+            None if the server rejected the archive.
+        """
+        url = self.url + "api/workouts"
+        data = self._uploadData(sport_id, equipment_id, notes, title)
+        file = {"file": ("workouts.zip", archive, "application/zip"), "data": (None, data)}
+        resp = self.session.post(url, files=file, timeout=self.timeout)
+        if resp.status_code == 201:
+            workouts = resp.json()["data"]["workouts"]
+            if workouts:
+                self._checkTitle(workouts[0], title)
+            return workouts
+        if resp.ok:
+            # Servers processing archives in the background accept them before creating the workouts
+            try:
+                return (resp.json().get("data") or {}).get("workouts") or []
+            except ValueError:
+                return []
+        # Proxies answer oversized archives with an HTML page, which is logged as it is
+        logger.warning("Archive rejected with status %s: %s", resp.status_code, resp.text[:LOG_BODY_SIZE])
+        return None
+
     def add_workout(
-        self, gpx: str | Path, sport_id: int = 0, equipment_id: str = "", title: str = None, notes: str = ""
+        self, gpx: str | bytes | BinaryIO, sport_id: int = 0, equipment_id: str = "", title: str = None, notes: str = ""
     ) -> bool:
         """
         Add a workout.
 
         Parameters
         ----------
-        gpx : str | Path
-            GPX file for workout.
+        gpx : str | bytes | BinaryIO
+            GPX data for workout, file-like objects are read as they are sent.
         sport_id : int
             Sport ID.
         equipment_id : str
@@ -129,23 +387,82 @@ class FitTrackee:
         bool
             Boolean indicating whether adding workout was successful or not.
         """
+        title = title or ""
+        workout = self.post_workout(gpx, sport_id, equipment_id, notes, title)
+        if workout is None:
+            return False
+        if title != "" and workout.get("title") != title:
+            # Rename Workout to set Title, for servers ignoring it in the upload
+            self.set_title(workout["id"], title)
+        return True
+
+    def find_workout(self, date: datetime, tolerance: float = 60) -> str | None:
+        """
+        Find a workout starting at a given time, to check whether an interrupted upload reached the server.
+
+        Parameters
+        ----------
+        date : datetime
+            Start of the workout, timezone aware.
+        tolerance : float
+            Largest difference in seconds between the start times.
+
+        Returns
+        -------
+        str | None
+            ID of the workout or None if there is none.
+        """
         url = self.url + "api/workouts"
-        data = {"sport_id": sport_id, "notes": notes}
-        if equipment_id != "":
-            data["equipment_ids"] = [equipment_id]
-        file = {"file": ("workout.gpx", gpx), "data": (None, str(data).replace("'", '"'))}
-        resp = requests.post(url, headers=self.token_header, files=file, timeout=self.timeout)
-        if resp.status_code == 201:
-            json = resp.json()
-            workout_id = json["data"]["workouts"][0]["id"]
-            if title is not None and title != "":
-                # Rename Workout to set Title
-                url = self.url + "api/workouts/" + workout_id
-                data = {"title": title}
-                resp = requests.patch(url, headers=self.token_header, json=data, timeout=self.timeout)
-            return True
-        print(resp.json())
-        return False
+        params = {
+            "from": (date - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "to": (date + timedelta(days=1)).strftime("%Y-%m-%d"),
+            "per_page": 100,
+        }
+        resp = self.session.get(url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        for workout in resp.json()["data"]["workouts"]:
+            workout_date = parsedate_to_datetime(workout["workout_date"])
+            if abs((workout_date - date).total_seconds()) <= tolerance:
+                return workout["id"]
+        return None
+
+    def get_workouts(
+        self, page: int = 1, per_page: int = 100, date_from: datetime | None = None, date_to: datetime | None = None
+    ) -> tuple[list[dict], dict]:
+        """
+        Get a page of the workouts of the user, the most recent first.
+
+        Parameters
+        ----------
+        page : int
+            Page number, from 1.
+        per_page : int
+            Workouts per page, the server caps it at 100.
+        date_from : datetime | None
+            Only the workouts from this day on, None for no limit.
+        date_to : datetime | None
+            Only the workouts until this day, included, None for no limit.
+
+        Returns
+        -------
+        tuple[list[dict], dict]
+            Workouts and pagination, with ``has_next`` and ``total``.
+
+        Raises
+        ------
+        requests.HTTPError
+            If the server did not answer the request.
+        """
+        url = self.url + "api/workouts"
+        params = {"page": page, "per_page": per_page, "order": "desc", "order_by": "workout_date"}
+        if date_from is not None:
+            params["from"] = date_from.strftime("%Y-%m-%d")
+        if date_to is not None:
+            params["to"] = date_to.strftime("%Y-%m-%d")
+        resp = self.session.get(url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        json = resp.json()
+        return json["data"]["workouts"], json.get("pagination", {})
 
     def add_workout_no_gpx(  # pylint: disable=too-many-arguments
         self,
@@ -196,7 +513,7 @@ class FitTrackee:
             "notes": notes,
             "title": title,
         }
-        resp = requests.post(url, headers=self.token_header, json=data, timeout=self.timeout)
+        resp = self.session.post(url, json=data, timeout=self.timeout)
         if resp.status_code == 201:
             return True
         print(resp.json())
@@ -217,17 +534,10 @@ class FitTrackee:
             List of sports or None.
         """
         url = self.url + "api/sports"
-        resp = requests.get(url, headers=self.token_header, timeout=self.timeout)
+        resp = self.session.get(url, timeout=self.timeout)
         if resp.status_code == 200:
-            json = resp.json()
-            if only_active:
-                sports = []
-                for sport in json["data"]["sports"]:
-                    if sport["is_active_for_user"]:
-                        sports.append(sport)
-            else:
-                sports = json["data"]["sports"]
-            return sports
+            sports = resp.json()["data"]["sports"]
+            return active_sports(sports) if only_active else sports
         return None
 
     def get_equipment(self, only_active: bool = False) -> list | None:
@@ -245,15 +555,42 @@ class FitTrackee:
             List of equipment or None.
         """
         url = self.url + "api/equipments"
-        resp = requests.get(url, headers=self.token_header, timeout=self.timeout)
+        resp = self.session.get(url, timeout=self.timeout)
         if resp.status_code == 200:
-            json = resp.json()
-            if only_active:
-                equipment = []
-                for item in json["data"]["equipments"]:
-                    if item["is_active"]:
-                        equipment.append(item)
-            else:
-                equipment = json["data"]["equipments"]
-            return equipment
+            equipment = resp.json()["data"]["equipments"]
+            return active_equipment(equipment) if only_active else equipment
         return None
+
+
+def active_sports(sports: list[dict]) -> list[dict]:
+    """
+    Keep the sports the user enabled.
+
+    Parameters
+    ----------
+    sports : list[dict]
+        Sports given by the server.
+
+    Returns
+    -------
+    list[dict]
+        Active sports.
+    """
+    return [sport for sport in sports if sport["is_active_for_user"]]
+
+
+def active_equipment(equipment: list[dict]) -> list[dict]:
+    """
+    Keep the equipment still in use.
+
+    Parameters
+    ----------
+    equipment : list[dict]
+        Equipment given by the server.
+
+    Returns
+    -------
+    list[dict]
+        Active equipment.
+    """
+    return [item for item in equipment if item["is_active"]]
@@ -0,0 +1,231 @@
+"""Persistent map page served from the package."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PyQt6 import QtCore
+from PyQt6.QtWebEngineCore import QWebEngineUrlRequestJob, QWebEngineUrlSchemeHandler
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+
+from .scheme import SCHEME
+from .tilecache import TileCache
+
+#: Folder with the map page and the Leaflet assets.
+WEB_FOLDER = Path(__file__).parent / "web"
+
+#: Content types of the bundled files.
+CONTENT_TYPES = {
+    ".html": b"text/html",
+    ".js": b"application/javascript",
+    ".css": b"text/css",
+    ".png": b"image/png",
+}
+
+
+class PackageSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serve the files of the ``web`` folder of the package from the ``app`` host and map tiles from the ``tiles`` host.
+
+    Fresh cached tiles are served right away, the others are downloaded in worker threads and answered back in the
+    GUI thread.
+
+    Parameters
+    ----------
+    tiles : TileCache
+        Cache of the map tiles.
+    parent : QtCore.QObject | None
+        Parent object.
+    """
+
+    tileReady = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, tiles: TileCache, parent: QtCore.QObject | None = None) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        tiles : TileCache
+            Cache of the map tiles.
+        parent : QtCore.QObject | None
+            Parent object.
+        """
+        super().__init__(parent)
+        self.tiles = tiles
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tiles")
+        self.tileReady.connect(self.replyTile)
+
+    def requestStarted(self, job: QWebEngineUrlRequestJob) -> None:  # pylint: disable=invalid-name
+        """
+        Answer a request.
+
+        Parameters
+        ----------
+        job : QWebEngineUrlRequestJob
+            Request to answer.
+        """
+        if job.requestUrl().host() == "tiles":
+            self.requestTile(job)
+            return
+        path = (WEB_FOLDER / job.requestUrl().path().lstrip("/")).resolve()
+        if WEB_FOLDER.resolve() not in path.parents or not path.is_file():
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        self.reply(job, CONTENT_TYPES.get(path.suffix, b"application/octet-stream"), path.read_bytes())
+
+    @staticmethod
+    def reply(job: QWebEngineUrlRequestJob, content_type: bytes, data: bytes) -> None:
+        """
+        Answer a request with data.
+
+        Parameters
+        ----------
+        job : QWebEngineUrlRequestJob
+            Request to answer.
+        content_type : bytes
+            Content type of the data.
+        data : bytes
+            Data to answer with.
+        """
+        buffer = QtCore.QBuffer(parent=job)
+        buffer.setData(data)
+        buffer.open(QtCore.QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(content_type, buffer)
+
+    def requestTile(self, job: QWebEngineUrlRequestJob) -> None:
+        """
+        Answer a request for a tile, ``/z/x/y.png``.
+
+        Parameters
+        ----------
+        job : QWebEngineUrlRequestJob
+            Request to answer.
+        """
+        try:
+            z, x, y = (int(part) for part in job.requestUrl().path().removesuffix(".png").strip("/").split("/"))
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        data, fresh = self.tiles.lookup(z, x, y)
+        if fresh:
+            self.reply(job, CONTENT_TYPES[".png"], data)
+            return
+        future = self.executor.submit(self.fetchTile, z, x, y, data)
+        # Every request must be answered, even if the worker was cancelled on shutdown
+        future.add_done_callback(
+            lambda future: self.tileReady.emit(
+                job, None if future.cancelled() or future.exception() is not None else future.result()
+            )
+        )
+
+    def fetchTile(self, z: int, x: int, y: int, stale: bytes | None) -> bytes | None:
+        """
+        Download a tile in a worker thread.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+        stale : bytes | None
+            Expired tile from the cache.
+
+        Returns
+        -------
+        bytes | None
+            Tile, the expired one if it cannot be downloaded or stored.
+        """
+        try:
+            return self.tiles.fetch(z, x, y)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Network errors, and disk errors while storing the tile
+            return stale
+
+    def replyTile(self, job: QWebEngineUrlRequestJob, data: bytes | None) -> None:
+        """
+        Answer a request for a tile in the GUI thread.
+
+        Parameters
+        ----------
+        job : QWebEngineUrlRequestJob
+            Request to answer.
+        data : bytes | None
+            Tile or None if it is not available.
+        """
+        try:
+            if data is None:
+                job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+            else:
+                self.reply(job, CONTENT_TYPES[".png"], data)
+        except RuntimeError:
+            # The request was cancelled and its job deleted meanwhile
+            pass
+
+
+class MapPage(QtCore.QObject):
+    """
+    Map page loaded once in a web view, workouts are then shown by running scripts in it.
+
+    Parameters
+    ----------
+    view : QWebEngineView
+        Web view showing the map.
+    tiles : TileCache
+        Cache of the map tiles.
+    """
+
+    def __init__(self, view: QWebEngineView, tiles: TileCache) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        view : QWebEngineView
+            Web view showing the map.
+        tiles : TileCache
+            Cache of the map tiles.
+        """
+        super().__init__(view)
+        self.view = view
+        self.loaded = False
+        self.pending = []
+        self.handler = PackageSchemeHandler(tiles, self)
+        profile = view.page().profile()
+        if profile.urlSchemeHandler(SCHEME) is None:
+            profile.installUrlSchemeHandler(SCHEME, self.handler)
+        view.loadFinished.connect(self.pageLoaded)
+        view.setUrl(QtCore.QUrl(f"{SCHEME.decode()}://app/map.html"))
+
+    def run(self, scripts: list[str]) -> None:
+        """
+        Run scripts in the page one after the other, dropping those not run yet from a previous call.
+
+        Parameters
+        ----------
+        scripts : list[str]
+            Scripts to run.
+        """
+        self.pending = list(scripts)
+        if self.loaded:
+            self.runNext()
+
+    def pageLoaded(self, ok: bool) -> None:
+        """
+        Run the scripts waiting for the page.
+
+        Parameters
+        ----------
+        ok : bool
+            Whether the page loaded successfully.
+        """
+        self.loaded = ok
+        if ok:
+            self.runNext()
+
+    def runNext(self, *_) -> None:
+        """Run the next script once the previous one is done, giving the event loop a turn in between."""
+        if self.pending:
+            self.view.page().runJavaScript(self.pending.pop(0), self.runNext)
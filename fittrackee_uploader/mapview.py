@@ -0,0 +1,88 @@
+"""Scripts showing workouts on the map page."""
+
+import json
+
+from .templates import message_no_gps_records
+
+#: Decimals kept by the polyline encoding, as expected by the map page.
+POLYLINE_PRECISION = 5
+
+
+def encode_polyline(path: list[tuple[float, float]], precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode a path with the Google polyline algorithm.
+
+    Each coordinate is stored as the difference to the previous one in a few printable characters, which is several
+    times smaller than JSON and fast to decode in the page.
+
+    Parameters
+    ----------
+    path : list[tuple[float, float]]
+        Latitude and longitude of the points.
+    precision : int
+        Decimals kept.
+
+    Returns
+    -------
+    str
+        Encoded polyline.
+    """
+    factor = 10**precision
+    chunks = []
+    previous_lat = previous_lon = 0
+    for lat, lon in path:
+        lat = round(lat * factor)
+        lon = round(lon * factor)
+        for delta in (lat - previous_lat, lon - previous_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous_lat = lat
+        previous_lon = lon
+    return "".join(chunks)
+
+
+def message_script(text: str) -> str:
+    """
+    Get the script showing a message instead of the map.
+
+    Parameters
+    ----------
+    text : str
+        Message to show.
+
+    Returns
+    -------
+    str
+        Script to run in the map page.
+    """
+    return f"showMessage({json.dumps(text)});"
+
+
+def map_scripts(wo) -> list[str]:
+    """
+    Get the scripts showing the track of a workout on the map page.
+
+    The first script shows the coarsest level of detail of the track with its start and finish, each following one
+    replaces it with a finer level. Does not touch any widget, so it can run outside of the GUI thread.
+
+    Parameters
+    ----------
+    wo : Workout
+        Workout to show.
+
+    Returns
+    -------
+    list[str]
+        Scripts to run in the map page in order, a single message if the workout has no GPS records.
+    """
+    if len(wo.points) == 0:
+        return [message_script(message_no_gps_records)]
+    coarse, *finer = wo.getLevels()
+    first = list(wo.points[0].position)
+    last = list(wo.points[-1].position)
+    scripts = [f"showTrack({json.dumps(encode_polyline(coarse))}, {json.dumps(wo.getExtent())}, {first}, {last});"]
+    scripts.extend(f"refineTrack({json.dumps(encode_polyline(level))});" for level in finer)
+    return scripts
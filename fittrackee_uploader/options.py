@@ -56,7 +56,7 @@ class Options(QtWidgets.QWidget):
     def saveConfig(self):
         """Save configuration."""
         if self.configuration.folder != self.ui.tbFolder.text():
-            self.main_window.loadFolder()
+            self.main_window.loadFolder(self.ui.tbFolder.text())
         self.configuration.server_url = self.ui.tbServer.text()
         self.configuration.folder = self.ui.tbFolder.text()
         self.configuration.uploaded_folder = self.ui.tbUploadedFolder.text()
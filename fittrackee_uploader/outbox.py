@@ -0,0 +1,495 @@
+"""Persistent journal of the uploads, resumed after a crash or while offline."""
+
+import datetime
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from .archive import archive_file
+from .configuration import Configuration
+from .fittrackee import FitTrackee
+
+# pylint: disable=too-many-arguments
+
+#: Steps of an upload, each one is recorded once the server confirmed it.
+QUEUED = "queued"
+POSTED = "posted"
+TITLED = "titled"
+ARCHIVED = "archived"
+
+#: State of an upload whose last step failed, ``step`` tells where it resumes.
+FAILED = "failed"
+
+#: Age in seconds below which a payload without an upload is kept, another process may be about to record it.
+PAYLOAD_GRACE = 600
+
+#: Seconds without progress after which an upload claimed by a process of another machine can be taken over.
+LEASE_TIME = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    payload TEXT,
+    workout TEXT NOT NULL,
+    sport_id INTEGER NOT NULL,
+    sport_name TEXT NOT NULL,
+    equipment_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    state TEXT NOT NULL,
+    step TEXT NOT NULL,
+    workout_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    owner TEXT
+)
+"""
+
+#: Columns of an upload changed as it goes through the steps.
+_UPDATABLE = ("payload", "state", "step", "workout_id", "attempts", "error")
+
+#: Change the columns whose ``set_`` parameter is true, in a single statement so the change is atomic.
+_UPDATE = """
+UPDATE uploads SET
+    payload = CASE WHEN :set_payload THEN :payload ELSE payload END,
+    state = CASE WHEN :set_state THEN :state ELSE state END,
+    step = CASE WHEN :set_step THEN :step ELSE step END,
+    workout_id = CASE WHEN :set_workout_id THEN :workout_id ELSE workout_id END,
+    attempts = CASE WHEN :set_attempts THEN :attempts ELSE attempts END,
+    error = CASE WHEN :set_error THEN :error ELSE error END,
+    updated = :updated
+WHERE id = :id
+"""
+
+
+class UploadBusy(Exception):
+    """Upload being run by another process, or another thread of this one."""
+
+
+class Outbox:
+    """
+    SQLite journal of the uploads with their payloads stored next to it.
+
+    Every upload is a row moving through ``queued``, ``posted``, ``titled`` and ``archived``, each step recorded as
+    soon as it is done. ``failed`` uploads keep the last step they reached, so processing them again carries on from
+    there: a posted workout is not posted twice and an uploaded file is only moved. A workout whose post was attempted
+    without recording its answer is first looked up on the server by its start time.
+
+    The GUI, the watch and the ``outbox`` command may share the journal, so an upload is claimed before it runs by
+    writing the host and process ID in ``owner``. The claim of a process that died on this machine is taken over at
+    once, the claim of another machine after ``LEASE_TIME`` without progress.
+
+    Parameters
+    ----------
+    folder : str | Path
+        Folder holding the database and the payloads.
+    """
+
+    def __init__(self, folder: str | Path) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        folder : str | Path
+            Folder holding the database and the payloads.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(self.folder / "outbox.sqlite", check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute(_SCHEMA)
+        # Journals created before uploads were claimed
+        if "owner" not in {row["name"] for row in self.db.execute("PRAGMA table_info(uploads)")}:
+            self.db.execute("ALTER TABLE uploads ADD COLUMN owner TEXT")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def add(
+        self,
+        path: str | Path,
+        workout,
+        gpx: str | bytes | None,
+        sport_id: int,
+        sport_name: str,
+        equipment_id: str,
+        title: str,
+        notes: str,
+    ) -> int:
+        """
+        Queue a workout, storing its payload first.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path to the workout file.
+        workout : Workout
+            Workout to upload.
+        gpx : str | bytes | None
+            GPX payload prepared in advance, read from the workout if None.
+        sport_id : int
+            Sport ID.
+        sport_name : str
+            Label of the sport, used to name the moved file.
+        equipment_id : str
+            Equipment ID.
+        title : str
+            Title for workout.
+        notes : str
+            Notes to accompany the workout.
+
+        Returns
+        -------
+        int
+            ID of the upload.
+
+        Raises
+        ------
+        ValueError
+            If the workout has no start time, FitTrackee needs one.
+        """
+        # FitTrackee dates a workout from a GPX file by its first point, the summary of a lazy one may be earlier
+        start = workout.points[0].timestamp if len(workout.points) > 0 else None
+        start = start or workout.getDate()
+        if start is None:
+            raise ValueError("Workout without a start time")
+        payload = None
+        if len(workout.points) > 0:
+            payload = f"{uuid.uuid4().hex}.gpx"
+            temp_path = self.folder / f"{payload}.tmp"
+            with temp_path.open("wb") as payload_file:
+                if gpx is None:
+                    with workout.openGPX() as gpx_file:
+                        shutil.copyfileobj(gpx_file, payload_file)
+                else:
+                    payload_file.write(gpx.encode() if isinstance(gpx, str) else gpx)
+                payload_file.flush()
+                os.fsync(payload_file.fileno())
+            os.replace(temp_path, self.folder / payload)
+        summary = {
+            "date": (workout.getDate() or start).isoformat(),
+            "start": start.isoformat(),
+            "duration": workout.getTime().total_seconds(),
+            "distance": workout.getDistance(),
+            "ascent": workout.ascent,
+            "descent": workout.descent,
+        }
+        now = time.time()
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO uploads (path, payload, workout, sport_id, sport_name, equipment_id, title, notes, state,"
+                " step, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(path),
+                    payload,
+                    json.dumps(summary),
+                    sport_id,
+                    sport_name,
+                    equipment_id,
+                    title,
+                    notes,
+                    QUEUED,
+                    QUEUED,
+                    now,
+                    now,
+                ),
+            )
+            return cursor.lastrowid
+
+    def get(self, upload_id: int) -> dict | None:
+        """
+        Get an upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+
+        Returns
+        -------
+        dict | None
+            Columns of the upload or None if there is none with this ID.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def getPending(self) -> list[dict]:
+        """
+        Get the uploads not archived yet, failed ones included.
+
+        Returns
+        -------
+        list[dict]
+            Columns of the uploads, oldest first.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM uploads WHERE step != ? ORDER BY id", (ARCHIVED,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _update(self, upload_id: int, **columns) -> None:
+        """
+        Change columns of an upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        **columns
+            New values of the columns, among ``_UPDATABLE``.
+
+        Raises
+        ------
+        ValueError
+            If a column cannot be changed.
+        """
+        unknown = set(columns) - set(_UPDATABLE)
+        if unknown:
+            raise ValueError(f"Columns not updatable: {', '.join(sorted(unknown))}")
+        parameters = {"id": upload_id, "updated": time.time()}
+        for column in _UPDATABLE:
+            parameters[f"set_{column}"] = column in columns
+            parameters[column] = columns.get(column)
+        with self.lock:
+            self.db.execute(_UPDATE, parameters)
+
+    def _advance(self, upload_id: int, step: str, **columns) -> None:
+        """
+        Record a step done.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        step : str
+            Step done.
+        **columns
+            Other columns to change.
+        """
+        self._update(upload_id, state=step, step=step, error="", **columns)
+
+    def _expired(self, owner: str, updated: float) -> bool:
+        """
+        Tell whether the claim of an upload can be taken over.
+
+        Parameters
+        ----------
+        owner : str
+            Host and process ID of the claim.
+        updated : float
+            Time of the last change of the upload.
+
+        Returns
+        -------
+        bool
+            True if the process is gone or the claim is older than ``LEASE_TIME``.
+        """
+        if time.time() - updated > LEASE_TIME:
+            return True
+        host, _, pid = owner.rpartition(":")
+        # Signal 0 only checks the process on POSIX, it would terminate it on Windows
+        if host != socket.gethostname() or os.name != "posix":
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except (OSError, ValueError):
+            return False
+        return False
+
+    def claim(self, upload_id: int) -> bool:
+        """
+        Claim an upload for this process.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+
+        Returns
+        -------
+        bool
+            True if the upload was claimed, False if another process or thread runs it.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT owner, updated FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+            if row is None or (row["owner"] is not None and not self._expired(row["owner"], row["updated"])):
+                return False
+            # Only one process changes the owner it read, the others see a row count of 0
+            cursor = self.db.execute(
+                "UPDATE uploads SET owner = ?, updated = ? WHERE id = ? AND owner IS ?",
+                (self.owner, time.time(), upload_id, row["owner"]),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, upload_id: int) -> None:
+        """
+        Release the claim of this process on an upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        """
+        with self.lock:
+            self.db.execute("UPDATE uploads SET owner = NULL WHERE id = ? AND owner = ?", (upload_id, self.owner))
+
+    def process(self, upload_id: int, api: FitTrackee, config: Configuration) -> dict:
+        """
+        Run the remaining steps of an upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        api : FitTrackee
+            Logged in API.
+        config : Configuration
+            Configuration with the move after upload options.
+
+        Returns
+        -------
+        dict
+            Columns of the upload, ``state`` is ``failed`` with ``error`` set if the server rejected a step.
+
+        Raises
+        ------
+        UploadBusy
+            If another process or thread runs the upload.
+        Exception
+            Network and file errors, recorded in the upload before being raised again.
+        """
+        if not self.claim(upload_id):
+            raise UploadBusy("Being uploaded by another process")
+        try:
+            return self._process(upload_id, api, config)
+        finally:
+            self.release(upload_id)
+
+    def _process(self, upload_id: int, api: FitTrackee, config: Configuration) -> dict:
+        """
+        Run the remaining steps of a claimed upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        api : FitTrackee
+            Logged in API.
+        config : Configuration
+            Configuration with the move after upload options.
+
+        Returns
+        -------
+        dict
+            Columns of the upload.
+        """
+        entry = self.get(upload_id)
+        try:
+            if entry["step"] == QUEUED:
+                self._post(entry, api)
+                entry = self.get(upload_id)
+            if entry["step"] == POSTED:
+                if entry["title"] != "" and not api.set_title(entry["workout_id"], entry["title"]):
+                    self._update(upload_id, state=FAILED, error="Title not set by the server")
+                    return self.get(upload_id)
+                self._advance(upload_id, TITLED)
+                entry = self.get(upload_id)
+            if entry["step"] == TITLED:
+                # A missing file was already moved by an attempt interrupted before recording it
+                if os.path.exists(entry["path"]):
+                    archive_file(config, entry["path"], entry["sport_name"], entry["title"])
+                self._advance(upload_id, ARCHIVED, payload=None)
+                if entry["payload"] is not None:
+                    (self.folder / entry["payload"]).unlink(missing_ok=True)
+        except Exception as e:
+            self._update(upload_id, state=FAILED, error=str(e) or type(e).__name__)
+            raise
+        return self.get(upload_id)
+
+    def _post(self, entry: dict, api: FitTrackee) -> None:
+        """
+        Create the workout on the server, unless an earlier attempt already did.
+
+        Parameters
+        ----------
+        entry : dict
+            Columns of the upload.
+        api : FitTrackee
+            Logged in API.
+        """
+        summary = json.loads(entry["workout"])
+        date = datetime.datetime.fromisoformat(summary["date"])
+        # Workouts without GPS records are created with their title
+        done = POSTED if entry["payload"] is not None else TITLED
+        if entry["attempts"] > 0:
+            workout_id = api.find_workout(datetime.datetime.fromisoformat(summary.get("start", summary["date"])))
+            if workout_id is not None:
+                self._advance(entry["id"], done, workout_id=workout_id)
+                return
+        # Counted before the request, so a crash during it is known on the next attempt
+        self._update(entry["id"], attempts=entry["attempts"] + 1)
+        if entry["payload"] is not None:
+            with (self.folder / entry["payload"]).open("rb") as payload_file:
+                workout = api.post_workout(
+                    payload_file, entry["sport_id"], entry["equipment_id"], entry["notes"], entry["title"]
+                )
+            if workout is None:
+                self._update(entry["id"], state=FAILED, error="Rejected by the server")
+                return
+            # The title is set in the same request by servers supporting it
+            step = TITLED if workout.get("title") == entry["title"] or entry["title"] == "" else POSTED
+            self._advance(entry["id"], step, workout_id=workout["id"])
+            return
+        ok = api.add_workout_no_gpx(
+            date.strftime("%Y-%m-%d %H:%M"),
+            summary["duration"],
+            summary["distance"],
+            entry["sport_id"],
+            entry["title"],
+            entry["notes"],
+            summary["ascent"],
+            summary["descent"],
+        )
+        if not ok:
+            self._update(entry["id"], state=FAILED, error="Rejected by the server")
+            return
+        self._advance(entry["id"], done)
+
+    def purge(self) -> None:
+        """
+        Remove the archived uploads and the payloads of uploads that were never recorded.
+
+        ``add`` stores the payload before the upload, so payloads younger than ``PAYLOAD_GRACE`` are kept: the GUI,
+        the watch and the ``outbox`` command may be adding uploads at the same time.
+        """
+        with self.lock:
+            self.db.execute("DELETE FROM uploads WHERE step = ?", (ARCHIVED,))
+            payloads = {row[0] for row in self.db.execute("SELECT payload FROM uploads WHERE payload IS NOT NULL")}
+        now = time.time()
+        for path in self.folder.iterdir():
+            if path.suffix not in (".gpx", ".tmp") or path.name in payloads:
+                continue
+            try:
+                if now - path.stat().st_mtime > PAYLOAD_GRACE:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                # Removed or renamed meanwhile
+                continue
+
+    def close(self) -> None:
+        """Close the database."""
+        with self.lock:
+            self.db.close()
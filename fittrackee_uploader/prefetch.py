@@ -0,0 +1,245 @@
+"""Prepare the next workouts in the background."""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .mapview import map_scripts
+from .workout.loader import Loader
+from .workout.reduce import Reduction, ReductionReport, reduce_gpx
+
+# pylint: disable=too-few-public-methods
+
+
+class Prepared:
+    """
+    Workout ready to be shown and uploaded.
+
+    Parameters
+    ----------
+    path : str
+        Path to the workout file.
+    workout : Workout | None
+        Loaded workout, None if the file is not supported or failed to load.
+    scripts : list[str] | None
+        Scripts showing the workout on the map page.
+    gpx : str | bytes | None
+        GPX payload for the upload, None if the workout has no GPS records.
+    error : Exception | None
+        Error raised while preparing the workout.
+    report : ReductionReport | None
+        Size of the payload before and after reducing its points, None if it was not reduced.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        workout=None,
+        scripts: list[str] = None,
+        gpx: str | bytes = None,
+        error: Exception = None,
+        report: ReductionReport = None,
+    ):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        workout : Workout | None
+            Loaded workout, None if the file is not supported or failed to load.
+        scripts : list[str] | None
+            Scripts showing the workout on the map page.
+        gpx : str | bytes | None
+            GPX payload for the upload, None if the workout has no GPS records.
+        error : Exception | None
+            Error raised while preparing the workout.
+        report : ReductionReport | None
+            Size of the payload before and after reducing its points, None if it was not reduced.
+        """
+        self.path = path
+        self.workout = workout
+        self.scripts = scripts
+        self.gpx = gpx
+        self.error = error
+        self.report = report
+
+
+def prepare(loader: Loader, path: str, reduction: Reduction | None = None) -> Prepared:
+    """
+    Load a workout, prepare its map and serialise its upload payload.
+
+    Parameters
+    ----------
+    loader : Loader
+        Loader for the workout files.
+    path : str
+        Path to the workout file.
+    reduction : Reduction | None
+        Reduction of the points of the payload, None to upload all of them.
+
+    Returns
+    -------
+    Prepared
+        Prepared workout, with ``error`` set if any step failed.
+    """
+    try:
+        workout = loader.loadFile(path)
+        if workout is None:
+            return Prepared(path)
+        scripts = map_scripts(workout)
+        gpx = None
+        report = None
+        if len(workout.points) > 0:
+            if reduction is not None:
+                gpx, report = reduce_gpx(workout, reduction)
+            if gpx is None:
+                gpx = workout.getGPX()
+        return Prepared(path, workout, scripts, gpx, report=report)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return Prepared(path, error=e)
+
+
+class Prefetcher:
+    """
+    Ring of workouts prepared in worker threads ahead of the one shown.
+
+    At most ``depth`` workouts are prepared or held ahead, so memory stays bounded however many files are queued.
+
+    Parameters
+    ----------
+    loader : Loader
+        Loader for the workout files.
+    depth : int
+        Number of workouts to prepare ahead, 0 prepares each one when it is requested.
+    reduction : Reduction | None
+        Reduction of the points of the payloads, None to upload all of them.
+    """
+
+    def __init__(self, loader: Loader, depth: int = 2, reduction: Reduction | None = None) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        loader : Loader
+            Loader for the workout files.
+        depth : int
+            Number of workouts to prepare ahead, 0 prepares each one when it is requested.
+        reduction : Reduction | None
+            Reduction of the points of the payloads, None to upload all of them.
+        """
+        self.loader = loader
+        self.depth = max(0, depth)
+        self.reduction = reduction
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.depth), thread_name_prefix="prefetch")
+        self.files = deque()
+        self.ring: deque[tuple[str, Future]] = deque()
+
+    def __len__(self) -> int:
+        """
+        Return the number of workouts left.
+
+        Returns
+        -------
+        int
+            Number of files queued or being prepared.
+        """
+        return len(self.files) + len(self.ring)
+
+    def reset(self, files: list[str]) -> None:
+        """
+        Replace the queued files, cancelling the work for the previous ones.
+
+        Parameters
+        ----------
+        files : list[str]
+            Paths of the workout files, in the order they are shown.
+        """
+        self.cancel()
+        self.files.extend(files)
+        self._fill()
+
+    def extend(self, files: list[str]) -> None:
+        """
+        Queue more files after the current ones.
+
+        Parameters
+        ----------
+        files : list[str]
+            Paths of the workout files, in the order they are shown.
+        """
+        self.files.extend(files)
+        self._fill()
+
+    def discard(self, files: set[str]) -> None:
+        """
+        Drop files from the queue, cancelling or discarding the work prepared for them.
+
+        Parameters
+        ----------
+        files : set[str]
+            Paths of the files to drop.
+        """
+        self.files = deque(path for path in self.files if path not in files)
+        ring = deque()
+        for path, future in self.ring:
+            if path in files:
+                future.cancel()
+            else:
+                ring.append((path, future))
+        self.ring = ring
+        self._fill()
+
+    def cancel(self) -> None:
+        """Drop all queued files and cancel the work not started yet, results of running work are discarded."""
+        for _, future in self.ring:
+            future.cancel()
+        self.ring.clear()
+        self.files.clear()
+
+    def peek(self) -> str | None:
+        """
+        Get the next file if it is not prepared yet.
+
+        Returns
+        -------
+        str | None
+            Path of the next file, None if it is already prepared or there are no files left.
+        """
+        if self.ring:
+            path, future = self.ring[0]
+            return None if future.done() else path
+        return self.files[0] if self.files else None
+
+    def next(self) -> Prepared | None:
+        """
+        Get the next workout, waiting for it if it is not prepared yet.
+
+        Returns
+        -------
+        Prepared | None
+            Next workout or None if there are no files left.
+        """
+        if not self.ring:
+            if not self.files:
+                return None
+            self._submit()
+        _, future = self.ring.popleft()
+        self._fill()
+        return future.result()
+
+    def _fill(self) -> None:
+        """Submit files until ``depth`` workouts are prepared ahead."""
+        while self.files and len(self.ring) < self.depth:
+            self._submit()
+
+    def _submit(self) -> None:
+        """Start preparing the first queued file."""
+        path = self.files.popleft()
+        self.ring.append((path, self.executor.submit(prepare, self.loader, path, self.reduction)))
+
+    def shutdown(self) -> None:
+        """Cancel all work and stop the worker threads."""
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,237 @@
+"""Local index of the workouts already on the server, to find duplicates before uploading."""
+
+import datetime
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from .fittrackee import FitTrackee
+
+#: Largest difference in seconds between the start times of the same activity.
+START_TOLERANCE = 60
+
+#: Largest relative difference of the durations and distances of the same activity, the server computes them again.
+RELATIVE_TOLERANCE = 0.05
+
+#: Smallest differences in seconds and kilometres always accepted, for short workouts.
+DURATION_TOLERANCE = 60
+DISTANCE_TOLERANCE = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workouts (
+    id TEXT PRIMARY KEY,
+    start REAL NOT NULL,
+    duration REAL NOT NULL,
+    distance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workouts_start ON workouts (start);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def parse_duration(text: str | None) -> float:
+    """
+    Parse a duration as given by the server.
+
+    Parameters
+    ----------
+    text : str | None
+        Duration like ``1:02:03`` or ``1 day, 1:02:03``.
+
+    Returns
+    -------
+    float
+        Duration in seconds, 0 if there is none.
+    """
+    if not text:
+        return 0.0
+    days = 0
+    if "day" in text:
+        day_text, text = text.split(",", 1)
+        days = int(day_text.split()[0])
+    hours, minutes, seconds = text.strip().split(":")
+    return days * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class RemoteIndex:
+    """
+    SQLite copy of the start time, duration and distance of the workouts of the user on the server.
+
+    A sync reads the workouts most recent first and stops at the first page reaching known workouts once the index
+    holds as many workouts as the server, so usually a single request is made. Otherwise every page is read and the
+    workouts deleted on the server are removed. Looking up a workout is a range query on the indexed start time.
+
+    Parameters
+    ----------
+    path : str | Path
+        SQLite database.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        path : str | Path
+            SQLite database.
+        """
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(Path(path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def count(self) -> int:
+        """
+        Count the indexed workouts.
+
+        Returns
+        -------
+        int
+            Number of workouts.
+        """
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+
+    def sync(self, api: FitTrackee, full: bool = False, per_page: int = 100) -> int:
+        """
+        Bring the index up to date with the server.
+
+        Parameters
+        ----------
+        api : FitTrackee
+            Logged in API.
+        full : bool
+            Read every page, even if the index looks up to date.
+        per_page : int
+            Workouts per request.
+
+        Returns
+        -------
+        int
+            Number of workouts added or changed.
+
+        Raises
+        ------
+        requests.RequestException
+            If the server could not be reached, the workouts read so far are kept.
+        """
+        owner = f"{api.user}@{api.url}"
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'owner'").fetchone()
+            if row is None or row[0] != owner:
+                self.clear()
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('owner', ?)", (owner,))
+        seen = set()
+        changed = 0
+        page = 1
+        while True:
+            workouts, pagination = api.get_workouts(page, per_page)
+            rows = [
+                (
+                    workout["id"],
+                    parsedate_to_datetime(workout["workout_date"]).timestamp(),
+                    parse_duration(workout.get("duration")),
+                    float(workout.get("distance") or 0),
+                )
+                for workout in workouts
+            ]
+            seen.update(row[0] for row in rows)
+            with self.lock:
+                new_rows = [
+                    row
+                    for row in rows
+                    if self.db.execute(
+                        "SELECT 1 FROM workouts WHERE id = ? AND start IS ? AND duration IS ? AND distance IS ?", row
+                    ).fetchone()
+                    is None
+                ]
+                self.db.executemany("INSERT OR REPLACE INTO workouts VALUES (?, ?, ?, ?)", new_rows)
+            changed += len(new_rows)
+            if not pagination.get("has_next") or not rows:
+                break
+            if not full and len(new_rows) < len(rows) and self.count() == pagination.get("total"):
+                return changed
+            page += 1
+        # Every page was read, the workouts not seen were deleted on the server
+        with self.lock:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM seen")
+            self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((workout_id,) for workout_id in seen))
+            self.db.execute("DELETE FROM workouts WHERE id NOT IN (SELECT id FROM seen)")
+        return changed
+
+    def findDuplicate(self, workout, decode: bool = True) -> str | None:
+        """
+        Find a workout on the server matching a workout to upload.
+
+        Lazy workouts are first matched on their summary without decoding their track, leaving out the distance if the
+        summary does not have it. As the first GPS point can come later than the start in the summary, a lazy workout
+        not found that way is matched again on its track.
+
+        Parameters
+        ----------
+        workout : Workout
+            Workout to upload.
+        decode : bool
+            Decode the track of a lazy workout not found from its summary.
+
+        Returns
+        -------
+        str | None
+            ID of the workout on the server or None if it is not known.
+        """
+        if not workout.isLoaded():
+            workout_id = self.find(workout.getStart(), workout.getTime().total_seconds(), workout.distance)
+            if workout_id is not None or not decode:
+                return workout_id
+        # FitTrackee dates a workout from a GPX file by its first point
+        return self.find(workout.getStart(), workout.getTime().total_seconds(), workout.getDistance())
+
+    def find(self, start: datetime.datetime, duration: float, distance: float | None) -> str | None:
+        """
+        Find a workout by its start time, duration and distance.
+
+        Parameters
+        ----------
+        start : datetime.datetime
+            Start of the workout, timezone aware.
+        duration : float
+            Duration in seconds.
+        distance : float | None
+            Distance in kilometres, None to match on the start and duration only.
+
+        Returns
+        -------
+        str | None
+            ID of the closest matching workout or None if there is none.
+        """
+        timestamp = start.timestamp()
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, duration, distance FROM workouts WHERE start BETWEEN ? AND ? ORDER BY abs(start - ?)",
+                (timestamp - START_TOLERANCE, timestamp + START_TOLERANCE, timestamp),
+            ).fetchall()
+        for workout_id, other_duration, other_distance in rows:
+            if abs(other_duration - duration) > max(DURATION_TOLERANCE, RELATIVE_TOLERANCE * duration):
+                continue
+            if distance is None:
+                return workout_id
+            if abs(other_distance - distance) <= max(DISTANCE_TOLERANCE, RELATIVE_TOLERANCE * distance):
+                return workout_id
+        return None
+
+    def clear(self) -> None:
+        """Forget all workouts, when another user logs in."""
+        with self.lock:
+            self.db.execute("DELETE FROM workouts")
+            self.db.execute("DELETE FROM meta")
+
+    def close(self) -> None:
+        """Close the database."""
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,18 @@
+"""URL scheme of the files bundled with the package, kept apart so it is registered without loading the map page."""
+
+from PyQt6.QtWebEngineCore import QWebEngineUrlScheme
+
+#: URL scheme of the files bundled with the package.
+SCHEME = b"fittrackee"
+
+
+def register_scheme() -> None:
+    """Register the URL scheme of the package files, must be called before the ``QApplication`` is created."""
+    scheme = QWebEngineUrlScheme(SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalAccessAllowed
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
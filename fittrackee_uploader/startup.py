@@ -0,0 +1,122 @@
+"""Wall time of the imports and initialisation phases of the start, reported with ``--startup-trace``."""
+
+import builtins
+import importlib.util
+import sys
+import time
+from contextlib import contextmanager
+
+#: Imports faster than this many milliseconds are left out of the report.
+MIN_IMPORT_TIME = 2.0
+
+
+class StartupTrace:
+    """
+    Record how long the start takes, phase by phase.
+
+    Once enabled, every import of a module not loaded yet is timed too, nested imports being indented under the one
+    that triggered them. Times include the nested imports, like ``python -X importtime`` shows as cumulative.
+
+    Parameters
+    ----------
+    enabled : bool
+        Record and report the times, otherwise phases are only run.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        enabled : bool
+            Record and report the times, otherwise phases are only run.
+        """
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.events = []
+        self.depth = 0
+        self.original_import = builtins.__import__
+        if enabled:
+            builtins.__import__ = self._import
+
+    def _import(self, name, module_globals=None, module_locals=None, fromlist=(), level=0):
+        """Time the imports of modules not loaded yet, replacing ``builtins.__import__``."""
+        try:
+            package = None if module_globals is None else module_globals.get("__package__")
+            full_name = importlib.util.resolve_name("." * level + name, package) if level > 0 else name
+        except (ImportError, ValueError):
+            full_name = name
+        if full_name in sys.modules:
+            return self.original_import(name, module_globals, module_locals, fromlist, level)
+        start = time.perf_counter()
+        index = len(self.events)
+        self.events.append(None)
+        self.depth += 1
+        try:
+            return self.original_import(name, module_globals, module_locals, fromlist, level)
+        finally:
+            self.depth -= 1
+            self.events[index] = ("import", full_name, start - self.start, time.perf_counter() - start, self.depth)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a phase of the start.
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase.
+
+        Yields
+        ------
+        None
+            Runs the phase.
+        """
+        start = time.perf_counter()
+        index = len(self.events)
+        self.events.append(None)
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.events[index] = ("phase", name, start - self.start, time.perf_counter() - start, self.depth)
+
+    def mark(self, name: str) -> None:
+        """
+        Record the time a point of the start was reached.
+
+        Parameters
+        ----------
+        name : str
+            Name of the point.
+        """
+        self.events.append(("mark", name, time.perf_counter() - self.start, 0.0, self.depth))
+
+    def report(self, stream=None) -> None:
+        """
+        Stop timing imports and print the recorded times, if enabled.
+
+        Parameters
+        ----------
+        stream : TextIO | None
+            Where to print, defaults to ``sys.stderr``.
+        """
+        if not self.enabled:
+            return
+        # Only restore the import if no one replaced the hook since
+        if getattr(builtins.__import__, "__self__", None) is self:
+            builtins.__import__ = self.original_import
+        stream = sys.stderr if stream is None else stream
+        print(f"{'at ms':>9} {'took ms':>9}  step", file=stream)
+        for event in self.events:
+            if event is None:
+                continue
+            kind, name, offset, duration, depth = event
+            if kind == "import" and duration * 1000 < MIN_IMPORT_TIME:
+                continue
+            label = {"import": f"import {name}", "phase": f"[{name}]", "mark": f"-- {name}"}[kind]
+            print(f"{offset * 1000:9.1f} {duration * 1000:9.1f}  {'  ' * depth}{label}", file=stream)
+        print(f"{(time.perf_counter() - self.start) * 1000:9.1f} {'':9}  -- total", file=stream)
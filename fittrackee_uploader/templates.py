@@ -1,40 +1,7 @@
 """Templates."""
 
-page_no_gps_records = """
-<!DOCTYPE html>
-<html>
-   <head>
-   </head>
-   <body>
-      <h1 style="text-align: center; padding-top: 10%; font-family: Helvetica, sans-serif;">
-        No GPS records
-      </h1>
-   </body>
-</html>
-"""
+message_no_gps_records = "No GPS records"
 
-page_no_more_files = """
-<!DOCTYPE html>
-<html>
-   <head>
-   </head>
-   <body>
-      <h1 style="text-align: center; padding-top: 10%; font-family: Helvetica, sans-serif;">
-        No more workouts
-      </h1>
-   </body>
-</html>
-"""
+message_no_more_files = "No more workouts"
 
-page_failed_to_load = """
-<!DOCTYPE html>
-<html>
-   <head>
-   </head>
-   <body>
-      <h1 style="text-align: center; padding-top: 10%; font-family: Helvetica, sans-serif;">
-        Failed to load file
-      </h1>
-   </body>
-</html>
-"""
+message_failed_to_load = "Failed to load file"
@@ -0,0 +1,412 @@
+"""Disk cache of map tiles."""
+
+import atexit
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# pylint: disable=too-many-instance-attributes
+
+#: Tile server, the same as the map page used before tiles were cached.
+TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+#: Sent with every tile request, as the OpenStreetMap tile usage policy asks for.
+USER_AGENT = "FitTrackee-Uploader (+https://github.com/ebrithiljonas/fittrackee-uploader)"
+
+#: Highest zoom level of the tile server.
+MAX_ZOOM = 19
+
+#: Stored tiles after which the index is written, so a crash loses track of few of them.
+SAVE_EVERY = 50
+
+
+def tile_range(min_lat: float, min_lon: float, max_lat: float, max_lon: float, zoom: int) -> tuple[range, range]:
+    """
+    Get the tiles covering a bounding box.
+
+    Parameters
+    ----------
+    min_lat : float
+        Southern latitude in degrees.
+    min_lon : float
+        Western longitude in degrees.
+    max_lat : float
+        Northern latitude in degrees.
+    max_lon : float
+        Eastern longitude in degrees.
+    zoom : int
+        Zoom level.
+
+    Returns
+    -------
+    tuple[range, range]
+        Columns and rows of the tiles.
+    """
+    count = 2**zoom
+
+    def column(lon: float) -> int:
+        return min(count - 1, max(0, int((lon + 180) / 360 * count)))
+
+    def row(lat: float) -> int:
+        lat = math.radians(min(85.0511, max(-85.0511, lat)))
+        return min(count - 1, max(0, int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * count)))
+
+    return range(column(min_lon), column(max_lon) + 1), range(row(max_lat), row(min_lat) + 1)
+
+
+class TileCache:
+    """
+    Map tiles stored on disk.
+
+    Every tile is a file in the cache folder and an index keeps when each one was fetched and last used. Tiles older
+    than ``ttl`` are fetched again when possible but still served when the server cannot be reached, and the least
+    recently used tiles are removed once the cache grows beyond ``max_size``. The index is written every
+    ``SAVE_EVERY`` stored tiles and at exit, and rebuilt from the tile files when it cannot be read.
+
+    Parameters
+    ----------
+    folder : str | Path
+        Folder holding the cache.
+    max_size : int
+        Maximum size of all tiles in bytes, 0 disables the cache.
+    ttl : float
+        Age in seconds after which a tile is fetched again.
+    url : str
+        Template of the tile URLs.
+    """
+
+    def __init__(
+        self, folder: str | Path, max_size: int = 512 * 1024**2, ttl: float = 30 * 86400, url: str = TILE_URL
+    ) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        folder : str | Path
+            Folder holding the cache.
+        max_size : int
+            Maximum size of all tiles in bytes, 0 disables the cache.
+        ttl : float
+            Age in seconds after which a tile is fetched again.
+        url : str
+            Template of the tile URLs.
+        """
+        self.folder = Path(folder)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.url = url
+        self.index_path = self.folder / "index.json"
+        self.index = {"hits": 0, "misses": 0, "tiles": {}}
+        self.dirty = False
+        try:
+            with self.index_path.open(encoding="utf-8") as index_file:
+                self.index = json.load(index_file)
+        except (OSError, ValueError):
+            self._rebuild()
+        self.stored = 0
+        self.lock = threading.RLock()
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        atexit.register(self.save)
+
+    def _rebuild(self) -> None:
+        """Index the tile files found in the folder, taking their modification time as fetch and use time."""
+        for path in self.folder.glob("*/*/*.png"):
+            parts = path.relative_to(self.folder).with_suffix("").parts
+            if not all(part.isdigit() for part in parts):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self.index["tiles"]["/".join(parts)] = {
+                "bytes": stat.st_size,
+                "fetched": stat.st_mtime,
+                "used": stat.st_mtime,
+            }
+            self.dirty = True
+
+    def _tilePath(self, key: str) -> Path:
+        """
+        Get the file holding a tile.
+
+        Parameters
+        ----------
+        key : str
+            Key of the tile, ``z/x/y``.
+
+        Returns
+        -------
+        Path
+            Path to the tile.
+        """
+        return self.folder / f"{key}.png"
+
+    def isFresh(self, z: int, x: int, y: int) -> bool:
+        """
+        Check whether a tile is cached and not expired.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+
+        Returns
+        -------
+        bool
+            Whether the tile can be served without fetching it again.
+        """
+        with self.lock:
+            entry = self.index["tiles"].get(f"{z}/{x}/{y}")
+            return entry is not None and time.time() - entry["fetched"] < self.ttl
+
+    def lookup(self, z: int, x: int, y: int) -> tuple[bytes | None, bool]:
+        """
+        Get a cached tile without any network access, counting a hit if it is fresh and a miss otherwise.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+
+        Returns
+        -------
+        tuple[bytes | None, bool]
+            Tile or None if it is not cached, and whether it is still fresh.
+        """
+        key = f"{z}/{x}/{y}"
+        data = None
+        fresh = False
+        with self.lock:
+            entry = self.index["tiles"].get(key)
+            if entry is not None:
+                try:
+                    data = self._tilePath(key).read_bytes()
+                    entry["used"] = time.time()
+                    fresh = entry["used"] - entry["fetched"] < self.ttl
+                except OSError:
+                    self._remove(key)
+            self.index["hits" if fresh else "misses"] += 1
+            self.dirty = True
+        return data, fresh
+
+    def fetch(self, z: int, x: int, y: int) -> bytes:
+        """
+        Download a tile and store it.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+
+        Returns
+        -------
+        bytes
+            Tile.
+        """
+        resp = self.session.get(self.url.format(z=z, x=x, y=y), timeout=(5, 15))
+        resp.raise_for_status()
+        self.put(z, x, y, resp.content)
+        return resp.content
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        """
+        Store a tile.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+        data : bytes
+            Tile.
+        """
+        if self.max_size <= 0 or len(data) > self.max_size:
+            return
+        key = f"{z}/{x}/{y}"
+        path = self._tilePath(key)
+        with self.lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = path.with_suffix(".tmp")
+                temp_path.write_bytes(data)
+                temp_path.replace(path)
+            except OSError:
+                return
+            now = time.time()
+            self.index["tiles"][key] = {"bytes": len(data), "fetched": now, "used": now}
+            self._evict()
+            self.dirty = True
+            self.stored += 1
+            if self.stored >= SAVE_EVERY:
+                self.save()
+
+    def _remove(self, key: str) -> None:
+        """
+        Remove a tile.
+
+        Parameters
+        ----------
+        key : str
+            Key of the tile.
+        """
+        self.index["tiles"].pop(key, None)
+        try:
+            self._tilePath(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Remove the least recently used tiles until the cache fits into ``max_size``."""
+        tiles = self.index["tiles"]
+        total = sum(entry["bytes"] for entry in tiles.values())
+        if total <= self.max_size:
+            return
+        for key in sorted(tiles, key=lambda key: tiles[key]["used"]):
+            if total <= self.max_size:
+                break
+            total -= tiles[key]["bytes"]
+            self._remove(key)
+
+    def seed(
+        self,
+        bbox: tuple[float, float, float, float],
+        zooms: range,
+        workers: int = 2,
+        progress=None,
+    ) -> int:
+        """
+        Download the missing or expired tiles of a bounding box.
+
+        Parameters
+        ----------
+        bbox : tuple[float, float, float, float]
+            Southern latitude, western longitude, northern latitude and eastern longitude in degrees.
+        zooms : range
+            Zoom levels.
+        workers : int
+            Concurrent downloads.
+        progress : callable | None
+            Called with the number of tiles done and the total after each tile.
+
+        Returns
+        -------
+        int
+            Number of tiles downloaded.
+        """
+        tiles = [
+            (z, x, y)
+            for z in zooms
+            for columns, rows in [tile_range(*bbox, z)]
+            for x in columns
+            for y in rows
+            if not self.isFresh(z, x, y)
+        ]
+        done = 0
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(lambda tile: self._seedTile(*tile), tiles):
+                done += 1
+                fetched += result
+                if progress is not None:
+                    progress(done, len(tiles))
+        self.save()
+        return fetched
+
+    def _seedTile(self, z: int, x: int, y: int) -> bool:
+        """
+        Download a tile for ``seed``.
+
+        Parameters
+        ----------
+        z : int
+            Zoom level.
+        x : int
+            Column.
+        y : int
+            Row.
+
+        Returns
+        -------
+        bool
+            Whether the tile was downloaded.
+        """
+        try:
+            self.fetch(z, x, y)
+        except requests.RequestException:
+            return False
+        return True
+
+    def countTiles(self, bbox: tuple[float, float, float, float], zooms: range) -> int:
+        """
+        Count the tiles of a bounding box.
+
+        Parameters
+        ----------
+        bbox : tuple[float, float, float, float]
+            Southern latitude, western longitude, northern latitude and eastern longitude in degrees.
+        zooms : range
+            Zoom levels.
+
+        Returns
+        -------
+        int
+            Number of tiles.
+        """
+        return sum(len(columns) * len(rows) for columns, rows in (tile_range(*bbox, z) for z in zooms))
+
+    def save(self) -> None:
+        """Write the index if it changed."""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            self.stored = 0
+            try:
+                self.folder.mkdir(parents=True, exist_ok=True)
+                temp_path = self.index_path.with_suffix(".tmp")
+                temp_path.write_text(json.dumps(self.index), encoding="utf-8")
+                temp_path.replace(self.index_path)
+            except OSError:
+                pass
+
+    def getStats(self) -> dict:
+        """
+        Get statistics.
+
+        Returns
+        -------
+        dict
+            Folder, number of tiles, size in bytes, maximum size, hits and misses.
+        """
+        with self.lock:
+            tiles = self.index["tiles"]
+            return {
+                "folder": str(self.folder),
+                "tiles": len(tiles),
+                "size": sum(entry["bytes"] for entry in tiles.values()),
+                "max_size": self.max_size,
+                "hits": self.index["hits"],
+                "misses": self.index["misses"],
+            }
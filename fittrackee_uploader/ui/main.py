@@ -18,10 +18,23 @@ class Ui_MainWindow:
         self.verticalLayout = QtWidgets.QVBoxLayout(self.centralwidget)
         self.verticalLayout.setSizeConstraint(QtWidgets.QLayout.SizeConstraint.SetDefaultConstraint)
         self.verticalLayout.setObjectName("verticalLayout")
-        self.webMap = QtWebEngineWidgets.QWebEngineView(parent=self.centralwidget)
-        self.webMap.setUrl(QtCore.QUrl("about:blank"))
-        self.webMap.setObjectName("webMap")
-        self.verticalLayout.addWidget(self.webMap)
+        self.mapContainer = QtWidgets.QWidget(parent=self.centralwidget)
+        sizePolicy = QtWidgets.QSizePolicy(
+            QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding
+        )
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.mapContainer.sizePolicy().hasHeightForWidth())
+        self.mapContainer.setSizePolicy(sizePolicy)
+        self.mapContainer.setObjectName("mapContainer")
+        self.mapLayout = QtWidgets.QVBoxLayout(self.mapContainer)
+        self.mapLayout.setContentsMargins(0, 0, 0, 0)
+        self.mapLayout.setObjectName("mapLayout")
+        self.labelMapLoading = QtWidgets.QLabel(parent=self.mapContainer)
+        self.labelMapLoading.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.labelMapLoading.setObjectName("labelMapLoading")
+        self.mapLayout.addWidget(self.labelMapLoading)
+        self.verticalLayout.addWidget(self.mapContainer)
         self.verticalLayout_2 = QtWidgets.QVBoxLayout()
         self.verticalLayout_2.setObjectName("verticalLayout_2")
         self.labelStats = QtWidgets.QLabel(parent=self.centralwidget)
@@ -81,6 +94,30 @@ class Ui_MainWindow:
         self.statusbar.setEnabled(True)
         self.statusbar.setObjectName("statusbar")
         MainWindow.setStatusBar(self.statusbar)
+        self.dockQueue = QtWidgets.QDockWidget(parent=MainWindow)
+        self.dockQueue.setObjectName("dockQueue")
+        self.dockQueueContents = QtWidgets.QWidget()
+        self.dockQueueContents.setObjectName("dockQueueContents")
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.dockQueueContents)
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.listQueue = QtWidgets.QListWidget(parent=self.dockQueueContents)
+        self.listQueue.setObjectName("listQueue")
+        self.verticalLayout_3.addWidget(self.listQueue)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        spacerItem = QtWidgets.QSpacerItem(
+            40, 20, QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Minimum
+        )
+        self.horizontalLayout_2.addItem(spacerItem)
+        self.btRetryFailed = QtWidgets.QPushButton(parent=self.dockQueueContents)
+        self.btRetryFailed.setObjectName("btRetryFailed")
+        self.horizontalLayout_2.addWidget(self.btRetryFailed)
+        self.btClearQueue = QtWidgets.QPushButton(parent=self.dockQueueContents)
+        self.btClearQueue.setObjectName("btClearQueue")
+        self.horizontalLayout_2.addWidget(self.btClearQueue)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_2)
+        self.dockQueue.setWidget(self.dockQueueContents)
+        MainWindow.addDockWidget(QtCore.Qt.DockWidgetArea(8), self.dockQueue)
         self.actionQuit = QtGui.QAction(parent=MainWindow)
         self.actionQuit.setCheckable(False)
         self.actionQuit.setObjectName("actionQuit")
@@ -107,17 +144,18 @@ class Ui_MainWindow:
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "FitTrackee Uploader"))
+        self.labelMapLoading.setText(_translate("MainWindow", "Loading map..."))
         self.tbTitle.setPlaceholderText(_translate("MainWindow", "Title"))
         self.btSkip.setText(_translate("MainWindow", "Skip"))
         self.btUpload.setText(_translate("MainWindow", "Upload"))
         self.menuFile.setTitle(_translate("MainWindow", "File"))
         self.menuSettings.setTitle(_translate("MainWindow", "Settings"))
         self.menuHelp.setTitle(_translate("MainWindow", "Help"))
+        self.dockQueue.setWindowTitle(_translate("MainWindow", "Upload Queue"))
+        self.btRetryFailed.setText(_translate("MainWindow", "Retry Failed"))
+        self.btClearQueue.setText(_translate("MainWindow", "Clear Uploaded"))
         self.actionQuit.setText(_translate("MainWindow", "Quit"))
         self.actionOptions.setText(_translate("MainWindow", "Options"))
         self.actionAbout.setText(_translate("MainWindow", "About"))
         self.actionReload.setText(_translate("MainWindow", "Reload"))
         self.actionLogout.setText(_translate("MainWindow", "Logout"))
-
-
-from PyQt6 import QtWebEngineWidgets
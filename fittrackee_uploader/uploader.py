@@ -1,81 +1,253 @@
 """Uploader Module."""
 
-import io
 import os
 import sys
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 from .configuration import Configuration
-from .fittrackee import FitTrackee
-import folium
 from .login import Login
+from .mapview import map_scripts, message_script
 from .options import Options
-from .templates import page_failed_to_load, page_no_gps_records, page_no_more_files
-from .workout import loader
-from PyQt6 import QtCore, QtWidgets
+from .scheme import register_scheme
+from .startup import StartupTrace
+from .templates import message_failed_to_load, message_no_more_files
+from PyQt6 import QtCore, QtGui, QtWidgets
 from .ui.main import Ui_MainWindow
 
+if TYPE_CHECKING:
+    from .prefetch import Prepared
 
-class Uploader(QtWidgets.QMainWindow):
-    """Uploader class."""
-
-    def __init__(self):
-        """Initialise the class."""
-        app = QtWidgets.QApplication(sys.argv)
-        super().__init__()
-        self.ui = Ui_MainWindow()
-        self.ui.setupUi(self)
-        self.setup_callbacks()
+# The network stack, the workout parsers and the web view are imported once the window is shown
+# pylint: disable=import-outside-toplevel
 
-        self.config = Configuration()
-        self.config.saveConfig()
 
-        self.api = FitTrackee()
+class Uploader(QtWidgets.QMainWindow):
+    """
+    Uploader class.
 
-        self.options_window = Options(self, self.config)
-        self.login_window = Login(self, self.config, self.api)
+    Parameters
+    ----------
+    trace : StartupTrace | None
+        Times of the start, reported once the window is ready.
+    """
 
-        self.login()
+    #: Emitted from a background thread with the name, status and change of a refreshed resource.
+    resourceRefreshed = QtCore.pyqtSignal(str, int, bool)
 
-        self.files = []
-        self.loader = loader.Loader()
-        self.sports = None
-        self.equipment = None
-        self.current_workout = None
+    #: Emitted from a background thread once the index of the workouts on the server is up to date.
+    indexSynced = QtCore.pyqtSignal()
 
-        self.completer_model = QtCore.QStringListModel(self.config.used_names)
-        self.completer = QtWidgets.QCompleter(self.completer_model, self)
-        self.ui.tbTitle.setCompleter(self.completer)
-        if self.config.folder != "":
-            self.loadFolder()
+    def __init__(self, trace: StartupTrace | None = None):
+        """
+        Initialise the class, showing the window before the map and the workouts are set up.
 
-        self.show()
+        Parameters
+        ----------
+        trace : StartupTrace | None
+            Times of the start, reported once the window is ready.
+        """
+        self.trace = StartupTrace() if trace is None else trace
+        with self.trace.phase("application"):
+            register_scheme()
+            # Needed by the web view created after the application
+            QtCore.QCoreApplication.setAttribute(QtCore.Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+            app = QtWidgets.QApplication(sys.argv)
+        with self.trace.phase("main window"):
+            super().__init__()
+            # Set up by finishStartup once the window is shown, the callbacks do nothing before
+            self.api = None
+            self.outbox = None
+            self.uploads = None
+            self.login_window = None
+            self.api_cache = None
+            self.refresher = None
+            self.index = None
+            self.tiles = None
+            self.map = None
+            self.loader = None
+            self.prefetcher = None
+            self.scanner = None
+
+            self.ui = Ui_MainWindow()
+            self.ui.setupUi(self)
+            self.setup_callbacks()
+
+            self.config = Configuration()
+            self.config.saveConfig()
+            self.options_window = Options(self, self.config)
+
+            # Indexes of the IDs by label, the window is filled from the cache before the server answers
+            self.sports = {}
+            self.equipment = {}
+            self.current_workout = None
+            self.current_gpx = None
+            self.current_report = None
+
+            self.completer_model = QtCore.QStringListModel(self.config.used_names)
+            self.completer = QtWidgets.QCompleter(self.completer_model, self)
+            self.ui.tbTitle.setCompleter(self.completer)
+
+            self.show()
+            app.processEvents()
+        self.trace.mark("window shown")
+
+        QtCore.QTimer.singleShot(0, self.finishStartup)
         sys.exit(app.exec())
 
+    def finishStartup(self) -> None:
+        """Log in, then set up the map and load the folder, once the window is shown."""
+        with self.trace.phase("api"):
+            from .apicache import RESOURCES, ApiCache
+            from .fittrackee import FitTrackee
+            from .outbox import Outbox
+            from .remoteindex import RemoteIndex
+            from .uploadqueue import UploadQueue
+
+            self.api = FitTrackee(pool_size=max(10, self.config.upload_workers))
+            self.outbox = Outbox(self.config.outbox_folder)
+            self.uploads = UploadQueue(
+                self.api, self.config, self.outbox, self.ui.listQueue, self.config.upload_workers
+            )
+            self.uploads.failed.connect(self.ui.dockQueue.show)
+            self.ui.btRetryFailed.clicked.connect(self.uploads.retryFailed)
+            self.ui.btClearQueue.clicked.connect(self.uploads.clearFinished)
+            self.login_window = Login(self, self.config, self.api)
+
+            self.api_cache = ApiCache(self.config.api_cache_path)
+            self.refresher = ThreadPoolExecutor(max_workers=len(RESOURCES))
+            self.resourceRefreshed.connect(self.showResource)
+            self.index = RemoteIndex(self.config.workout_index_path)
+            self.indexSynced.connect(self.showStats)
+            self.login()
+
+        with self.trace.phase("map view"):
+            from PyQt6.QtWebEngineWidgets import QWebEngineView
+            from .mappage import MapPage
+            from .tilecache import TileCache
+
+            self.tiles = TileCache(
+                self.config.tile_cache_folder, self.config.tile_cache_size * 1024**2, self.config.tile_ttl * 86400
+            )
+            view = QWebEngineView(parent=self.ui.mapContainer)
+            self.ui.labelMapLoading.hide()
+            self.ui.mapLayout.addWidget(view)
+            self.map = MapPage(view, self.tiles)
+
+        with self.trace.phase("workout loader"):
+            from .prefetch import Prefetcher
+            from .workout.cache import WorkoutCache
+            from .workout.loader import Loader
+            from .workout.scanner import FolderScanner
+
+            self.loader = Loader(WorkoutCache(self.config.cache_folder, self.config.cache_size * 1024**2))
+            self.prefetcher = Prefetcher(self.loader, self.config.prefetch_depth, self.config.reduction)
+            self.scanner = FolderScanner(Loader.filetypes, self.config.scan_subfolders)
+            if self.config.folder != "":
+                self.loadFolder()
+        self.trace.mark("ready")
+        self.trace.report()
+
     def login(self) -> None:
-        """Login."""
+        """Login with the saved token, showing the cached profile while it is checked in the background."""
+        from .apicache import RESOURCES
+
         if "" in [self.config.server_url, self.config.email, self.config.token]:
             self.showWindowonCenter(self.login_window)
         else:
             # Try saved token
             self.api.setUrl(self.config.server_url)
             self.api.setToken(self.config.token)
-            if not self.api.getUserInfo():
+            profile = self.api_cache.get(self.api.url, "profile")
+            if profile is not None:
+                self.loadProfile(profile)
+            self.loadSports(self.api_cache.get(self.api.url, "sports"))
+            self.loadEquipment(self.api_cache.get(self.api.url, "equipment"))
+            for name in RESOURCES:
+                self.refresher.submit(self.refreshResource, name)
+
+    def refreshResource(self, name: str) -> None:
+        """
+        Fetch a cached resource again, run in a background thread.
+
+        Parameters
+        ----------
+        name : str
+            Name of the resource.
+        """
+        import requests
+
+        try:
+            status, changed = self.api_cache.refresh(self.api, name)
+        except (requests.RequestException, ValueError, KeyError):
+            status, changed = 0, False
+        self.resourceRefreshed.emit(name, status, changed)
+
+    def showResource(self, name: str, status: int, changed: bool) -> None:
+        """
+        Update the window once a resource was fetched again.
+
+        Parameters
+        ----------
+        name : str
+            Name of the resource.
+        status : int
+            Status of the answer, 0 if the server could not be reached.
+        changed : bool
+            Whether the data differs from the cached one.
+        """
+        data = self.api_cache.get(self.api.url, name)
+        if name == "profile":
+            if status in (401, 403):
+                self.logout()
+            elif status not in (200, 304) and data is None:
                 self.showWindowonCenter(self.login_window)
-            else:
-                self.loadSports()
-                self.loadEquipment()
-                self.ui.labelLoginStats.setText(f"Logged in as {self.api.user} on {self.api.url}")
-                self.ui.btUpload.setEnabled(True)
+            elif changed:
+                self.loadProfile(data)
+            if status in (200, 304):
+                self.refresher.submit(self.syncIndex)
+        elif changed and name == "sports":
+            self.loadSports(data)
+        elif changed and name == "equipment":
+            self.loadEquipment(data)
+
+    def syncIndex(self) -> None:
+        """Update the index of the workouts on the server, run in a background thread."""
+        import requests
+
+        try:
+            self.index.sync(self.api)
+        except (requests.RequestException, ValueError, KeyError):
+            return
+        self.indexSynced.emit()
+
+    def loadProfile(self, profile: dict) -> None:
+        """
+        Show the logged in user.
+
+        Parameters
+        ----------
+        profile : dict
+            Profile of the user.
+        """
+        self.api.user = profile["username"]
+        self.ui.labelLoginStats.setText(f"Logged in as {self.api.user} on {self.api.url}")
+        self.ui.btUpload.setEnabled(True)
+        # Uploads interrupted by a crash or left offline in a previous session
+        self.uploads.resume()
 
     def logout(self) -> None:
         """Logout."""
+        if self.api is None:
+            return
         self.ui.btUpload.setEnabled(False)
         self.config.token = ""
         self.config.saveConfig()
+        self.api_cache.clear()
         self.ui.labelLoginStats.setText("")
-        self.ui.cbSportType.clear()
-        self.ui.cbEquipment.clear()
+        self.loadSports(None)
+        self.loadEquipment(None)
         self.login()
 
     def setup_callbacks(self) -> None:
@@ -94,22 +266,33 @@ class Uploader(QtWidgets.QMainWindow):
 
     def loadFolder(self, path=None) -> None:
         """
-        Load folder.
+        Load folder, or only its new and changed files when it is loaded again.
 
         Parameters
         ----------
         path : str
             Path to load.
         """
+        if self.scanner is None:
+            return
         if path is None or path is False:
             path = self.config.folder
         if os.path.isdir(path):
-            self.files.clear()
-            for file_name in os.listdir(path):
-                file_path = os.path.join(path, file_name)
-                if os.path.isfile(file_path):
-                    self.files.append(file_path)
-            self.loadNextFile()
+            reload = path == self.scanner.root
+            changes = self.scanner.scan(path)
+            # Files still in the upload queue were already reviewed
+            pending = self.uploads.getPendingPaths()
+            files = [file_path for file_path in changes.added + changes.changed if file_path not in pending]
+            if not reload:
+                # Cancels the work prepared for the previous files
+                self.prefetcher.reset(files)
+                self.loadNextFile()
+                return
+            self.prefetcher.discard(set(changes.changed + changes.removed))
+            self.prefetcher.extend(sorted(files))
+            current = None if self.current_workout is None else str(self.current_workout.getFilePath())
+            if current is None or current in changes.removed:
+                self.loadNextFile()
 
     def loadFile(self, path) -> None:
         """
@@ -120,34 +303,92 @@ class Uploader(QtWidgets.QMainWindow):
         path : str
             File to load.
         """
-        if os.path.isfile(path):
-            try:
-                self.current_workout = self.loader.loadFile(path)
-            except:
-                self.current_workout = None
-                self.ui.labelStats.setText("")
-                self.ui.btUpload.setEnabled(False)
-                if self.config.auto_skip:
-                    self.skipFile()
-                else:
-                    self.ui.webMap.setHtml(page_failed_to_load)
-            self.ui.statusbar.showMessage(path)
+        from .prefetch import prepare
+
+        if self.loader is not None and os.path.isfile(path):
+            self.showWorkout(prepare(self.loader, path, self.prefetcher.reduction))
+
+    def showWorkout(self, prepared: "Prepared") -> None:
+        """
+        Show a prepared workout.
+
+        Parameters
+        ----------
+        prepared : Prepared
+            Workout with its map and upload payload.
+        """
+        self.ui.statusbar.showMessage(prepared.path)
+        self.current_workout = prepared.workout
+        self.current_gpx = prepared.gpx
+        self.current_report = prepared.report
+        try:
+            if prepared.error is not None:
+                raise prepared.error
             if self.current_workout is not None:
-                self.setMap(self.current_workout)
-                stats = f'{self.current_workout.getDate().strftime("%d %b, %Y")} {self.current_workout.getTime()} {self.current_workout.getDistance():.2f} km'
-                self.ui.labelStats.setText(stats)
+                self.showStats()
+                self.setMap(self.current_workout, prepared.scripts)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.current_workout = None
+            self.current_gpx = None
+            self.ui.labelStats.setText("")
+            self.ui.btUpload.setEnabled(False)
+            if self.config.auto_skip:
+                self.skipFile()
+            else:
+                self.map.run([message_script(message_failed_to_load)])
+
+    def showStats(self) -> None:
+        """Show the date, time and distance of the current workout, flagging it if it is already on the server."""
+        if self.current_workout is None or self.index is None:
+            return
+        stats = f'{self.current_workout.getDate().strftime("%d %b, %Y")} {self.current_workout.getTime()} {self.current_workout.getDistance():.2f} km'
+        duplicate = self.index.findDuplicate(self.current_workout)
+        if duplicate is not None:
+            stats += f" - already uploaded as {duplicate}"
+        if self.current_report is not None:
+            stats += f" - upload {self.current_report}"
+        self.ui.labelStats.setText(stats)
+
+    def showSummary(self, path: str) -> None:
+        """
+        Show the date, time and distance of a workout from its summary, while its track and map are prepared.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        """
+        try:
+            workout = self.loader.loadFile(path, lazy=True)
+            if workout is None:
+                return
+            stats = f'{workout.getDate().strftime("%d %b, %Y")} {workout.getTime()}'
+            # The distance of a GPX file is only known from its track
+            if workout.isLoaded() or workout.distance is not None:
+                stats += f" {workout.getDistance():.2f} km"
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Reported once the workout is prepared
+            return
+        self.ui.statusbar.showMessage(path)
+        self.ui.labelStats.setText(stats)
+        QtWidgets.QApplication.processEvents()
 
     def loadNextFile(self) -> None:
-        """Load the next file."""
-        if len(self.files) > 0:
-            file_path = self.files.pop(0)
-            self.loadFile(file_path)
+        """Load the next file, usually already prepared in the background."""
+        path = self.prefetcher.peek()
+        if path is not None:
+            self.showSummary(path)
+        prepared = self.prefetcher.next()
+        if prepared is not None:
+            self.showWorkout(prepared)
         else:
+            self.current_workout = None
+            self.current_gpx = None
             self.setMap(None)
             self.ui.statusbar.clearMessage()
             self.ui.labelStats.setText("")
 
-    def setMap(self, wo: str) -> None:
+    def setMap(self, wo: str, scripts: list[str] | None = None) -> None:
         """
         Set the map.
 
@@ -155,67 +396,54 @@ class Uploader(QtWidgets.QMainWindow):
         ----------
         wo : str
             Workout to set the map for.
+        scripts : list[str] | None
+            Scripts showing the workout prepared in advance, prepared now if None.
         """
         if wo is None:
             self.ui.btUpload.setEnabled(False)
-            self.ui.webMap.setHtml(page_no_more_files)
-        elif len(wo.points) == 0:
-            self.ui.btUpload.setEnabled(True)
-            self.ui.webMap.setHtml(page_no_gps_records)
+            self.map.run([message_script(message_no_more_files)])
         else:
             self.ui.btUpload.setEnabled(True)
-            m = folium.Map(tiles="OpenStreetMap")
-
-            m.fit_bounds(wo.getExtent())
-
-            path = folium.PolyLine(wo.getPath(), color="#0000FF")
-            path.add_to(m)
-
-            startPoint = folium.CircleMarker(
-                location=wo.points[0].position,
-                radius=6,
-                color="green",
-                stroke=False,
-                fill=True,
-                fill_opacity=1,
-                opacity=1,
-                tooltip="Start",
-            )
-            startPoint.add_to(m)
-
-            finishPoint = folium.CircleMarker(
-                location=wo.points[-1].position,
-                radius=6,
-                color="red",
-                stroke=False,
-                fill=True,
-                fill_opacity=1,
-                opacity=1,
-                tooltip="Finish",
-            )
-            finishPoint.add_to(m)
+            self.map.run(map_scripts(wo) if scripts is None else scripts)
 
-            data = io.BytesIO()
-            m.save(data, close_file=False)
+    def loadSports(self, data: dict | None) -> None:
+        """
+        Load sports, keeping the selected one.
 
-            self.ui.webMap.setHtml(data.getvalue().decode())
+        Parameters
+        ----------
+        data : dict | None
+            Sports given by the server, None to empty the list.
+        """
+        from .fittrackee import active_sports
 
-    def loadSports(self) -> None:
-        """Load sports."""
-        self.sports = self.api.get_sports(True)
+        current = self.ui.cbSportType.currentText()
+        sports = [] if data is None else active_sports(data["sports"])
+        self.sports = {sport["label"]: sport["id"] for sport in sports}
         self.ui.cbSportType.clear()
-        if self.sports is not None:
-            for sport in self.sports:
-                self.ui.cbSportType.addItem(sport["label"])
+        self.ui.cbSportType.addItems(list(self.sports))
+        if current in self.sports:
+            self.ui.cbSportType.setCurrentText(current)
+
+    def loadEquipment(self, data: dict | None) -> None:
+        """
+        Load equipment, keeping the selected one.
+
+        Parameters
+        ----------
+        data : dict | None
+            Equipment given by the server, None to empty the list.
+        """
+        from .fittrackee import active_equipment
 
-    def loadEquipment(self) -> None:
-        """Load equipment."""
-        self.equipment = self.api.get_equipment(True)
+        current = self.ui.cbEquipment.currentText()
+        equipment = [] if data is None else active_equipment(data["equipments"])
+        self.equipment = {item["label"]: item["id"] for item in equipment}
         self.ui.cbEquipment.clear()
         self.ui.cbEquipment.addItem("No Equipment")
-        if self.equipment is not None:
-            for item in self.equipment:
-                self.ui.cbEquipment.addItem(item["label"])
+        self.ui.cbEquipment.addItems(list(self.equipment))
+        if current in self.equipment:
+            self.ui.cbEquipment.setCurrentText(current)
 
     def getSportID(self, sport_name: str) -> int:
         """
@@ -231,11 +459,7 @@ class Uploader(QtWidgets.QMainWindow):
         int
             Integer code for sport id.
         """
-        if len(self.sports) > 0:
-            for sport in self.sports:
-                if sport["label"] == sport_name:
-                    return sport["id"]
-        return -1
+        return self.sports.get(sport_name, -1)
 
     def getEquipmentID(self, equipment_name: str) -> int:
         """
@@ -253,16 +477,14 @@ class Uploader(QtWidgets.QMainWindow):
         """
         if equipment_name == "No Equipment":
             return ""
-        if len(self.equipment) > 0:
-            for item in self.equipment:
-                if item["label"] == equipment_name:
-                    return item["id"]
-        return ""
+        return self.equipment.get(equipment_name, "")
 
     def upload(self) -> None:
-        """Upload track."""
-        result = None
-        sport_id = self.getSportID(self.ui.cbSportType.currentText())
+        """Queue the track for upload and show the next one right away."""
+        if self.outbox is None or self.current_workout is None:
+            return
+        sport_name = self.ui.cbSportType.currentText()
+        sport_id = self.getSportID(sport_name)
         equipment_id = self.getEquipmentID(self.ui.cbEquipment.currentText())
         title = self.ui.tbTitle.text()
         self.config.used_names.add(title)
@@ -273,45 +495,24 @@ class Uploader(QtWidgets.QMainWindow):
         else:
             notes = ""
 
-        if len(self.current_workout.points) == 0:
-            date = self.current_workout.getDate().strftime("%Y-%m-%d %H:%M")
-            duration = self.current_workout.getTime().total_seconds()
-            distance = self.current_workout.getDistance()
-            ascent = self.current_workout.ascent
-            descent = self.current_workout.descent
-            result = self.api.add_workout_no_gpx(date, duration, distance, sport_id, title, notes, ascent, descent)
-        else:
-            gpx = self.current_workout.getGPX()
-            result = self.api.add_workout(gpx, sport_id, equipment_id, title, notes)
-
-        if result:
-            self.ui.tbTitle.setText("")
-            if self.config.move_after_upload:
-                if os.path.isdir(self.config.uploaded_folder):
-                    file_name = os.path.basename(self.current_workout.getFilePath())
-                    if self.config.add_info_to_file_name:
-                        sport_name = self.ui.cbSportType.currentText()
-                        sport_name = sport_name.split("(")[0]
-                        sport_name = sport_name.lower().replace(" ", "")
-                        new_file_name = (
-                            f"{os.path.splitext(file_name)[0]}_{sport_name}_{title}{os.path.splitext(file_name)[1]}"
-                        )
-                    else:
-                        new_file_name = file_name
-                    new_file_path = os.path.join(self.config.uploaded_folder, new_file_name)
-                    os.rename(self.current_workout.getFilePath(), new_file_path)
-            self.loadNextFile()
-        else:
-            msg = QtWidgets.QMessageBox()
-            msg.setIcon(QtWidgets.QMessageBox.Icon.Warning)
-            msg.setText("Upload Failed")
-            msg.setWindowTitle("Error")
-            msg.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Ok)
-            msg.exec()
+        path = str(self.current_workout.getFilePath())
+        try:
+            upload_id = self.outbox.add(
+                path, self.current_workout, self.current_gpx, sport_id, sport_name, equipment_id, title, notes
+            )
+        except ValueError as e:
+            self.ui.statusbar.showMessage(f"{path}: {e}")
+            return
+        from .uploadqueue import UploadItem
+
+        self.uploads.add(UploadItem(upload_id, path, sport_name, title))
+        self.ui.tbTitle.setText("")
+        self.loadNextFile()
 
     def skipFile(self) -> None:
         """Skip file."""
-        self.loadNextFile()
+        if self.prefetcher is not None:
+            self.loadNextFile()
 
     def showWindowonCenter(self, window: None) -> None:
         """
@@ -334,6 +535,29 @@ class Uploader(QtWidgets.QMainWindow):
         """Show options."""
         self.showWindowonCenter(self.options_window)
 
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:  # pylint: disable=invalid-name
+        """
+        Stop the background work when the window is closed, letting the queued uploads finish.
+
+        Parameters
+        ----------
+        event : QtGui.QCloseEvent
+            Close event.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        if self.refresher is not None:
+            self.refresher.shutdown(wait=False, cancel_futures=True)
+        if self.uploads is not None:
+            self.uploads.waitForDone()
+        if self.outbox is not None:
+            self.outbox.close()
+        if self.index is not None:
+            self.index.close()
+        if self.api is not None:
+            self.api.close()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
     uploader = Uploader()
@@ -0,0 +1,311 @@
+"""Upload workouts in the background while the next ones are reviewed."""
+
+import os
+
+import requests
+from PyQt6 import QtCore, QtWidgets
+
+from .configuration import Configuration
+from .fittrackee import FitTrackee
+from .outbox import FAILED as OUTBOX_FAILED
+from .outbox import Outbox
+
+# pylint: disable=too-few-public-methods
+# pylint: disable=too-many-arguments
+
+#: Statuses of the items of the queue.
+QUEUED = "Queued"
+UPLOADING = "Uploading"
+UPLOADED = "Uploaded"
+FAILED = "Failed"
+OFFLINE = "Offline"
+
+#: Milliseconds between attempts to reach the server again while offline.
+OFFLINE_RETRY_INTERVAL = 60000
+
+
+class UploadItem:
+    """
+    Upload of the outbox shown in the queue panel.
+
+    Parameters
+    ----------
+    upload_id : int
+        ID of the upload in the outbox.
+    path : str
+        Path to the workout file.
+    sport_name : str
+        Label of the sport.
+    title : str
+        Title for workout.
+    """
+
+    def __init__(self, upload_id: int, path: str, sport_name: str, title: str):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload in the outbox.
+        path : str
+            Path to the workout file.
+        sport_name : str
+            Label of the sport.
+        title : str
+            Title for workout.
+        """
+        self.upload_id = upload_id
+        self.path = path
+        self.sport_name = sport_name
+        self.title = title
+        self.status = QUEUED
+        self.error = ""
+        self.row = None
+
+    def getText(self) -> str:
+        """
+        Get the text of the item in the queue panel.
+
+        Returns
+        -------
+        str
+            Status, file name, sport, title and error.
+        """
+        text = f"{self.status}: {os.path.basename(self.path)} ({self.sport_name}"
+        text += f", {self.title})" if self.title != "" else ")"
+        if self.error != "":
+            text += f" - {self.error}"
+        return text
+
+
+class UploadTask(QtCore.QRunnable):
+    """
+    Remaining steps of one upload of the outbox in a thread of the pool.
+
+    Parameters
+    ----------
+    queue : UploadQueue
+        Queue emitting the signals of the upload.
+    item : UploadItem
+        Upload to run.
+    """
+
+    def __init__(self, queue: "UploadQueue", item: UploadItem):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        queue : UploadQueue
+            Queue emitting the signals of the upload.
+        item : UploadItem
+            Upload to run.
+        """
+        super().__init__()
+        self.queue = queue
+        self.item = item
+
+    def run(self) -> None:
+        """Upload the workout, signals are delivered in the thread of the queue."""
+        item = self.item
+        self.queue.started.emit(item)
+        try:
+            entry = self.queue.outbox.process(item.upload_id, self.queue.api, self.queue.config)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.queue.failed.emit(item, str(e), True)
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.queue.failed.emit(item, str(e), False)
+            return
+        if entry["state"] == OUTBOX_FAILED:
+            self.queue.failed.emit(item, entry["error"], False)
+            return
+        self.queue.succeeded.emit(item)
+
+
+class UploadQueue(QtCore.QObject):
+    """
+    Uploads of the outbox run by a thread pool and shown in a list widget.
+
+    Uploads that failed because the server could not be reached are started again as soon as another upload gets
+    through, and every ``OFFLINE_RETRY_INTERVAL`` otherwise, so workouts queued offline are flushed once the
+    connection is back.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API, shared by the threads.
+    config : Configuration
+        Configuration with the move after upload options.
+    outbox : Outbox
+        Journal of the uploads.
+    view : QtWidgets.QListWidget
+        List showing the queue.
+    workers : int
+        Concurrent uploads.
+    """
+
+    started = QtCore.pyqtSignal(object)
+    succeeded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(object, str, bool)
+
+    def __init__(
+        self, api: FitTrackee, config: Configuration, outbox: Outbox, view: QtWidgets.QListWidget, workers: int = 2
+    ):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        api : FitTrackee
+            Logged in API, shared by the threads.
+        config : Configuration
+            Configuration with the move after upload options.
+        outbox : Outbox
+            Journal of the uploads.
+        view : QtWidgets.QListWidget
+            List showing the queue.
+        workers : int
+            Concurrent uploads.
+        """
+        super().__init__(view)
+        self.api = api
+        self.config = config
+        self.outbox = outbox
+        self.view = view
+        self.items = []
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self.started.connect(self.itemStarted)
+        self.succeeded.connect(self.itemSucceeded)
+        self.failed.connect(self.itemFailed)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(OFFLINE_RETRY_INTERVAL)
+        self.timer.timeout.connect(self.retryOffline)
+
+    def add(self, item: UploadItem) -> None:
+        """
+        Show an upload of the outbox and start it.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Upload to run.
+        """
+        item.row = QtWidgets.QListWidgetItem(item.getText())
+        self.view.addItem(item.row)
+        self.items.append(item)
+        self.submit(item)
+
+    def resume(self) -> None:
+        """Start the uploads left in the outbox by a previous session."""
+        self.outbox.purge()
+        known = {item.upload_id for item in self.items}
+        for entry in self.outbox.getPending():
+            if entry["id"] not in known:
+                self.add(UploadItem(entry["id"], entry["path"], entry["sport_name"], entry["title"]))
+
+    def submit(self, item: UploadItem) -> None:
+        """
+        Start an upload in the pool.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Upload to run.
+        """
+        item.status = QUEUED
+        item.error = ""
+        self.update(item)
+        self.pool.start(UploadTask(self, item))
+
+    def update(self, item: UploadItem) -> None:
+        """
+        Show the status of an item.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Item to show.
+        """
+        item.row.setText(item.getText())
+        self.view.scrollToItem(item.row)
+
+    def itemStarted(self, item: UploadItem) -> None:
+        """
+        Show that an upload started.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Item being uploaded.
+        """
+        item.status = UPLOADING
+        self.update(item)
+
+    def itemSucceeded(self, item: UploadItem) -> None:
+        """
+        Show that an upload succeeded and start those waiting for the connection.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Uploaded item.
+        """
+        item.status = UPLOADED
+        self.update(item)
+        self.retryOffline()
+
+    def itemFailed(self, item: UploadItem, error: str, offline: bool) -> None:
+        """
+        Show that an upload failed, keeping it for a retry.
+
+        Parameters
+        ----------
+        item : UploadItem
+            Item that failed.
+        error : str
+            Reason of the failure.
+        offline : bool
+            Whether the server could not be reached.
+        """
+        item.status = OFFLINE if offline else FAILED
+        item.error = error
+        self.update(item)
+        if offline and not self.timer.isActive():
+            self.timer.start()
+
+    def retryOffline(self) -> None:
+        """Upload again the items that could not reach the server."""
+        self.timer.stop()
+        for item in self.items:
+            if item.status == OFFLINE:
+                self.submit(item)
+
+    def retryFailed(self) -> None:
+        """Upload the failed items again, each one resumes from the last step it reached."""
+        for item in self.items:
+            if item.status in (FAILED, OFFLINE):
+                self.submit(item)
+
+    def clearFinished(self) -> None:
+        """Remove the uploaded items from the queue."""
+        for item in [item for item in self.items if item.status == UPLOADED]:
+            self.view.takeItem(self.view.row(item.row))
+            self.items.remove(item)
+
+    def getPendingPaths(self) -> set[str]:
+        """
+        Get the files still in the queue, not to show them again for review.
+
+        Returns
+        -------
+        set[str]
+            Paths of the items not uploaded yet, failed ones included.
+        """
+        return {item.path for item in self.items if item.status != UPLOADED}
+
+    def waitForDone(self) -> None:
+        """Wait for the uploads already started or queued."""
+        self.pool.waitForDone()
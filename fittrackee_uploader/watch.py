@@ -0,0 +1,669 @@
+"""Watch a folder and upload the workouts arriving in it, without the GUI."""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .batch import find_item
+from .configuration import Configuration
+from .fittrackee import FitTrackee
+from .outbox import FAILED, Outbox, UploadBusy
+from .remoteindex import RemoteIndex
+from .workout.loader import Loader
+from .workout.reduce import reduce_gpx
+from .workout.scanner import FolderScanner
+
+# pylint: disable=too-many-arguments,too-few-public-methods
+
+#: Seconds a file must keep the same size and modification time before it is uploaded.
+SETTLE_TIME = 2.0
+
+#: Seconds between two scans when inotify is not available.
+POLL_INTERVAL = 5.0
+
+#: Seconds between two attempts at uploads that failed to reach the server.
+RETRY_INTERVAL = 60.0
+
+#: Events of ``inotify`` that start a scan.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """
+    Wake up at a fixed interval, on systems or file systems without ``inotify``.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between two scans.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        interval : float
+            Seconds between two scans.
+        """
+        self.interval = interval
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait for the next scan.
+
+        Parameters
+        ----------
+        timeout : float
+            Longest wait in seconds.
+
+        Returns
+        -------
+        bool
+            True once the interval elapsed, the folder may have changed.
+        """
+        time.sleep(min(timeout, self.interval))
+        return timeout >= self.interval
+
+    def busy(self, path: str) -> bool:  # pylint: disable=unused-argument
+        """
+        Tell whether a file is still open for writing, which polling cannot know.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+
+        Returns
+        -------
+        bool
+            Always False.
+        """
+        return False
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class InotifyWatcher:
+    """
+    Wake up as soon as the kernel reports a change in the folder, with ``inotify`` called through ``ctypes``.
+
+    Files are known to be written from their first change until they are closed, so a slow copy pausing longer than the
+    settle time is not picked up half written.
+
+    Parameters
+    ----------
+    folder : str
+        Folder to watch.
+    recursive : bool
+        Watch the subfolders too, including those created later.
+
+    Raises
+    ------
+    OSError
+        If ``inotify`` is not available or the folder cannot be watched.
+    """
+
+    def __init__(self, folder: str, recursive: bool = False) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        folder : str
+            Folder to watch.
+        recursive : bool
+            Watch the subfolders too, including those created later.
+        """
+        name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.recursive = recursive
+        self.folders: dict[int, str] = {}
+        self.writing: set[str] = set()
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        try:
+            self._add(folder)
+            if recursive:
+                for parent, folders, _ in os.walk(folder):
+                    folders[:] = [name for name in folders if not name.startswith(".")]
+                    for name in folders:
+                        self._add(os.path.join(parent, name))
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add(self, folder: str) -> None:
+        """
+        Watch a folder.
+
+        Parameters
+        ----------
+        folder : str
+            Folder to watch.
+        """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), _IN_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), folder)
+        self.folders[wd] = folder
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait for changes in the folder.
+
+        Parameters
+        ----------
+        timeout : float
+            Longest wait in seconds.
+
+        Returns
+        -------
+        bool
+            True if something changed.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if wd not in self.folders:
+                continue
+            path = os.path.join(self.folders[wd], os.fsdecode(name))
+            if not mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MODIFY):
+                    self.writing.add(path)
+                elif mask & (_IN_CLOSE_WRITE | _IN_DELETE | _IN_MOVED_FROM):
+                    self.writing.discard(path)
+            if self.recursive and mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                try:
+                    self._add(path)
+                except OSError:
+                    # Gone already
+                    pass
+        return True
+
+    def busy(self, path: str) -> bool:
+        """
+        Tell whether a file is still open for writing.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file.
+
+        Returns
+        -------
+        bool
+            True if the file changed and was not closed since.
+        """
+        return path in self.writing
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self.fd)
+
+
+def open_watcher(folder: str, recursive: bool = False, poll: float | None = None):
+    """
+    Watch a folder with ``inotify`` where possible, by polling otherwise.
+
+    Parameters
+    ----------
+    folder : str
+        Folder to watch.
+    recursive : bool
+        Watch the subfolders too.
+    poll : float | None
+        Seconds between two scans to always poll, for network shares where ``inotify`` misses remote changes.
+
+    Returns
+    -------
+    InotifyWatcher | PollingWatcher
+        Watcher of the folder.
+    """
+    if poll is None and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder, recursive)
+        except OSError as e:
+            print(f"inotify not available, polling every {POLL_INTERVAL:g} s: {e}")
+    return PollingWatcher(POLL_INTERVAL if poll is None else poll)
+
+
+class FolderWatch:
+    """
+    Report the workout files of a folder once they stopped changing.
+
+    Files written by a device sync are seen while they grow, so a file is only ready after keeping the same size and
+    modification time for ``settle`` seconds.
+
+    Parameters
+    ----------
+    folder : str
+        Folder to watch.
+    scanner : FolderScanner
+        Scanner of the folder.
+    watcher : InotifyWatcher | PollingWatcher
+        Source of the wake ups.
+    settle : float
+        Seconds a file must stay unchanged.
+    """
+
+    def __init__(self, folder: str, scanner: FolderScanner, watcher, settle: float = SETTLE_TIME) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        folder : str
+            Folder to watch.
+        scanner : FolderScanner
+            Scanner of the folder.
+        watcher : InotifyWatcher | PollingWatcher
+            Source of the wake ups.
+        settle : float
+            Seconds a file must stay unchanged.
+        """
+        self.folder = folder
+        self.scanner = scanner
+        self.watcher = watcher
+        self.settle = settle
+        self.waiting: dict[str, float] = {}
+
+    def start(self, existing: bool = True) -> None:
+        """
+        Take the first snapshot of the folder.
+
+        Parameters
+        ----------
+        existing : bool
+            Report the files already in the folder, otherwise only files arriving later are.
+        """
+        changes = self.scanner.scan(self.folder)
+        if existing:
+            now = time.monotonic()
+            self.waiting.update(dict.fromkeys(changes.added, now - self.settle))
+
+    def next(self, timeout: float) -> list[str]:
+        """
+        Wait for files to settle.
+
+        Parameters
+        ----------
+        timeout : float
+            Longest wait in seconds.
+
+        Returns
+        -------
+        list[str]
+            Paths of the files ready to upload, possibly none.
+        """
+        # Files still open are reported by the watcher once closed
+        settling = [seen for path, seen in self.waiting.items() if not self.watcher.busy(path)]
+        if settling:
+            timeout = min(timeout, max(0.0, min(settling) + self.settle - time.monotonic()))
+        woken = self.watcher.wait(timeout)
+        now = time.monotonic()
+        if woken or self.waiting:
+            changes = self.scanner.scan(self.folder)
+            for path in changes.added + changes.changed:
+                self.waiting[path] = now
+            for path in changes.removed:
+                self.waiting.pop(path, None)
+        ready = sorted(
+            path for path, seen in self.waiting.items() if now - seen >= self.settle and not self.watcher.busy(path)
+        )
+        for path in ready:
+            del self.waiting[path]
+        return ready
+
+
+def classify(workout, sports: list[dict], default: dict | None) -> dict | None:
+    """
+    Choose the sport of a workout from its file, falling back to a default one.
+
+    Parameters
+    ----------
+    workout : Workout
+        Workout to classify.
+    sports : list[dict]
+        Active sports of the user.
+    default : dict | None
+        Sport of the workouts not recognised.
+
+    Returns
+    -------
+    dict | None
+        Sport or None if it is neither recognised nor given.
+    """
+    try:
+        sport_id = workout.getSport()
+    except (AttributeError, KeyError):
+        sport_id = None
+    for sport in sports:
+        if sport["id"] == sport_id:
+            return sport
+    return default
+
+
+class WatchSetup:
+    """
+    Server, sports and equipment the watch uploads with.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API.
+    sports : list[dict]
+        Active sports of the user.
+    default : dict | None
+        Sport of the workouts not recognised.
+    equipment_id : str
+        Equipment ID, empty for none.
+    """
+
+    def __init__(self, api: FitTrackee, sports: list[dict], default: dict | None, equipment_id: str) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        api : FitTrackee
+            Logged in API.
+        sports : list[dict]
+            Active sports of the user.
+        default : dict | None
+            Sport of the workouts not recognised.
+        equipment_id : str
+            Equipment ID, empty for none.
+        """
+        self.api = api
+        self.sports = sports
+        self.default = default
+        self.equipment_id = equipment_id
+
+
+def setup_watch(args: argparse.Namespace, config: Configuration) -> WatchSetup | None:
+    """
+    Log in and look up the sport and equipment given on the command line.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+    config : Configuration
+        Configuration with the server and token.
+
+    Returns
+    -------
+    WatchSetup | None
+        Server, sports and equipment, None if not logged in or the sport or equipment is unknown.
+    """
+    api = FitTrackee(pool_size=args.uploads)
+    api.setUrl(config.server_url)
+    api.setToken(config.token)
+    if config.token == "" or not api.getUserInfo():
+        print("Not logged in, log in once with the GUI to store a token.")
+        return None
+    sports = api.get_sports(True) or []
+    default = None
+    if args.sport is not None:
+        default = find_item(sports, args.sport)
+        if default is None:
+            print(f"Unknown sport: '{args.sport}'")
+            return None
+    equipment_id = ""
+    if args.equipment is not None:
+        equipment = find_item(api.get_equipment(True), args.equipment)
+        if equipment is None:
+            print(f"Unknown equipment: '{args.equipment}'")
+            return None
+        equipment_id = equipment["id"]
+    return WatchSetup(api, sports, default, equipment_id)
+
+
+class WatchUploader:
+    """
+    Upload the files handed over by the watch, run in worker threads.
+
+    Uploads whose last attempt did not reach the server are kept aside and handed back by ``takeOffline``.
+
+    Parameters
+    ----------
+    setup : WatchSetup
+        Server, sports and equipment.
+    config : Configuration
+        Configuration with the upload options.
+    outbox : Outbox
+        Journal of the uploads.
+    index : RemoteIndex | None
+        Index of the workouts on the server, None to upload duplicates.
+    title : str
+        Title of the workouts.
+    """
+
+    def __init__(
+        self, setup: WatchSetup, config: Configuration, outbox: Outbox, index: RemoteIndex | None, title: str
+    ) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        setup : WatchSetup
+            Server, sports and equipment.
+        config : Configuration
+            Configuration with the upload options.
+        outbox : Outbox
+            Journal of the uploads.
+        index : RemoteIndex | None
+            Index of the workouts on the server, None to upload duplicates.
+        title : str
+            Title of the workouts.
+        """
+        self.setup = setup
+        self.config = config
+        self.outbox = outbox
+        self.index = index
+        self.title = title
+        self.loader = Loader()
+        self.reduction = config.reduction
+        self.lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self.offline = set()
+
+    def process(self, upload_id: int, path: str) -> None:
+        """
+        Run the remaining steps of an upload.
+
+        Parameters
+        ----------
+        upload_id : int
+            ID of the upload.
+        path : str
+            Path to the workout file.
+        """
+        try:
+            entry = self.outbox.process(upload_id, self.setup.api, self.config)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            with self.lock:
+                self.offline.add(upload_id)
+            print(f"Offline, will retry: {path}: {e}", flush=True)
+            return
+        except UploadBusy:
+            print(f"Uploading in another process: {path}", flush=True)
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed: {path}: {e}", flush=True)
+            return
+        if entry["state"] == FAILED:
+            print(f"Failed: {path}: {entry['error']}", flush=True)
+            return
+        print(f"Uploaded: {path}", flush=True)
+        if self.index is not None:
+            # Another copy of the same activity, from a second device, is recognised when it arrives
+            try:
+                with self.index_lock:
+                    self.index.sync(self.setup.api)
+            except requests.RequestException:
+                pass
+
+    def upload(self, path: str) -> None:
+        """
+        Queue a workout file in the outbox and upload it.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        """
+        try:
+            # The duplicate check and the sport only need the summary, the track is decoded for the payload
+            workout = self.loader.loadFile(path, lazy=True)
+            if workout is None:
+                return
+            duplicate = None if self.index is None else self.index.findDuplicate(workout)
+            if duplicate is not None:
+                print(f"Already uploaded as {duplicate}: {path}", flush=True)
+                return
+            sport = classify(workout, self.setup.sports, self.setup.default)
+            if sport is None:
+                print(f"Sport not recognised, give one with --sport: {path}", flush=True)
+                return
+            notes = workout.getStats() if self.config.add_stats else ""
+            gpx = None
+            if self.reduction is not None and len(workout.points) > 0:
+                gpx, report = reduce_gpx(workout, self.reduction)
+                if gpx is not None:
+                    print(f"Reduced: {path}: {report}", flush=True)
+            upload_id = self.outbox.add(
+                path, workout, gpx, sport["id"], sport["label"], self.setup.equipment_id, self.title, notes
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to load: {path}: {e}", flush=True)
+            return
+        self.process(upload_id, path)
+
+    def takeOffline(self) -> list[int]:
+        """
+        Take the uploads that did not reach the server, to try them again.
+
+        Returns
+        -------
+        list[int]
+            IDs of the uploads.
+        """
+        with self.lock:
+            upload_ids = list(self.offline)
+            self.offline.clear()
+        return upload_ids
+
+
+def watch_loop(watch: FolderWatch, uploader: WatchUploader, workers: int) -> None:
+    """
+    Hand the settled files to the upload threads until interrupted, trying offline uploads again regularly.
+
+    Parameters
+    ----------
+    watch : FolderWatch
+        Started watch of the folder.
+    uploader : WatchUploader
+        Uploader of the files.
+    workers : int
+        Number of uploads run at the same time.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") as executor:
+        # Uploads left by a previous run or by the GUI
+        for entry in uploader.outbox.getPending():
+            executor.submit(uploader.process, entry["id"], entry["path"])
+        retry = time.monotonic() + RETRY_INTERVAL
+        try:
+            while True:
+                for path in watch.next(max(0.0, retry - time.monotonic())):
+                    executor.submit(uploader.upload, path)
+                if time.monotonic() >= retry:
+                    retry = time.monotonic() + RETRY_INTERVAL
+                    for upload_id in uploader.takeOffline():
+                        entry = uploader.outbox.get(upload_id)
+                        executor.submit(uploader.process, upload_id, entry["path"])
+        except KeyboardInterrupt:
+            print("Stopping, waiting for the running uploads", flush=True)
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    """
+    Upload the workouts arriving in a folder until interrupted.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    Returns
+    -------
+    int
+        Exit status, 0 when stopped with Ctrl+C or SIGTERM.
+    """
+    config = Configuration()
+    folder = args.folder or config.folder
+    if not os.path.isdir(folder):
+        print(f"Folder not found: '{folder}'")
+        return 2
+    setup = setup_watch(args, config)
+    if setup is None:
+        return 2
+
+    index = None
+    if not args.allow_duplicates:
+        index = RemoteIndex(config.workout_index_path)
+        try:
+            index.sync(setup.api)
+        except requests.RequestException as e:
+            print(f"Workout index not updated, duplicates may be missed: {e}")
+    outbox = Outbox(config.outbox_folder)
+    outbox.purge()
+    uploader = WatchUploader(setup, config, outbox, index, args.title)
+
+    watcher = open_watcher(folder, config.scan_subfolders, args.poll)
+    watch = FolderWatch(folder, FolderScanner(Loader.filetypes, config.scan_subfolders), watcher, args.settle)
+    watch.start(existing=not args.new_only)
+    # SIGTERM stops the daemon like Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Watching {folder}, Ctrl+C to stop", flush=True)
+    watch_loop(watch, uploader, args.uploads)
+    watcher.close()
+    outbox.close()
+    if index is not None:
+        index.close()
+    setup.api.close()
+    return 0
@@ -0,0 +1,570 @@
+"""Persistent cache of parsed workouts."""
+
+import atexit
+import datetime
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from .track import COLUMNS, TIMESTAMP_MISSING, Track
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# pylint: disable=too-many-locals
+
+#: Magic bytes and version at the start of every cache entry.
+MAGIC = b"FTUC"
+VERSION = 1
+
+#: Quantization steps per degree of the latitude/longitude columns (about 1 cm).
+COORDINATE_SCALE = 10**7
+
+#: Entries stored between two writes of the index, besides the writes at the end of a load and on exit.
+SAVE_EVERY = 100
+
+_HEADER = struct.Struct("<4sHI")
+_ALIGNMENT = 8
+_TYPECODES = {"i2": "h", "i4": "i", "i8": "q", "f4": "f", "f8": "d"}
+
+
+def _encodeValue(value):
+    """
+    Convert a workout attribute to a JSON serialisable value.
+
+    Parameters
+    ----------
+    value : Any
+        Attribute value.
+
+    Returns
+    -------
+    Any
+        JSON serialisable value.
+    """
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"__timedelta__": value.total_seconds()}
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _encodeValue(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encodeValue(item) for item in value]
+    return value
+
+
+def _decodeValue(value):
+    """
+    Reverse ``_encodeValue``.
+
+    Parameters
+    ----------
+    value : Any
+        Value read from JSON.
+
+    Returns
+    -------
+    Any
+        Attribute value.
+    """
+    if isinstance(value, dict):
+        if "__datetime__" in value:
+            return datetime.datetime.fromisoformat(value["__datetime__"])
+        if "__timedelta__" in value:
+            return datetime.timedelta(seconds=value["__timedelta__"])
+        return {key: _decodeValue(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decodeValue(item) for item in value]
+    return value
+
+
+def file_hash(path: str | Path) -> str:
+    """
+    Hash the content of a file.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path to the file.
+
+    Returns
+    -------
+    str
+        Hexadecimal BLAKE2b digest of the content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _toBytes(values, dtype: str) -> bytes:
+    """
+    Serialise integers or floats as little endian bytes.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to serialise.
+    dtype : str
+        Little endian storage type, one of ``i2``, ``i4``, ``i8``, ``f4`` or ``f8``.
+
+    Returns
+    -------
+    bytes
+        Serialised values.
+    """
+    if np is not None:
+        return np.asarray(values).astype("<" + dtype, copy=False).tobytes()
+    values = array(_TYPECODES[dtype], values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _fromBuffer(buffer, dtype: str, offset: int, count: int):
+    """
+    Read little endian values from a buffer, without copying when NumPy is installed.
+
+    Parameters
+    ----------
+    buffer : mmap.mmap | bytes
+        Buffer holding the values.
+    dtype : str
+        Little endian storage type.
+    offset : int
+        Offset of the first value in bytes.
+    count : int
+        Number of values.
+
+    Returns
+    -------
+    numpy.ndarray | array.array
+        Values.
+    """
+    if np is not None:
+        return np.frombuffer(buffer, dtype="<" + dtype, count=count, offset=offset)
+    values = array(_TYPECODES[dtype])
+    values.frombytes(buffer[offset : offset + count * values.itemsize])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _deltaEncode(values: list | array, scale: int) -> tuple[int, str, list] | None:
+    """
+    Quantize values and store them as the difference to the previous value.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to encode.
+    scale : int
+        Quantization steps per unit.
+
+    Returns
+    -------
+    tuple[int, str, list] | None
+        First quantized value, storage type and differences, or None if they do not fit into 32 bits.
+    """
+    if np is not None:
+        quantized = np.rint(np.asarray(values, dtype="float64") * scale).astype("int64")
+        deltas = np.diff(quantized)
+        limit = int(np.abs(deltas).max()) if len(deltas) else 0
+        first = int(quantized[0])
+    else:
+        quantized = [round(value * scale) for value in values]
+        deltas = [quantized[i + 1] - quantized[i] for i in range(len(quantized) - 1)]
+        limit = max((abs(delta) for delta in deltas), default=0)
+        first = quantized[0]
+    if limit < 2**15:
+        return first, "i2", deltas
+    if limit < 2**31:
+        return first, "i4", deltas
+    return None
+
+
+def _deltaDecode(first: int, deltas, scale: int):
+    """
+    Reverse ``_deltaEncode``.
+
+    Parameters
+    ----------
+    first : int
+        First quantized value.
+    deltas : array_like
+        Differences between consecutive quantized values.
+    scale : int
+        Quantization steps per unit.
+
+    Returns
+    -------
+    numpy.ndarray | array.array
+        Decoded values, integers if ``scale`` is 1.
+    """
+    if np is not None:
+        quantized = np.empty(len(deltas) + 1, dtype="int64")
+        quantized[0] = first
+        np.cumsum(deltas, out=quantized[1:])
+        quantized[1:] += first
+        return quantized if scale == 1 else quantized / scale
+    quantized = [first]
+    for delta in deltas:
+        quantized.append(quantized[-1] + delta)
+    if scale == 1:
+        return array("q", quantized)
+    return array("d", (value / scale for value in quantized))
+
+
+def encode(workout) -> bytes:
+    """
+    Serialise a workout to the cache entry format.
+
+    The entry starts with the magic bytes, the format version and the length of a JSON header holding the class
+    state and the column layout, followed by the columns at 8 byte aligned offsets. Timestamps and coordinates are
+    quantized and delta-encoded with 16 or 32 bit differences, the float32 sensor columns are stored as-is so they can
+    be memory-mapped.
+
+    Parameters
+    ----------
+    workout : Workout
+        Workout to serialise.
+
+    Returns
+    -------
+    bytes
+        Cache entry.
+    """
+    track = workout.track
+    blocks = []
+    layout = []
+    offset = 0
+    for name, typecode in COLUMNS.items():
+        column = getattr(track, name)
+        encoded = None
+        if len(column) and name in ("timestamp", "lat", "lon"):
+            if name != "timestamp":
+                encoded = _deltaEncode(column, COORDINATE_SCALE)
+            elif TIMESTAMP_MISSING not in column:
+                encoded = _deltaEncode(column, 1)
+        if encoded is None:
+            dtype = {"q": "i8", "d": "f8", "f": "f4"}[typecode]
+            data = _toBytes(column, dtype)
+            layout.append({"name": name, "dtype": dtype, "offset": offset, "count": len(column)})
+        else:
+            first, dtype, deltas = encoded
+            data = _toBytes(deltas, dtype)
+            layout.append({"name": name, "dtype": dtype, "offset": offset, "count": len(deltas), "first": first})
+        data += b"\x00" * (-len(data) % _ALIGNMENT)
+        blocks.append(data)
+        offset += len(data)
+    header = json.dumps(
+        {
+            "class": type(workout).__name__,
+            "state": _encodeValue(workout.getState()),
+            "length": len(track),
+            "columns": layout,
+        }
+    ).encode()
+    header += b" " * (-(len(header) + _HEADER.size) % _ALIGNMENT)
+    return _HEADER.pack(MAGIC, VERSION, len(header)) + header + b"".join(blocks)
+
+
+def decode(buffer, cls):
+    """
+    Recreate a workout from a cache entry.
+
+    Parameters
+    ----------
+    buffer : mmap.mmap | bytes
+        Cache entry.
+    cls : type
+        Workout class the entry was created from.
+
+    Returns
+    -------
+    Workout | None
+        Workout or None if the entry is not readable by this version or belongs to another class.
+    """
+    magic, version, header_size = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    header = json.loads(bytes(buffer[_HEADER.size : _HEADER.size + header_size]))
+    if header["class"] != cls.__name__:
+        return None
+    start = _HEADER.size + header_size
+    columns = {}
+    for column in header["columns"]:
+        values = _fromBuffer(buffer, column["dtype"], start + column["offset"], column["count"])
+        if "first" in column:
+            scale = 1 if column["name"] == "timestamp" else COORDINATE_SCALE
+            values = _deltaDecode(column["first"], values, scale)
+        columns[column["name"]] = values
+    track = Track(columns) if header["length"] else Track()
+    return cls.fromState(_decodeValue(header["state"]), track)
+
+
+class WorkoutCache:
+    """
+    Persistent cache of parsed workouts.
+
+    Every workout is stored in its own file in the cache folder, see ``encode`` for the format, and an index maps the
+    path of the workout file to its entry. An entry is used while the size and modification time of the workout file
+    are unchanged; if only the modification time changed the content hash decides. Files are only hashed once their
+    modification time changed, the digest taken by that lookup being stored with the new entry. The least recently
+    used entries are removed once the cache grows beyond ``max_size``.
+
+    The index is written every ``SAVE_EVERY`` entries, by ``save`` at the end of a load and on exit, rather than with
+    every entry.
+
+    Parameters
+    ----------
+    folder : str | Path
+        Folder holding the cache.
+    max_size : int
+        Maximum size of all entries in bytes, 0 disables the cache.
+    """
+
+    def __init__(self, folder: str | Path, max_size: int = 256 * 1024**2) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        folder : str | Path
+            Folder holding the cache.
+        max_size : int
+            Maximum size of all entries in bytes, 0 disables the cache.
+        """
+        self.folder = Path(folder)
+        self.max_size = max_size
+        self.index_path = self.folder / "index.json"
+        self.index = {"version": VERSION, "hits": 0, "misses": 0, "entries": {}}
+        if self.index_path.is_file():
+            try:
+                with self.index_path.open() as index_file:
+                    index = json.load(index_file)
+                if index.get("version") == VERSION:
+                    self.index = index
+            except (OSError, ValueError):
+                pass
+        # Changes are kept in memory, the index is written every SAVE_EVERY entries, after a load and on exit
+        self.dirty = False
+        self.unsaved = 0
+        # Digests of the files hashed by a lookup, with the size and modification time they were taken at
+        self.digests = {}
+        # Workouts are loaded from worker threads, the index is only touched while holding the lock
+        self.lock = threading.RLock()
+        atexit.register(self.save)
+
+    @staticmethod
+    def _key(path: str | Path) -> str:
+        """
+        Get the key of a workout file.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path to the workout file.
+
+        Returns
+        -------
+        str
+            Key of the cache entry.
+        """
+        return hashlib.blake2b(str(Path(path).resolve()).encode(), digest_size=16).hexdigest()
+
+    def _entryPath(self, key: str) -> Path:
+        """
+        Get the file holding a cache entry.
+
+        Parameters
+        ----------
+        key : str
+            Key of the cache entry.
+
+        Returns
+        -------
+        Path
+            Path to the entry.
+        """
+        return self.folder / f"{key}.wo"
+
+    def get(self, path: str | Path, cls):
+        """
+        Get a cached workout.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path to the workout file.
+        cls : type
+            Workout class used to load the file.
+
+        Returns
+        -------
+        Workout | None
+            Cached workout or None if there is no valid entry.
+        """
+        if self.max_size <= 0:
+            return None
+        key = self._key(path)
+        with self.lock:
+            entry = self.index["entries"].get(key)
+            workout = None
+            if entry is not None:
+                try:
+                    stat = os.stat(path)
+                    valid = entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                    if not valid and entry["size"] == stat.st_size:
+                        digest = file_hash(path)
+                        self.digests[key] = (stat.st_size, stat.st_mtime_ns, digest)
+                        valid = entry["hash"] == digest
+                    if valid:
+                        entry["mtime_ns"] = stat.st_mtime_ns
+                        with self._entryPath(key).open("rb") as f:
+                            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        workout = decode(buffer, cls)
+                except (OSError, ValueError, KeyError, struct.error):
+                    workout = None
+                if workout is None:
+                    self._remove(key)
+                else:
+                    workout.path = path
+                    entry["used"] = time.time()
+            self.index["hits" if workout is not None else "misses"] += 1
+            self.dirty = True
+        return workout
+
+    def put(self, workout) -> None:
+        """
+        Store a workout.
+
+        The content hash is the one taken by the lookup of the file, if it hashed the same content, otherwise the file is
+        hashed once its modification time changes.
+
+        Parameters
+        ----------
+        workout : Workout
+            Workout to store, its track is decoded if it is lazy.
+        """
+        if self.max_size <= 0:
+            return
+        path = workout.getFilePath()
+        key = self._key(path)
+        data = encode(workout)
+        if len(data) > self.max_size:
+            return
+        stat = os.stat(path)
+        with self.lock:
+            size, mtime_ns, digest = self.digests.pop(key, (None, None, None))
+            if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                digest = None
+            self.folder.mkdir(parents=True, exist_ok=True)
+            entry_path = self._entryPath(key)
+            temp_path = entry_path.with_suffix(".tmp")
+            try:
+                temp_path.write_bytes(data)
+                os.replace(temp_path, entry_path)
+            except OSError:
+                return
+            self.index["entries"][key] = {
+                "path": str(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": digest,
+                "bytes": len(data),
+                "used": time.time(),
+            }
+            self._evict()
+            self.dirty = True
+            self.unsaved += 1
+            if self.unsaved >= SAVE_EVERY:
+                self.save()
+
+    def _remove(self, key: str) -> None:
+        """
+        Remove an entry.
+
+        Parameters
+        ----------
+        key : str
+            Key of the cache entry.
+        """
+        self.index["entries"].pop(key, None)
+        try:
+            self._entryPath(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits into ``max_size``."""
+        entries = self.index["entries"]
+        total = sum(entry["bytes"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["used"]):
+            if total <= self.max_size:
+                break
+            total -= entries[key]["bytes"]
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self.lock:
+            for key in list(self.index["entries"]):
+                self._remove(key)
+            self.index["hits"] = 0
+            self.index["misses"] = 0
+            self.dirty = True
+            self.save()
+
+    def save(self) -> None:
+        """Write the index if it changed."""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            self.unsaved = 0
+            try:
+                self.folder.mkdir(parents=True, exist_ok=True)
+                temp_path = self.index_path.with_suffix(".tmp")
+                temp_path.write_text(json.dumps(self.index))
+                os.replace(temp_path, self.index_path)
+            except OSError:
+                pass
+
+    def getStats(self) -> dict:
+        """
+        Get statistics.
+
+        Returns
+        -------
+        dict
+            Folder, number of entries, size in bytes, maximum size, hits, misses and hit rate.
+        """
+        with self.lock:
+            entries = self.index["entries"]
+            hits = self.index["hits"]
+            misses = self.index["misses"]
+            size = sum(entry["bytes"] for entry in entries.values())
+        return {
+            "folder": str(self.folder),
+            "entries": len(entries),
+            "size": size,
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else math.nan,
+        }
@@ -3,12 +3,53 @@
 import datetime
 from pathlib import Path
 
-import fitdecode
-from .workout import Point, Workout
+from .fitstream import FitStream
+from .track import Track, TrackBuilder, to_epoch
+from .workout import Workout
 
+# pylint: disable=import-outside-toplevel
 # pylint: disable=too-many-branches
 # pylint: disable=too-many-instance-attributes
 
+#: Factor converting FIT semicircles to degrees.
+SEMICIRCLES_TO_DEGREES = 180 / 2**31
+
+#: Messages and fields a ``FitFile`` needs, everything else is skipped while decoding.
+PROJECTION = {
+    "sport": ("name",),
+    "session": (
+        "timestamp",
+        "start_time",
+        "total_distance",
+        "total_elapsed_time",
+        "total_ascent",
+        "total_descent",
+        "enhanced_avg_speed",
+        "enhanced_max_speed",
+        "total_calories",
+        "max_heart_rate",
+        "avg_heart_rate",
+        "sport",
+    ),
+    "record": (
+        "timestamp",
+        "position_lat",
+        "position_long",
+        "enhanced_altitude",
+        "enhanced_speed",
+        "heart_rate",
+        "cadence",
+        "temperature",
+    ),
+}
+
+#: Messages and fields read by a lazy ``FitFile`` before its track is needed.
+SUMMARY_PROJECTION = {
+    "file_id": ("time_created",),
+    "sport": PROJECTION["sport"],
+    "session": PROJECTION["session"],
+}
+
 
 class FitFile(Workout):
     """
@@ -18,15 +59,20 @@ class FitFile(Workout):
     ----------
     path : str | Path
         Path to '.fit' workout file.
+    projection : dict | None
+        Messages and fields to decode with the streaming decoder, see ``FitStream``. If None every message is decoded
+        with ``fitdecode``.
+    lazy : bool
+        Only read the summary messages now and decode the records when the track is first needed.
     """
 
-    time = (None,)
-    distance: float = (None,)
-    date = (None,)
-    ascent: float = (None,)
-    descent = (None,)
+    time = None
+    distance: float = None
+    date = None
+    ascent: float = None
+    descent = None
 
-    def __init__(self, path: str | Path) -> None:
+    def __init__(self, path: str | Path, projection: dict | None = PROJECTION, lazy: bool = False) -> None:
         """
         Initialise the class.
 
@@ -34,191 +80,175 @@ class FitFile(Workout):
         ----------
         path : str | Path
             Path to '.fit' workout file.
+        projection : dict | None
+            Messages and fields to decode with the streaming decoder, see ``FitStream``. If None every message is
+            decoded with ``fitdecode``.
+        lazy : bool
+            Only read the summary messages now and decode the records when the track is first needed.
         """
         # Read Fit File
         self.path = path
-        self.file = fitdecode.FitReader(path)
+        self.projection = projection
         # Get Information
         self.attributes = {}
-        self.records = []
-        for frame in self.file:
-            if frame.frame_type == fitdecode.FIT_FRAME_DATA:
-                # Get Custom Sport Type
-                if frame.name == "sport":
-                    for field in frame.fields:
-                        if field.name == "name":
-                            self.attributes["custom_sport"] = field.raw_value
-                # Get Properties from Session
-                elif frame.name == "session":
-                    if frame.has_field("timestamp"):
-                        self.date = frame.get_value("timestamp")
-                    if frame.has_field("total_distance"):
-                        self.distance = frame.get_value("total_distance") / 1000
-                    if frame.has_field("total_elapsed_time"):
-                        self.time = datetime.timedelta(seconds=int(frame.get_value("total_elapsed_time")))
-                    if frame.has_field("total_ascent"):
-                        self.ascent = frame.get_value("total_ascent")
-                    if frame.has_field("total_ascent"):
-                        self.descent = frame.get_value("total_descent")
-                    if frame.has_field("enhanced_avg_speed"):
-                        self.attributes["avg_speed"] = frame.get_value("enhanced_avg_speed")
-                    if frame.has_field("enhanced_max_speed"):
-                        self.attributes["max_speed"] = frame.get_value("enhanced_max_speed")
-                    if frame.has_field("total_calories"):
-                        self.attributes["calories"] = frame.get_value("total_calories")
-                    if frame.has_field("max_heart_rate"):
-                        self.attributes["max_heart_rate"] = frame.get_value("max_heart_rate")
-                    if frame.has_field("avg_heart_rate"):
-                        self.attributes["avg_heart_rate"] = frame.get_value("avg_heart_rate")
-                    if frame.has_field("sport"):
-                        self.attributes["sport"] = frame.get_value("sport")
-
-                if frame.name == "record":
-                    self.records.append(Record(frame))
-        # Sort Records
-        if self.records:
-            self.records = sorted(self.records, key=lambda x: x.timestamp)
-        points = []
-        for record in self.records:
-            if record.has_position():
-                point = Point(
-                    record.timestamp,
-                    (record.getLat(), record.getLong()),
-                    record.altitude,
-                    record.speed,
-                    record.heart_rate,
-                    record.cadence,
-                    record.speed,
-                )
-                points.append(point)
+        builder = TrackBuilder()
+        time_created = None
+        for name, values in self._readMessages(SUMMARY_PROJECTION if lazy else projection):
+            # Get Creation Time in case there is no Session
+            if name == "file_id":
+                time_created = values.get("time_created")
+            # Get Custom Sport Type
+            elif name == "sport":
+                if "name" in values:
+                    self.attributes["custom_sport"] = values["name"]
+            # Get Properties from Session
+            elif name == "session":
+                if "timestamp" in values:
+                    self.date = values["timestamp"]
+                if "start_time" in values:
+                    self.attributes["start_time"] = values["start_time"]
+                if "total_distance" in values:
+                    self.distance = values["total_distance"] / 1000
+                if "total_elapsed_time" in values:
+                    self.time = datetime.timedelta(seconds=int(values["total_elapsed_time"]))
+                if "total_ascent" in values:
+                    self.ascent = values["total_ascent"]
+                if "total_descent" in values:
+                    self.descent = values["total_descent"]
+                if "enhanced_avg_speed" in values:
+                    self.attributes["avg_speed"] = values["enhanced_avg_speed"]
+                if "enhanced_max_speed" in values:
+                    self.attributes["max_speed"] = values["enhanced_max_speed"]
+                if "total_calories" in values:
+                    self.attributes["calories"] = values["total_calories"]
+                if "max_heart_rate" in values:
+                    self.attributes["max_heart_rate"] = values["max_heart_rate"]
+                if "avg_heart_rate" in values:
+                    self.attributes["avg_heart_rate"] = values["avg_heart_rate"]
+                if "sport" in values:
+                    self.attributes["sport"] = values["sport"]
+            elif name == "record":
+                self._addRecord(builder, values)
+        if lazy:
+            track = None
+            if self.date is None:
+                self.date = time_created
+        else:
+            # Sort Records
+            track = builder.build().sortByTime()
 
         super().__init__(
-            points, self.path, self.getStats(), self.date, self.time, self.distance, self.ascent, self.descent
+            track, self.path, self.getStats(), self.date, self.time, self.distance, self.ascent, self.descent
         )
 
-    def getSport(self) -> int | None:
+    def _loadTrack(self) -> Track:
         """
-        Extract sport based on attributes.
+        Decode the records of a lazy workout.
 
         Returns
         -------
-        int | None
-            Integer indicating sport type or None.
+        Track
+            Track of the workout, sorted by time.
         """
-        sport = self.attributes["sport"]
-        if sport == "cycling":
-            return 1
-        if sport == "running":
-            return 5
-        return None
-
-    def getStats(self) -> str:
+        projection = None if self.projection is None else {"record": self.projection["record"]}
+        builder = TrackBuilder()
+        for name, values in self._readMessages(projection):
+            if name == "record":
+                self._addRecord(builder, values)
+        return builder.build().sortByTime()
+
+    def _readMessages(self, projection: dict | None):
         """
-        Extract statistics.
+        Read the data messages of the file.
 
-        Returns
-        -------
-        str
-            String of average and maximum heart rate, calories and sport type.
+        Parameters
+        ----------
+        projection : dict | None
+            Messages and fields to decode with the streaming decoder. If None every message is decoded with
+            ``fitdecode``.
+
+        Yields
+        ------
+        tuple[str, dict]
+            Message name and a mapping of field name to value.
         """
-        stats = ""
-        if self.attributes is not None:
-            stats = f'Average Heart Rate: {self.attributes["avg_heart_rate"]} Bpm \n'
-            stats += f'Maximum Heart Rate: {self.attributes["max_heart_rate"]} Bpm \n'
-            stats += f'Calories: {self.attributes["calories"]} kcal \n'
-            stats += f'Sport Type: {self.attributes["custom_sport"]}'
-        return stats
-
-
-class Record:
-    """
-    Class for Record.
-
-    Parameters
-    ----------
-    frame : None
-        Frame to be processed.
-    """
+        if projection is not None:
+            yield from FitStream(self.path, projection)
+            return
+        # Only needed for full decodes, which most loads never make
+        import fitdecode
 
-    timestamp = None
-    position_lat: float = None
-    position_long: float = None
-    distance: float = None
-    speed: float = None
-    altitude: float = None
-    heart_rate: float = None
-    cadence: float = None
-    temperature: float = None
+        for frame in fitdecode.FitReader(self.path):
+            if frame.frame_type == fitdecode.FIT_FRAME_DATA:
+                yield frame.name, {field.name: field.value for field in frame.fields}
 
-    def __init__(self, frame: None):
+    @staticmethod
+    def _addRecord(builder: TrackBuilder, values: dict) -> None:
         """
-        Initialise the class.
+        Append a record message with a GPS position to the track.
 
         Parameters
         ----------
-        frame : None
-            Frame to be processed.
+        builder : TrackBuilder
+            Builder of the track.
+        values : dict
+            Fields of the record message.
         """
-        if frame.has_field("timestamp"):
-            self.timestamp = frame.get_value("timestamp")
-        if frame.has_field("position_lat"):
-            self.position_lat = frame.get_value("position_lat")
-        if frame.has_field("position_long"):
-            self.position_long = frame.get_value("position_long")
-        if frame.has_field("distance"):
-            self.distance = frame.get_value("distance")
-        if frame.has_field("enhanced_speed"):
-            self.speed = frame.get_value("enhanced_speed")
-        if frame.has_field("enhanced_altitude"):
-            self.altitude = frame.get_value("enhanced_altitude")
-        if frame.has_field("heart_rate"):
-            self.heart_rate = frame.get_value("heart_rate")
-        if frame.has_field("cadence"):
-            self.cadence = frame.get_value("cadence")
-        if frame.has_field("temperature"):
-            self.temperature = frame.get_value("temperature")
-
-    def has_position(self) -> bool:
+        lat = values.get("position_lat")
+        lon = values.get("position_long")
+        if lat is None or lon is None:
+            return
+        builder.append(
+            to_epoch(values.get("timestamp")),
+            lat * SEMICIRCLES_TO_DEGREES,
+            lon * SEMICIRCLES_TO_DEGREES,
+            values.get("enhanced_altitude"),
+            values.get("enhanced_speed"),
+            values.get("heart_rate"),
+            values.get("cadence"),
+            values.get("temperature"),
+        )
+
+    def _summaryStart(self) -> datetime.datetime | None:
         """
-        Whether a frame has a GPS position.
+        Get the start of the session.
 
         Returns
         -------
-        bool
-            Boolean indicating whether GPS track has latitude/longitude.
+        datetime.datetime | None
+            Start time of the session, None if the file has none.
         """
-        if self.position_lat is not None and self.position_long is not None:
-            return True
-        return False
+        return self.attributes.get("start_time")
 
-    def getLat(self, precision: int) -> float:
+    def getSport(self) -> int | None:
         """
-        Extract latitude.
-
-        Parameters
-        ----------
-        precision : int
-            Number of decimal points to round latitude to.
+        Extract sport based on attributes.
 
         Returns
         -------
-        float
-            Latitude.
+        int | None
+            Integer indicating sport type or None.
         """
-        return round(float(self.position_lat * 180) / float(2**31), ndigits=precision)
+        sport = self.attributes["sport"]
+        if sport == "cycling":
+            return 1
+        if sport == "running":
+            return 5
+        return None
 
-    def getLong(self, precision: int):
+    def getStats(self) -> str:
         """
-        Extract longitude.
-
-        Parameters
-        ----------
-        precision : int
-            Number of decimal points to round longitude to.
+        Extract statistics.
 
         Returns
         -------
-        float
-            Longitude.
+        str
+            String of average and maximum heart rate, calories and sport type.
         """
-        return round(float(self.position_long * 180) / float(2**31), ndigits=precision)
+        stats = ""
+        if self.attributes is not None:
+            stats = f'Average Heart Rate: {self.attributes["avg_heart_rate"]} Bpm \n'
+            stats += f'Maximum Heart Rate: {self.attributes["max_heart_rate"]} Bpm \n'
+            stats += f'Calories: {self.attributes["calories"]} kcal \n'
+            stats += f'Sport Type: {self.attributes["custom_sport"]}'
+        return stats
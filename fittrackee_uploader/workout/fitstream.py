@@ -0,0 +1,435 @@
+"""Streaming decoder for the FIT messages and fields a workout needs."""
+
+import datetime
+import math
+import struct
+from pathlib import Path
+
+# pylint: disable=too-few-public-methods
+# pylint: disable=too-many-locals
+
+#: Seconds between the Unix epoch and the FIT epoch (1989-12-31 00:00:00 UTC).
+FIT_EPOCH = 631065600
+
+#: Field number of the ``timestamp`` field shared by all messages.
+TIMESTAMP_FIELD = 253
+
+#: Struct format and invalid value of the FIT base types, keyed by base type number.
+BASE_TYPES = {
+    0x00: ("B", 0xFF),  # enum
+    0x01: ("b", 0x7F),  # sint8
+    0x02: ("B", 0xFF),  # uint8
+    0x03: ("h", 0x7FFF),  # sint16
+    0x04: ("H", 0xFFFF),  # uint16
+    0x05: ("i", 0x7FFFFFFF),  # sint32
+    0x06: ("I", 0xFFFFFFFF),  # uint32
+    0x07: ("s", None),  # string
+    0x08: ("f", None),  # float32
+    0x09: ("d", None),  # float64
+    0x0A: ("B", 0x00),  # uint8z
+    0x0B: ("H", 0x0000),  # uint16z
+    0x0C: ("I", 0x00000000),  # uint32z
+    0x0D: ("B", 0xFF),  # byte
+    0x0E: ("q", 0x7FFFFFFFFFFFFFFF),  # sint64
+    0x0F: ("Q", 0xFFFFFFFFFFFFFFFF),  # uint64
+    0x10: ("Q", 0x0000000000000000),  # uint64z
+}
+
+#: Names of the ``sport`` enum values.
+SPORTS = {
+    0: "generic",
+    1: "running",
+    2: "cycling",
+    3: "transition",
+    4: "fitness_equipment",
+    5: "swimming",
+    6: "basketball",
+    7: "soccer",
+    8: "tennis",
+    9: "american_football",
+    10: "training",
+    11: "walking",
+    12: "cross_country_skiing",
+    13: "alpine_skiing",
+    14: "snowboarding",
+    15: "rowing",
+    16: "mountaineering",
+    17: "hiking",
+    18: "multisport",
+    19: "paddling",
+    20: "flying",
+    21: "e_biking",
+    22: "motorcycling",
+    23: "boating",
+    24: "driving",
+    25: "golf",
+    26: "hang_gliding",
+    27: "horseback_riding",
+    28: "hunting",
+    29: "fishing",
+    30: "inline_skating",
+    31: "rock_climbing",
+    32: "sailing",
+    33: "ice_skating",
+    34: "sky_diving",
+    35: "snowshoeing",
+    36: "snowmobiling",
+    37: "stand_up_paddleboarding",
+    38: "surfing",
+    39: "wakeboarding",
+    40: "water_skiing",
+    41: "kayaking",
+    42: "rafting",
+    43: "windsurfing",
+    44: "kitesurfing",
+    45: "tactical",
+    46: "jumpmaster",
+    47: "boxing",
+    48: "floor_climbing",
+    53: "diving",
+    254: "all",
+}
+
+#: Subset of the FIT profile known to the decoder. Each message maps its name to its global message number and its
+#: fields; each field maps a field number to ``(name, scale, offset, kind)``. Fields sharing a name are the plain and
+#: ``enhanced_`` variants of the same value, the first valid one in a message wins.
+PROFILE = {
+    "file_id": (
+        0,
+        {
+            0: ("type", 1, 0, "int"),
+            1: ("manufacturer", 1, 0, "int"),
+            2: ("product", 1, 0, "int"),
+            3: ("serial_number", 1, 0, "int"),
+            4: ("time_created", 1, 0, "time"),
+        },
+    ),
+    "sport": (
+        12,
+        {
+            0: ("sport", 1, 0, "sport"),
+            1: ("sub_sport", 1, 0, "int"),
+            3: ("name", 1, 0, "string"),
+        },
+    ),
+    "session": (
+        18,
+        {
+            253: ("timestamp", 1, 0, "time"),
+            2: ("start_time", 1, 0, "time"),
+            5: ("sport", 1, 0, "sport"),
+            7: ("total_elapsed_time", 1000, 0, "float"),
+            8: ("total_timer_time", 1000, 0, "float"),
+            9: ("total_distance", 100, 0, "float"),
+            11: ("total_calories", 1, 0, "int"),
+            124: ("enhanced_avg_speed", 1000, 0, "float"),
+            14: ("enhanced_avg_speed", 1000, 0, "float"),
+            125: ("enhanced_max_speed", 1000, 0, "float"),
+            15: ("enhanced_max_speed", 1000, 0, "float"),
+            16: ("avg_heart_rate", 1, 0, "int"),
+            17: ("max_heart_rate", 1, 0, "int"),
+            22: ("total_ascent", 1, 0, "int"),
+            23: ("total_descent", 1, 0, "int"),
+        },
+    ),
+    "lap": (
+        19,
+        {
+            253: ("timestamp", 1, 0, "time"),
+            2: ("start_time", 1, 0, "time"),
+            7: ("total_elapsed_time", 1000, 0, "float"),
+            8: ("total_timer_time", 1000, 0, "float"),
+            9: ("total_distance", 100, 0, "float"),
+        },
+    ),
+    "record": (
+        20,
+        {
+            253: ("timestamp", 1, 0, "time"),
+            0: ("position_lat", 1, 0, "int"),
+            1: ("position_long", 1, 0, "int"),
+            78: ("enhanced_altitude", 5, 500, "float"),
+            2: ("enhanced_altitude", 5, 500, "float"),
+            3: ("heart_rate", 1, 0, "int"),
+            4: ("cadence", 1, 0, "int"),
+            5: ("distance", 100, 0, "float"),
+            73: ("enhanced_speed", 1000, 0, "float"),
+            6: ("enhanced_speed", 1000, 0, "float"),
+            13: ("temperature", 1, 0, "int"),
+        },
+    ),
+}
+
+
+class FitDecodeError(ValueError):
+    """Raised when a file is not a valid FIT file."""
+
+
+def _convert(raw, invalid, scale: int, offset: int, kind: str):
+    """
+    Convert a raw field value.
+
+    Parameters
+    ----------
+    raw : int | float | bytes
+        Value as stored in the file.
+    invalid : int | None
+        Invalid value of the base type.
+    scale : int
+        Scale of the field.
+    offset : int
+        Offset of the field.
+    kind : str
+        Kind of the field, one of ``int``, ``float``, ``time``, ``sport`` or ``string``.
+
+    Returns
+    -------
+    int | float | str | datetime.datetime | None
+        Converted value or None if the field is invalid.
+    """
+    if kind == "string":
+        raw = raw.split(b"\x00", 1)[0]
+        return raw.decode("utf-8", errors="replace") if raw else None
+    if raw == invalid or (isinstance(raw, float) and math.isnan(raw)):
+        return None
+    if kind == "time":
+        return datetime.datetime.fromtimestamp(raw + FIT_EPOCH, tz=datetime.timezone.utc)
+    if kind == "sport":
+        return SPORTS.get(raw, raw)
+    if kind == "float":
+        return raw / scale - offset
+    return raw
+
+
+class _Layout:
+    """
+    Decoding plan for the data messages of one local message type.
+
+    Parameters
+    ----------
+    name : str | None
+        Name of the message or None if it is not projected.
+    size : int
+        Size of the data message in bytes, excluding the record header.
+    unpacker : struct.Struct | None
+        Struct unpacking the projected fields, skipping all others.
+    fields : list
+        ``(name, invalid, scale, offset, kind, alias)`` for every value unpacked.
+    timestamp : struct.Struct | None
+        Struct reading the ``timestamp`` field of messages that are not projected.
+    timestamp_offset : int
+        Offset of the ``timestamp`` field in the message.
+    """
+
+    def __init__(self, name, size, unpacker, fields, timestamp, timestamp_offset):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        name : str | None
+            Name of the message or None if it is not projected.
+        size : int
+            Size of the data message in bytes, excluding the record header.
+        unpacker : struct.Struct | None
+            Struct unpacking the projected fields, skipping all others.
+        fields : list
+            ``(name, invalid, scale, offset, kind, alias)`` for every value unpacked.
+        timestamp : struct.Struct | None
+            Struct reading the ``timestamp`` field of messages that are not projected.
+        timestamp_offset : int
+            Offset of the ``timestamp`` field in the message.
+        """
+        self.name = name
+        self.size = size
+        self.unpacker = unpacker
+        self.fields = fields
+        self.timestamp = timestamp
+        self.timestamp_offset = timestamp_offset
+
+
+class FitStream:
+    """
+    Decode only the projected messages and fields of a FIT file.
+
+    Definition messages are compiled into a decoding plan once. Data messages of message types that are not projected
+    are skipped by their size without decoding any field, projected messages only decode the requested fields with a
+    single ``struct`` call. The CRC is not verified.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path to '.fit' file.
+    projection : dict
+        Mapping of message name to the field names to decode, message and field names are those of ``PROFILE``.
+    """
+
+    def __init__(self, path: str | Path, projection: dict) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path to '.fit' file.
+        projection : dict
+            Mapping of message name to the field names to decode, message and field names are those of ``PROFILE``.
+        """
+        self.path = path
+        self.messages = {}
+        for name, field_names in projection.items():
+            number, fields = PROFILE[name]
+            unknown = set(field_names) - {field[0] for field in fields.values()}
+            if unknown:
+                raise ValueError(f"Unknown fields for message '{name}': {', '.join(sorted(unknown))}")
+            self.messages[number] = (
+                name,
+                {num: field for num, field in fields.items() if field[0] in field_names},
+            )
+
+    def __iter__(self):
+        """
+        Iterate over the projected messages.
+
+        Yields
+        ------
+        tuple[str, dict]
+            Message name and a mapping of field name to value, invalid values are None.
+        """
+        data = Path(self.path).read_bytes()
+        position = 0
+        while position < len(data):
+            position = yield from self._readFile(data, position)
+
+    def _readFile(self, data: bytes, position: int):
+        """
+        Decode one FIT file of a possibly chained file.
+
+        Parameters
+        ----------
+        data : bytes
+            Content of the file.
+        position : int
+            Offset of the FIT file header.
+
+        Yields
+        ------
+        tuple[str, dict]
+            Message name and a mapping of field name to value.
+
+        Returns
+        -------
+        int
+            Offset after the end of the FIT file.
+        """
+        if len(data) - position < 12:
+            raise FitDecodeError(f"{self.path}: truncated file header")
+        header_size = data[position]
+        (data_size,) = struct.unpack_from("<I", data, position + 4)
+        if header_size < 12 or data[position + 8 : position + 12] != b".FIT":
+            raise FitDecodeError(f"{self.path}: not a FIT file")
+        position += header_size
+        end = position + data_size
+        if end > len(data):
+            raise FitDecodeError(f"{self.path}: truncated file")
+        layouts = {}
+        last_timestamp = None
+        while position < end:
+            header = data[position]
+            position += 1
+            if header & 0x80:
+                # Compressed timestamp header
+                layout = layouts[(header >> 5) & 0x03]
+                time_offset = header & 0x1F
+                if last_timestamp is not None:
+                    timestamp = (last_timestamp & ~0x1F) + time_offset
+                    if time_offset < last_timestamp & 0x1F:
+                        timestamp += 0x20
+                    last_timestamp = timestamp
+            elif header & 0x40:
+                layouts[header & 0x0F], position = self._readDefinition(data, position, bool(header & 0x20))
+                continue
+            else:
+                layout = layouts[header & 0x0F]
+            if layout.name is None:
+                if layout.timestamp is not None:
+                    (raw,) = layout.timestamp.unpack_from(data, position + layout.timestamp_offset)
+                    if raw != 0xFFFFFFFF:
+                        last_timestamp = raw
+                position += layout.size
+                continue
+            values = {}
+            for raw, (name, invalid, scale, offset, kind, alias) in zip(
+                layout.unpacker.unpack_from(data, position), layout.fields
+            ):
+                if name == "timestamp" and raw != invalid:
+                    last_timestamp = raw
+                value = _convert(raw, invalid, scale, offset, kind)
+                if not alias or values.get(name) is None:
+                    values[name] = value
+            if header & 0x80 and last_timestamp is not None and "timestamp" not in values:
+                values["timestamp"] = _convert(last_timestamp, None, 1, 0, "time")
+            position += layout.size
+            yield layout.name, values
+        return end + 2
+
+    def _readDefinition(self, data: bytes, position: int, developer: bool) -> tuple[_Layout, int]:
+        """
+        Compile a definition message into a decoding plan.
+
+        Parameters
+        ----------
+        data : bytes
+            Content of the file.
+        position : int
+            Offset of the definition message content.
+        developer : bool
+            Whether the definition contains developer fields.
+
+        Returns
+        -------
+        tuple[_Layout, int]
+            Decoding plan and offset after the definition message.
+        """
+        endian = ">" if data[position + 1] else "<"
+        (number,) = struct.unpack_from(endian + "H", data, position + 2)
+        count = data[position + 4]
+        position += 5
+        definitions = [tuple(data[position + 3 * i : position + 3 * i + 3]) for i in range(count)]
+        position += 3 * count
+        size = sum(field_size for _, field_size, _ in definitions)
+        if developer:
+            developer_count = data[position]
+            position += 1
+            size += sum(data[position + 3 * i + 1] for i in range(developer_count))
+            position += 3 * developer_count
+
+        name, fields = self.messages.get(number, (None, {}))
+        if name is None:
+            timestamp_offset = 0
+            for field_number, field_size, _ in definitions:
+                if field_number == TIMESTAMP_FIELD and field_size == 4:
+                    return _Layout(None, size, None, [], struct.Struct(endian + "I"), timestamp_offset), position
+                timestamp_offset += field_size
+            return _Layout(None, size, None, [], None, 0), position
+
+        seen = set()
+        fmt = endian
+        plan = []
+        for field_number, field_size, base_type in definitions:
+            code, invalid = BASE_TYPES.get(base_type & 0x1F, (None, None))
+            field = fields.get(field_number)
+            if field is None and field_number == TIMESTAMP_FIELD and field_size == 4:
+                # Keep track of time for compressed timestamp headers
+                field = ("timestamp", 1, 0, "time")
+            if field is not None and code == "s":
+                fmt += f"{field_size}s"
+            elif field is not None and code is not None and struct.calcsize(code) == field_size:
+                fmt += code
+            else:
+                fmt += f"{field_size}x"
+                continue
+            field_name, scale, offset, kind = field
+            plan.append((field_name, invalid, scale, offset, kind, field_name in seen))
+            seen.add(field_name)
+        return _Layout(name, size, struct.Struct(fmt + f"{size - struct.calcsize(fmt)}x"), plan, None, 0), position
@@ -0,0 +1,120 @@
+"""Batched geometry of tracks: distances, bounding box and center."""
+
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# pylint: disable=too-few-public-methods
+
+#: Mean radius of the Earth in kilometres.
+EARTH_RADIUS = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Calculate distances in kilometres between pairs of points.
+
+    Uses the `Great-circle distance https://en.wikipedia.org/wiki/Great-circle_distance` method to calculate the
+    distance between two points on the surface of a sphere, in this case the Earth's surface. Arguments may be scalars
+    or NumPy arrays of the same shape.
+
+    Parameters
+    ----------
+    lat1 : float | numpy.ndarray
+        Starting latitude in degrees.
+    lon1 : float | numpy.ndarray
+        Starting longitude in degrees.
+    lat2 : float | numpy.ndarray
+        Finishing latitude in degrees.
+    lon2 : float | numpy.ndarray
+        Finishing longitude in degrees.
+
+    Returns
+    -------
+    float | numpy.ndarray
+        Distance between the points in km.
+    """
+    if np is not None and not all(isinstance(value, (int, float)) for value in (lat1, lon1, lat2, lon2)):
+        lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype="float64")) for value in (lat1, lon1, lat2, lon2))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    lat1, lon1, lat2, lon2 = (math.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def cumulative_distance(lat, lon):
+    """
+    Calculate the distance travelled up to every point.
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in degrees.
+    lon : array_like
+        Longitudes in degrees.
+
+    Returns
+    -------
+    numpy.ndarray | array.array
+        Distance from the first point in km, starting with 0.
+    """
+    if np is not None:
+        lat = np.radians(np.asarray(lat, dtype="float64"))
+        lon = np.radians(np.asarray(lon, dtype="float64"))
+        cumulative = np.zeros(len(lat), dtype="float64")
+        if len(lat) > 1:
+            # Same as haversine() on consecutive points, sharing the cosine of every latitude between two pairs
+            cos_lat = np.cos(lat)
+            a = np.sin(np.diff(lat) / 2) ** 2 + cos_lat[:-1] * cos_lat[1:] * np.sin(np.diff(lon) / 2) ** 2
+            np.cumsum(2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0))), out=cumulative[1:])
+        return cumulative
+    cumulative = array("d", [0.0]) * len(lat)
+    total = 0.0
+    for i in range(1, len(lat)):
+        total += haversine(lat[i - 1], lon[i - 1], lat[i], lon[i])
+        cumulative[i] = total
+    return cumulative
+
+
+class Geometry:
+    """
+    Geometry of a track, computed in a single pass over its coordinates.
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in degrees.
+    lon : array_like
+        Longitudes in degrees.
+    """
+
+    def __init__(self, lat, lon) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        lat : array_like
+            Latitudes in degrees.
+        lon : array_like
+            Longitudes in degrees.
+        """
+        self.cumulative = cumulative_distance(lat, lon)
+        self.distance = float(self.cumulative[-1]) if len(self.cumulative) else 0.0
+        if len(lat) == 0:
+            self.extent = None
+            self.center = None
+            return
+        if np is not None:
+            lat = np.asarray(lat)
+            lon = np.asarray(lon)
+            self.extent = [(float(lat.min()), float(lon.min())), (float(lat.max()), float(lon.max()))]
+        else:
+            self.extent = [(min(lat), min(lon)), (max(lat), max(lon))]
+        (min_lat, min_lon), (max_lat, max_lon) = self.extent
+        self.center = (((max_lat - min_lat) / 2) + min_lat, ((max_lon - min_lon) / 2) + min_lon)
@@ -1,11 +1,159 @@
 """GPX sub-module."""
 
-import gpxpy
-from .workout import Point, Workout
+import calendar
+import datetime
+import re
+import shutil
+import xml.etree.ElementTree as ET
+from typing import BinaryIO
+
+from .track import TIMESTAMP_MISSING, Track, TrackBuilder, from_epoch
+from .workout import Workout
 from typing_extensions import override
 
 # pylint: disable=too-few-public-methods
 
+#: Bytes read from the end of the file to find the last track point of a lazy GPX.
+TAIL_SIZE = 64 * 1024
+
+_TIME = re.compile(
+    r"\s*(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.\d+)?\s*(?:(Z)|([+-])(\d\d):?(\d\d))?\s*$", re.IGNORECASE
+)
+#: Point elements, in the order they are preferred for the track.
+POINTS = ("trkpt", "rtept", "wpt")
+
+#: Local names of the elements of a point and their track columns, including common extensions.
+EXTENSIONS = {
+    "ele": "altitude",
+    "time": "time",
+    "speed": "speed",
+    "hr": "heart_rate",
+    "heartrate": "heart_rate",
+    "cad": "cadence",
+    "cadence": "cadence",
+    "atemp": "temperature",
+    "temp": "temperature",
+}
+
+_LAST_TRKPT = re.compile(rb"<(?:[\w.-]+:)?trkpt\b.*?</(?:[\w.-]+:)?trkpt\s*>", re.DOTALL)
+
+
+def parse_time(text: str | None) -> int:
+    """
+    Parse an ISO 8601 GPX timestamp to seconds since the epoch.
+
+    Timestamps without a timezone are assumed to be UTC, fractions of seconds are dropped.
+
+    Parameters
+    ----------
+    text : str | None
+        Timestamp as found in the GPX file.
+
+    Returns
+    -------
+    int
+        Seconds since the epoch or ``TIMESTAMP_MISSING`` if there is no valid timestamp.
+    """
+    match = _TIME.match(text) if text else None
+    if match is None:
+        return TIMESTAMP_MISSING
+    year, month, day, hour, minute, second, _, sign, offset_hours, offset_minutes = match.groups()
+    seconds = calendar.timegm((int(year), int(month), int(day), int(hour), int(minute), int(second)))
+    if sign is not None:
+        offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+        seconds += -offset if sign == "+" else offset
+    return seconds
+
+
+def _localName(tag: str) -> str:
+    """
+    Strip the namespace from an element tag.
+
+    Parameters
+    ----------
+    tag : str
+        Tag, possibly in ``{namespace}name`` form.
+
+    Returns
+    -------
+    str
+        Tag without namespace.
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def _number(text: str | None) -> float | None:
+    """
+    Convert the text of an element to a number.
+
+    Parameters
+    ----------
+    text : str | None
+        Text of the element.
+
+    Returns
+    -------
+    float | None
+        Number or None if the text is missing or not a number.
+    """
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _appendPoint(builder: TrackBuilder, element: ET.Element) -> None:
+    """
+    Add a ``trkpt``, ``rtept`` or ``wpt`` element to a track.
+
+    Besides the standard elevation, time and GPX 1.0 speed, heart rate, cadence, temperature and speed are read from
+    the extensions, such as Garmin's ``TrackPointExtension``.
+
+    Parameters
+    ----------
+    builder : TrackBuilder
+        Track the point is added to.
+    element : ET.Element
+        Point element.
+    """
+    values = {}
+    for child in element.iter():
+        name = _localName(child.tag)
+        if name in EXTENSIONS and EXTENSIONS[name] not in values:
+            values[EXTENSIONS[name]] = child.text
+    builder.append(
+        parse_time(values.get("time")),
+        float(element.get("lat")),
+        float(element.get("lon")),
+        _number(values.get("altitude")),
+        _number(values.get("speed")),
+        _number(values.get("heart_rate")),
+        _number(values.get("cadence")),
+        _number(values.get("temperature")),
+    )
+
+
+def _childText(element: ET.Element, name: str) -> str | None:
+    """
+    Get the text of a direct child, ignoring namespaces.
+
+    Parameters
+    ----------
+    element : ET.Element
+        Parent element.
+    name : str
+        Local name of the child.
+
+    Returns
+    -------
+    str | None
+        Text of the first matching child or None.
+    """
+    for child in element:
+        if _localName(child.tag) == name:
+            return child.text
+    return None
+
 
 class GPX(Workout):
     """
@@ -17,9 +165,15 @@ class GPX(Workout):
         Path to GPX file.
     encoding : str
         Encoding of GPX file to be opened.
+    lazy : bool
+        Only read the metadata and the first and last track points now and parse the file when the track is first
+        needed.
     """
 
-    def __init__(self, path: str, encoding: str = "utf-8") -> None:
+    #: The original file is uploaded, see ``getGPX``.
+    uploads_file: bool = True
+
+    def __init__(self, path: str, encoding: str = "utf-8", lazy: bool = False) -> None:
         """
         Initialise class.
 
@@ -29,30 +183,152 @@ class GPX(Workout):
             Path to GPX file.
         encoding : str
             Encoding of GPX file to be opened.
+        lazy : bool
+            Only read the metadata and the first and last track points now and parse the file when the track is
+            first needed.
+        """
+        self.encoding = encoding
+        self.name = None
+        super().__init__(None, path)
+        if lazy:
+            self._readSummary()
+        else:
+            self._track = self._loadTrack()
+
+    def _loadTrack(self) -> Track:
+        """
+        Parse the file incrementally.
+
+        Points are added to the track columns as soon as they are parsed and then dropped from the document, so
+        memory grows with the track rather than the XML. The track holds the points of all tracks and segments; files
+        without any are read as their routes, or else their waypoints.
+
+        Returns
+        -------
+        Track
+            Track holding the points.
+        """
+        builders = {name: TrackBuilder() for name in POINTS}
+        names = {}
+        parents = []
+        with open(self.path, "rb") as f:
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    parents.append(element)
+                    continue
+                parents.pop()
+                name = _localName(element.tag)
+                if name in builders:
+                    _appendPoint(builders[name], element)
+                    parents[-1].remove(element)
+                elif name == "name" and parents and element.text:
+                    names.setdefault(_localName(parents[-1].tag), element.text)
+        if self.name is None:
+            self.name = names.get("metadata") or names.get("gpx") or names.get("trk")
+        builder = next((builder for builder in builders.values() if len(builder) > 0), builders["trkpt"])
+        return builder.build()
+
+    def _readSummary(self) -> None:
+        """
+        Read the name, date and duration without parsing the whole file.
+
+        The first track point is found by parsing the start of the file incrementally, the last one by searching the
+        end of the file. The date and time are left unset, and so taken from the track, if either has no timestamp.
+        """
+        first = None
+        names = {}
+        parents = []
+        with open(self.path, "rb") as f:
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    parents.append(element)
+                    continue
+                parents.pop()
+                name = _localName(element.tag)
+                if name == "name" and parents and element.text:
+                    names.setdefault(_localName(parents[-1].tag), element.text)
+                elif name == "trkpt":
+                    first = parse_time(_childText(element, "time"))
+                    break
+            # Same choice as the full parse, so the name does not change once the track is loaded
+            self.name = names.get("metadata") or names.get("gpx") or names.get("trk")
+            if first is None or first == TIMESTAMP_MISSING:
+                return
+            size = f.seek(0, 2)
+            f.seek(max(0, size - TAIL_SIZE))
+            tail = f.read()
+        last = None
+        for last in _LAST_TRKPT.finditer(tail):
+            pass
+        if last is None:
+            return
+        # Drop namespace prefixes so the snippet parses on its own
+        snippet = re.sub(rb"<(/?)[\w.-]+:", rb"<\1", last.group(0))
+        snippet = re.sub(rb"^<trkpt\b[^>]*>", b"<trkpt>", snippet)
+        last = parse_time(_childText(ET.fromstring(snippet), "time"))
+        if last == TIMESTAMP_MISSING:
+            return
+        self.date = from_epoch(first)
+        self.time = from_epoch(last) - self.date
+
+    @override
+    def _summaryStart(self) -> datetime.datetime | None:
+        """
+        Get the time of the first track point read by ``_readSummary``.
+
+        Returns
+        -------
+        datetime.datetime | None
+            Time of the first track point, None if the summary was not read.
         """
-        with open(path, encoding=encoding) as f:
-            self.gpx_file = gpxpy.parse(f)
-        points = []
-        for track in self.gpx_file.tracks:
-            for segment in track.segments:
-                for p in segment.points:
-                    point = Point(p.time, (p.latitude, p.longitude), p.elevation)
-                    points.append(point)
-        super().__init__(points, path)
+        return self.date
 
     @override
-    def getGPX(self, version: str = "1.0") -> None:
+    def getGPX(
+        self,
+        precision: int | None = None,
+        version: str | None = None,
+        coordinate_precision: int | None = None,
+        out=None,
+    ) -> bytes | None:
         """
-        Extract GPX data to XML.
+        Extract GPX data.
+
+        Without any option the original file is returned unchanged, without parsing it. Otherwise the track is written
+        again as by ``Workout.getGPX``.
 
         Parameters
         ----------
-        version : str
-            GPX version.
+        precision : int | None
+            Decimal places to round altitude to.
+        version : str | None
+            GPX version, ``"1.0"`` or ``"1.1"``.
+        coordinate_precision : int | None
+            Decimal places of latitude and longitude.
+        out : file-like | None
+            Binary file-like object to write to, None to return the GPX.
+
+        Returns
+        -------
+        bytes | None
+            GPX track as XML if ``out`` is None.
+        """
+        if precision is None and version is None and coordinate_precision is None:
+            with self.openGPX() as f:
+                if out is None:
+                    return f.read()
+                shutil.copyfileobj(f, out)
+                return None
+        return super().getGPX(3 if precision is None else precision, version or "1.0", coordinate_precision, out)
+
+    @override
+    def openGPX(self) -> BinaryIO:
+        """
+        Open the original file for uploading.
 
         Returns
         -------
-        xml
-            XML formatted data from GPX file.
+        BinaryIO
+            File opened in binary mode.
         """
-        return self.gpx_file.to_xml(version=version)
+        return open(self.path, "rb")
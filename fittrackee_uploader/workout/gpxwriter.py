@@ -0,0 +1,193 @@
+"""Streaming GPX writer working directly on track columns."""
+
+import io
+import struct
+import time
+
+from .track import TIMESTAMP_MISSING, Track
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+#: Value of the ``creator`` attribute.
+CREATOR = "FitTrackee Uploader"
+
+#: Opening of the document for each supported GPX version.
+HEADERS = {
+    version: (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx xmlns="http://www.topografix.com/GPX/{path}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        f'xsi:schemaLocation="http://www.topografix.com/GPX/{path} http://www.topografix.com/GPX/{path}/gpx.xsd" '
+        f'version="{version}" creator="%s">\n'
+        "  <trk>\n"
+        "    <trkseg>\n"
+    )
+    for version, path in (("1.0", "1/0"), ("1.1", "1/1"))
+}
+FOOTER = "    </trkseg>\n  </trk>\n</gpx>"
+TRKPT = '      <trkpt lat="%s" lon="%s">\n%s%s%s      </trkpt>\n'
+ELE = "        <ele>%s</ele>\n"
+TIME = "        <time>%sZ</time>\n"
+SPEED = "        <speed>%s</speed>\n"
+
+#: Number of points formatted and written at once.
+CHUNK_SIZE = 4096
+
+
+def _formatNumbers(values, template: str, precision: int | None, rounding: bool = False) -> list[str]:
+    """
+    Format a float column, NaN values give an empty string.
+
+    Parameters
+    ----------
+    values : numpy.ndarray | array.array
+        Values to format.
+    template : str
+        Template the formatted number is put into.
+    precision : int | None
+        Number of decimals, None for the shortest representation of the exact value.
+    rounding : bool
+        Round to ``precision`` decimals but keep the shortest representation, as ``round`` followed by ``str``.
+
+    Returns
+    -------
+    list[str]
+        Formatted values.
+    """
+    if np is not None:
+        values = np.asarray(values, dtype="float64")
+        if rounding and precision is not None:
+            values = np.round(values, precision)
+        values = values.tolist()
+    elif rounding and precision is not None:
+        values = [round(value, precision) for value in values]
+    if precision is None or rounding:
+        return [template % repr(value) if value == value else "" for value in values]
+    number = f"%.{precision}f"
+    return [template % (number % value) if value == value else "" for value in values]
+
+
+def _shortestSingle(value: float) -> str:
+    """
+    Give the shortest representation of a float32 value widened to a Python float.
+
+    Parameters
+    ----------
+    value : float
+        Value read from a float32 column.
+
+    Returns
+    -------
+    str
+        Shortest text reading back as the same float32, written as ``repr`` writes floats.
+    """
+    for digits in range(6, 10):
+        text = "%.*g" % (digits, value)
+        if struct.unpack("f", struct.pack("f", float(text)))[0] == value:
+            return repr(float(text))
+    return repr(value)
+
+
+def _formatSingles(values, template: str) -> list[str]:
+    """
+    Format a float32 column with the shortest representation of every value, NaN values give an empty string.
+
+    Widening float32 values to float64 would write their binary noise, ``5.432`` becoming ``5.432000160217285``.
+
+    Parameters
+    ----------
+    values : numpy.ndarray | array.array
+        Values to format.
+    template : str
+        Template the formatted number is put into.
+
+    Returns
+    -------
+    list[str]
+        Formatted values.
+    """
+    if np is not None:
+        texts = np.asarray(values, dtype="float32").astype(str).tolist()
+        return ["" if text == "nan" else template % repr(float(text)) for text in texts]
+    return [template % _shortestSingle(value) if value == value else "" for value in values]
+
+
+def _formatTimes(timestamps) -> list[str]:
+    """
+    Format a timestamp column as ISO 8601 UTC times, missing timestamps give an empty string.
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray | array.array
+        Seconds since the epoch.
+
+    Returns
+    -------
+    list[str]
+        Formatted times.
+    """
+    if np is not None:
+        timestamps = np.asarray(timestamps)
+        missing = timestamps == TIMESTAMP_MISSING
+        text = np.datetime_as_string(np.where(missing, 0, timestamps).astype("datetime64[s]"), unit="s").tolist()
+        if not missing.any():
+            return [TIME % value for value in text]
+        return ["" if gap else TIME % value for value, gap in zip(text, missing.tolist())]
+    return [
+        "" if value == TIMESTAMP_MISSING else TIME % time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(value))
+        for value in timestamps
+    ]
+
+
+def write_gpx(
+    track: Track,
+    out=None,
+    version: str = "1.0",
+    coordinate_precision: int | None = None,
+    elevation_precision: int | None = 3,
+) -> bytes | None:
+    """
+    Write a track as a GPX document with a single track segment.
+
+    Points are formatted column by column and written in chunks of ``CHUNK_SIZE``, so no object is created per point
+    and at most one chunk of text is held in memory besides the output. The layout is the one of gpxpy's ``to_xml``.
+
+    Parameters
+    ----------
+    track : Track
+        Track to write.
+    out : file-like | None
+        Binary file-like object to write to, None to return the document.
+    version : str
+        GPX version, ``"1.0"`` or ``"1.1"``. Speed is only part of GPX 1.0 and left out of 1.1 documents.
+    coordinate_precision : int | None
+        Decimals of latitudes and longitudes, None to write them exactly.
+    elevation_precision : int | None
+        Decimals elevations are rounded to, None to write them exactly.
+
+    Returns
+    -------
+    bytes | None
+        GPX document if ``out`` is None.
+    """
+    if version not in HEADERS:
+        raise ValueError(f"Unsupported GPX version '{version}'.")
+    buffer = io.BytesIO() if out is None else out
+    buffer.write((HEADERS[version] % CREATOR).encode())
+    for start in range(0, len(track), CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, len(track))
+        lats = _formatNumbers(track.lat[start:stop], "%s", coordinate_precision)
+        lons = _formatNumbers(track.lon[start:stop], "%s", coordinate_precision)
+        elevations = _formatNumbers(track.altitude[start:stop], ELE, elevation_precision, rounding=True)
+        times = _formatTimes(track.timestamp[start:stop])
+        if version == "1.0":
+            speeds = _formatSingles(track.speed[start:stop], SPEED)
+        else:
+            speeds = [""] * (stop - start)
+        buffer.write("".join(map(TRKPT.__mod__, zip(lats, lons, elevations, times, speeds))).encode())
+    buffer.write(FOOTER.encode())
+    if out is None:
+        return buffer.getvalue()
+    return None
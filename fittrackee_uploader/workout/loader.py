@@ -1,25 +1,65 @@
 """Module for loading GPX."""
 
 import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from .cache import WorkoutCache
 from .fit import FitFile
 from .gpx import GPX
+from .track import Track
 
 # pylint: disable=too-few-public-methods
 
 
+def _parseFile(path: str) -> tuple | None:
+    """
+    Parse a workout file in a worker process.
+
+    Parameters
+    ----------
+    path : str
+        Path to the workout file.
+
+    Returns
+    -------
+    tuple | None
+        Class, state and track columns of the workout, or None if the file is not supported.
+    """
+    workout = Loader().loadFile(path)
+    if workout is None:
+        return None
+    # Columns are contiguous arrays, pickled as a single copy of their buffers
+    return type(workout), workout.getState(), workout.track.getColumns()
+
+
 class Loader:
-    """Class for loading GPX."""
+    """
+    Class for loading GPX.
+
+    Parameters
+    ----------
+    cache : WorkoutCache | None
+        Cache of parsed workouts, None to always parse the files.
+    """
 
     filetypes: dict = {
         ".fit": FitFile,
         ".gpx": GPX,
     }
 
-    def __init__(self):
-        """Initialise the class."""
+    def __init__(self, cache: WorkoutCache | None = None):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        cache : WorkoutCache | None
+            Cache of parsed workouts, None to always parse the files.
+        """
+        self.cache = cache
 
-    def loadFile(self, path: str) -> str | None:
+    def loadFile(self, path: str, lazy: bool = False) -> str | None:
         """
         Load a file using appropriate method.
 
@@ -27,6 +67,9 @@ class Loader:
         ----------
         path : str
             Path to file.
+        lazy : bool
+            Only read the summary of the workout, its track is decoded when it is first needed. A cached workout is
+            returned as it is, its track being memory-mapped rather than decoded, and a lazy one is not cached.
 
         Returns
         -------
@@ -34,7 +77,90 @@ class Loader:
             Path to files or None.
         """
         if os.path.isfile(path):
-            extension = os.path.splitext(path)[1]
+            # Watches name their files in capitals
+            extension = os.path.splitext(path)[1].lower()
             if extension in self.filetypes:
-                return self.filetypes[extension](path)
+                cls = self.filetypes[extension]
+                if self.cache is None:
+                    return cls(path, lazy=lazy)
+                workout = self.cache.get(path, cls)
+                if workout is None:
+                    if lazy:
+                        return cls(path, lazy=True)
+                    workout = cls(path)
+                    self.cache.put(workout)
+                return workout
         return None
+
+    def _receive(self, result: tuple | None):
+        """
+        Rebuild a workout parsed by a worker and cache it.
+
+        Parameters
+        ----------
+        result : tuple | None
+            Class, state and track columns of the workout as returned by ``_parseFile``.
+
+        Returns
+        -------
+        Workout | None
+            Workout or None if the file is not supported.
+        """
+        if result is None:
+            return None
+        cls, state, columns = result
+        workout = cls.fromState(state, Track(columns))
+        if self.cache is not None:
+            self.cache.put(workout)
+        return workout
+
+    def loadFiles(self, paths: Iterable[str], max_workers: int | None = None) -> Iterator[tuple]:
+        """
+        Load many files in parallel worker processes.
+
+        Cached workouts are returned first, the others are parsed by a process pool and returned as soon as each one is
+        done, so the order is not the one of ``paths``. Workers hand back the state of the workout and its track
+        columns, rather than the workout with its points.
+
+        Parameters
+        ----------
+        paths : Iterable[str]
+            Paths to the files.
+        max_workers : int | None
+            Number of worker processes, None for one per CPU.
+
+        Yields
+        ------
+        tuple
+            Path, workout or None if the file is not supported, and the exception raised while loading it or None.
+        """
+        pending = []
+        for path in paths:
+            extension = os.path.splitext(path)[1].lower()
+            if not os.path.isfile(path) or extension not in self.filetypes:
+                yield path, None, None
+                continue
+            workout = None
+            if self.cache is not None:
+                workout = self.cache.get(path, self.filetypes[extension])
+            if workout is not None:
+                yield path, workout, None
+            else:
+                pending.append(path)
+        if not pending:
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_parseFile, path): path for path in pending}
+            try:
+                for future in as_completed(futures):
+                    path = futures.pop(future)
+                    try:
+                        workout = self._receive(future.result())
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        yield path, None, e
+                    else:
+                        yield path, workout, None
+            finally:
+                executor.shutdown(cancel_futures=True)
+                if self.cache is not None:
+                    self.cache.save()
@@ -0,0 +1,373 @@
+"""Reduction of the points of a track before the upload."""
+
+import bisect
+import math
+import os
+
+from .geometry import haversine
+from .gpxwriter import CREATOR, FOOTER, HEADERS, write_gpx
+from .track import TIMESTAMP_MISSING, Track
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# pylint: disable=too-few-public-methods
+
+#: Smallest time in seconds between two points kept.
+MIN_INTERVAL = 5.0
+
+#: Smallest distance in metres travelled between two points kept.
+MIN_DISTANCE = 5.0
+
+#: Points staying this many metres around the same place for ``STOP_TIME`` seconds are a stop.
+STOP_RADIUS = 10.0
+STOP_TIME = 30.0
+
+
+class ReductionReport:
+    """
+    Size of an upload payload before and after the reduction of its points.
+
+    Reports can be added up, to give the totals of several uploads.
+
+    Parameters
+    ----------
+    points_before : int
+        Number of points of the track.
+    points_after : int
+        Number of points kept.
+    bytes_before : int
+        Size of the GPX payload of the whole track, estimated from the payload of the points kept.
+    bytes_after : int
+        Size of the GPX payload of the points kept.
+    """
+
+    def __init__(self, points_before: int = 0, points_after: int = 0, bytes_before: int = 0, bytes_after: int = 0):
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        points_before : int
+            Number of points of the track.
+        points_after : int
+            Number of points kept.
+        bytes_before : int
+            Size of the GPX payload of the whole track, estimated from the payload of the points kept.
+        bytes_after : int
+            Size of the GPX payload of the points kept.
+        """
+        self.points_before = points_before
+        self.points_after = points_after
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_after
+
+    def __add__(self, other: "ReductionReport") -> "ReductionReport":
+        """
+        Add up two reports.
+
+        Parameters
+        ----------
+        other : ReductionReport
+            Report of another payload.
+
+        Returns
+        -------
+        ReductionReport
+            Totals of both payloads.
+        """
+        return ReductionReport(
+            self.points_before + other.points_before,
+            self.points_after + other.points_after,
+            self.bytes_before + other.bytes_before,
+            self.bytes_after + other.bytes_after,
+        )
+
+    def __str__(self) -> str:
+        """
+        Describe the reduction.
+
+        Returns
+        -------
+        str
+            Points and kilobytes before and after.
+        """
+        return (
+            f"{self.points_before} -> {self.points_after} points, "
+            f"{self.bytes_before / 1024:.1f} -> {self.bytes_after / 1024:.1f} kB"
+        )
+
+
+class Reduction:
+    """
+    Drop the points of a track that add little to the charts of the server.
+
+    Runs of points staying within ``stop_radius`` metres for ``stop_time`` seconds, like a pause at traffic lights, are
+    collapsed to their first and last points, so the server still sees the time spent there. Elsewhere a point is only
+    kept once both ``min_interval`` seconds and ``min_distance`` metres have passed since the previous one kept. The
+    first and last points, and the points on either side of a gap in the recording, are always kept, so the start,
+    duration and pauses of the workout do not change.
+
+    Stops and the next point allowed after every point are found for all points at once on the columns of the track,
+    only the walk from one point kept to the next is a loop.
+
+    Parameters
+    ----------
+    min_interval : float
+        Smallest time in seconds between two points kept, 0 to keep them whatever their time.
+    min_distance : float
+        Smallest distance in metres travelled between two points kept, 0 to keep them whatever their distance.
+    stop_radius : float
+        Radius in metres of a stop, 0 to keep the points of stops.
+    stop_time : float
+        Smallest duration in seconds of a stop, gaps in the recording this long are kept as pauses. 0 keeps the points
+        of stops and gaps.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_INTERVAL,
+        min_distance: float = MIN_DISTANCE,
+        stop_radius: float = STOP_RADIUS,
+        stop_time: float = STOP_TIME,
+    ) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        min_interval : float
+            Smallest time in seconds between two points kept, 0 to keep them whatever their time.
+        min_distance : float
+            Smallest distance in metres travelled between two points kept, 0 to keep them whatever their distance.
+        stop_radius : float
+            Radius in metres of a stop, 0 to keep the points of stops.
+        stop_time : float
+            Smallest duration in seconds of a stop, gaps in the recording this long are kept as pauses. 0 keeps the
+            points of stops and gaps.
+        """
+        self.min_interval = max(0.0, min_interval)
+        self.min_distance = max(0.0, min_distance)
+        self.stop_radius = max(0.0, stop_radius)
+        self.stop_time = max(0.0, stop_time)
+
+    def apply(self, track: Track) -> Track:
+        """
+        Reduce a track.
+
+        Parameters
+        ----------
+        track : Track
+            Track to reduce.
+
+        Returns
+        -------
+        Track
+            Track holding the points kept, the same track if all are kept.
+        """
+        indices = self.select(track)
+        if len(indices) == len(track):
+            return track
+        return track.take(indices)
+
+    def select(self, track: Track) -> list[int]:
+        """
+        Select the points to keep.
+
+        Parameters
+        ----------
+        track : Track
+            Track to reduce.
+
+        Returns
+        -------
+        list[int]
+            Indices of the points kept, in order.
+        """
+        n = len(track)
+        if n <= 2:
+            return list(range(n))
+        if np is None:
+            return self._selectPython(track)
+        lat = np.asarray(track.lat, dtype="float64")
+        lon = np.asarray(track.lon, dtype="float64")
+        timestamps = np.asarray(track.timestamp)
+        forced = np.zeros(n, dtype="bool")
+        forced[0] = forced[-1] = True
+        steps = np.zeros(n, dtype="float64")
+        steps[1:] = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]) * 1000
+        positions = np.arange(n)
+        following = positions + 1
+        if not (timestamps == TIMESTAMP_MISSING).any():
+            # Clocks going back are ignored rather than breaking the sorted search
+            times = np.maximum.accumulate(timestamps)
+            if self.stop_time > 0:
+                gaps = np.flatnonzero(np.diff(times) >= self.stop_time)
+                forced[gaps] = forced[gaps + 1] = True
+            if self.stop_radius > 0 and self.stop_time > 0:
+                stopped = self._stops(times, lat, lon)
+                forced[1:] |= stopped[1:] != stopped[:-1]
+                forced[:-1] |= stopped[:-1] != stopped[1:]
+                # Wandering of the position during a stop is not travelled distance
+                steps[1:][stopped[:-1] & stopped[1:]] = 0.0
+            following = np.maximum(following, np.searchsorted(times, times + self.min_interval, side="left"))
+        travelled = np.cumsum(steps)
+        following = np.maximum(following, np.searchsorted(travelled, travelled + self.min_distance, side="left"))
+        kept = np.flatnonzero(forced)
+        next_forced = kept[np.minimum(np.searchsorted(kept, positions, side="right"), len(kept) - 1)]
+        jumps = np.minimum(np.minimum(following, next_forced), n - 1).tolist()
+        indices = [0]
+        while indices[-1] < n - 1:
+            indices.append(jumps[indices[-1]])
+        return indices
+
+    def _stops(self, times, lat, lon):
+        """
+        Find the points recorded during stops.
+
+        Every point starts a window of ``stop_time`` seconds, the points of windows ending within ``stop_radius``
+        metres of their start are stopped.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            Sorted seconds since the epoch.
+        lat : numpy.ndarray
+            Latitudes in degrees.
+        lon : numpy.ndarray
+            Longitudes in degrees.
+
+        Returns
+        -------
+        numpy.ndarray
+            True for the points of stops.
+        """
+        n = len(times)
+        ends = np.searchsorted(times, times + self.stop_time, side="left")
+        starts = np.flatnonzero(ends < n)
+        ends = ends[starts]
+        still = haversine(lat[starts], lon[starts], lat[ends], lon[ends]) * 1000 <= self.stop_radius
+        # Count the windows covering every point, as +1 at the start of each window and -1 after its end
+        coverage = np.zeros(n + 1, dtype="int64")
+        np.add.at(coverage, starts[still], 1)
+        np.add.at(coverage, ends[still] + 1, -1)
+        return np.cumsum(coverage[:n]) > 0
+
+    def _selectPython(self, track: Track) -> list[int]:
+        """
+        Select the points to keep without NumPy.
+
+        Parameters
+        ----------
+        track : Track
+            Track of at least three points.
+
+        Returns
+        -------
+        list[int]
+            Indices of the points kept, in order.
+        """
+        n = len(track)
+        lat = track.lat
+        lon = track.lon
+        forced = [False] * n
+        forced[0] = forced[-1] = True
+        steps = [0.0] + [haversine(lat[i - 1], lon[i - 1], lat[i], lon[i]) * 1000 for i in range(1, n)]
+        times = None
+        if TIMESTAMP_MISSING not in track.timestamp:
+            times = []
+            latest = -math.inf
+            for value in track.timestamp:
+                latest = max(latest, value)
+                times.append(latest)
+            for i in range(n - 1):
+                if self.stop_time > 0 and times[i + 1] - times[i] >= self.stop_time:
+                    forced[i] = forced[i + 1] = True
+            if self.stop_radius > 0 and self.stop_time > 0:
+                stopped = [False] * n
+                for start in range(n):
+                    end = bisect.bisect_left(times, times[start] + self.stop_time)
+                    if end < n and haversine(lat[start], lon[start], lat[end], lon[end]) * 1000 <= self.stop_radius:
+                        stopped[start : end + 1] = [True] * (end + 1 - start)
+                for i in range(1, n):
+                    if stopped[i] != stopped[i - 1]:
+                        forced[i] = forced[i - 1] = True
+                    elif stopped[i]:
+                        steps[i] = 0.0
+        travelled = []
+        total = 0.0
+        for step in steps:
+            total += step
+            travelled.append(total)
+        next_forced = [n - 1] * n
+        for i in range(n - 2, -1, -1):
+            next_forced[i] = i + 1 if forced[i + 1] else next_forced[i + 1]
+        indices = [0]
+        while indices[-1] < n - 1:
+            current = indices[-1]
+            following = bisect.bisect_left(travelled, travelled[current] + self.min_distance)
+            if times is not None:
+                following = max(following, bisect.bisect_left(times, times[current] + self.min_interval))
+            indices.append(min(max(following, current + 1), next_forced[current], n - 1))
+        return indices
+
+
+def _estimateSize(size: int, kept: int, total: int) -> int:
+    """
+    Estimate the size of the GPX payload of a whole track from the payload of the points kept.
+
+    Points are written with the same fields, so their average size is taken as the one of all points.
+
+    Parameters
+    ----------
+    size : int
+        Size of the payload of the points kept.
+    kept : int
+        Number of points kept.
+    total : int
+        Number of points of the track.
+
+    Returns
+    -------
+    int
+        Estimated size of the payload of all points.
+    """
+    overhead = len((HEADERS["1.0"] % CREATOR).encode()) + len(FOOTER)
+    if kept == 0:
+        return size
+    return overhead + round((size - overhead) * total / kept)
+
+
+def reduce_gpx(workout, reduction: Reduction) -> tuple[bytes | None, ReductionReport]:
+    """
+    Write the GPX payload of a workout with its points reduced.
+
+    Workouts uploading their own file, such as GPX files, are left as they are: writing them again would drop the
+    heart rate, cadence and other extensions the file holds.
+
+    Parameters
+    ----------
+    workout : Workout
+        Workout with GPS points.
+    reduction : Reduction
+        Settings of the reduction.
+
+    Returns
+    -------
+    tuple[bytes | None, ReductionReport]
+        GPX payload, None if the workout is uploaded as it is, and its size compared to the payload of the whole
+        track.
+    """
+    track = workout.track
+    if workout.uploads_file:
+        size = os.path.getsize(workout.getFilePath())
+        return None, ReductionReport(len(track), len(track), size, size)
+    reduced = reduction.apply(track)
+    if reduced is track:
+        after = workout.getGPX()
+        return after, ReductionReport(len(track), len(track), len(after), len(after))
+    after = write_gpx(reduced)
+    before = _estimateSize(len(after), len(reduced), len(track))
+    return after, ReductionReport(len(track), len(reduced), before, len(after))
@@ -0,0 +1,140 @@
+"""Incremental scan of a folder of workout files."""
+
+import os
+from collections.abc import Iterable, Iterator
+
+# pylint: disable=too-few-public-methods
+
+
+class Changes:
+    """
+    Files added, changed and removed since the previous scan.
+
+    Parameters
+    ----------
+    added : list[str]
+        Paths of the new files.
+    changed : list[str]
+        Paths of the files with another size or modification time.
+    removed : list[str]
+        Paths of the files gone.
+    """
+
+    def __init__(self, added: list[str], changed: list[str], removed: list[str]) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        added : list[str]
+            Paths of the new files.
+        changed : list[str]
+            Paths of the files with another size or modification time.
+        removed : list[str]
+            Paths of the files gone.
+        """
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+
+    def __bool__(self) -> bool:
+        """
+        Tell whether anything changed.
+
+        Returns
+        -------
+        bool
+            True if a file was added, changed or removed.
+        """
+        return bool(self.added or self.changed or self.removed)
+
+
+class FolderScanner:
+    """
+    List the workout files of a folder, remembering their size and modification time between scans.
+
+    Directory entries are read with ``os.scandir``, which gives their type without a ``stat`` call, and only files with
+    a supported extension are ``stat``-ed. Hidden folders are not entered.
+
+    Parameters
+    ----------
+    extensions : Iterable[str]
+        Supported extensions with their dot, like the keys of ``Loader.filetypes``, matched ignoring case.
+    recursive : bool
+        Scan the subfolders too.
+    """
+
+    def __init__(self, extensions: Iterable[str], recursive: bool = False) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        extensions : Iterable[str]
+            Supported extensions with their dot, like the keys of ``Loader.filetypes``, matched ignoring case.
+        recursive : bool
+            Scan the subfolders too.
+        """
+        self.extensions = {extension.lower() for extension in extensions}
+        self.recursive = recursive
+        self.root = None
+        self.snapshot: dict[str, tuple[int, int]] = {}
+
+    def _walk(self, folder: str) -> Iterator[tuple[str, tuple[int, int]]]:
+        """
+        Find the supported files of a folder.
+
+        Parameters
+        ----------
+        folder : str
+            Folder to scan.
+
+        Yields
+        ------
+        tuple[str, tuple[int, int]]
+            Path of a file with its size and modification time in nanoseconds.
+        """
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive and not entry.name.startswith("."):
+                        yield from self._walk(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in self.extensions and entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # Removed while scanning
+                continue
+
+    def scan(self, root: str) -> Changes:
+        """
+        Scan a folder, every file being new if it is not the folder scanned before.
+
+        Parameters
+        ----------
+        root : str
+            Folder to scan.
+
+        Returns
+        -------
+        Changes
+            Files added, changed and removed since the previous scan, each list sorted by path.
+        """
+        if root != self.root:
+            self.root = root
+            self.snapshot = {}
+        snapshot = dict(self._walk(root))
+        added = sorted(path for path in snapshot if path not in self.snapshot)
+        changed = sorted(path for path, stat in snapshot.items() if self.snapshot.get(path, stat) != stat)
+        removed = sorted(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return Changes(added, changed, removed)
+
+    def reset(self) -> None:
+        """Forget the previous scan, so the next one reports every file as new."""
+        self.root = None
+        self.snapshot = {}
@@ -0,0 +1,228 @@
+"""Douglas-Peucker simplification of tracks into levels of detail."""
+
+import math
+from array import array
+
+from .geometry import EARTH_RADIUS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+#: Tolerances in metres of the levels of detail shown on the map, from coarse to fine.
+TOLERANCES = (25.0, 5.0, 1.0)
+
+#: Points simplified together, the ends of these blocks are always kept.
+BLOCK_SIZE = 2048
+
+
+def _project(lat, lon) -> tuple:
+    """
+    Project coordinates onto a plane in metres around the first point.
+
+    An equirectangular projection is accurate enough for the extent of a single workout.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitudes in degrees.
+    lon : numpy.ndarray
+        Longitudes in degrees.
+
+    Returns
+    -------
+    tuple
+        x and y in metres.
+    """
+    scale = EARTH_RADIUS * 1000 * math.pi / 180
+    lat = np.asarray(lat, dtype="float64")
+    lon = np.asarray(lon, dtype="float64")
+    return (lon - lon[0]) * scale * math.cos(math.radians(float(lat[0]))), (lat - lat[0]) * scale
+
+
+def _segmentDistance(x, y, ax, ay, bx, by):
+    """
+    Distances of points to the segments between two other points.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray | float
+        Coordinates of the points.
+    ax, ay : numpy.ndarray | float
+        Coordinates of the start of the segments.
+    bx, by : numpy.ndarray | float
+        Coordinates of the end of the segments.
+
+    Returns
+    -------
+    numpy.ndarray | float
+        Distances, to the closest end if the point is beyond it.
+    """
+    dx = bx - ax
+    dy = by - ay
+    length = dx * dx + dy * dy
+    if np is not None and isinstance(x, np.ndarray):
+        t = np.clip(((x - ax) * dx + (y - ay) * dy) / np.where(length > 0, length, 1.0), 0.0, 1.0)
+        return np.hypot(x - ax - t * dx, y - ay - t * dy)
+    t = min(max(((x - ax) * dx + (y - ay) * dy) / length, 0.0), 1.0) if length > 0 else 0.0
+    return math.hypot(x - ax - t * dx, y - ay - t * dy)
+
+
+def importance(lat, lon, tolerance: float = TOLERANCES[-1]):
+    """
+    Compute the largest Douglas-Peucker tolerance at which every point is kept.
+
+    Douglas-Peucker picks the same point to split a segment whatever the tolerance, so running it once with the
+    finest tolerance and recording for each point the tolerance it survives gives every coarser level by a simple
+    threshold. All segments are split at once in each pass, so the number of passes follows the depth of the split
+    tree rather than the number of points. As that depth can still grow with the track, for instance on a long road
+    with regular bends, the track is first cut into blocks of ``BLOCK_SIZE`` points whose ends are always kept.
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in degrees.
+    lon : array_like
+        Longitudes in degrees.
+    tolerance : float
+        Finest tolerance in metres, points closer than this to the simplified line get 0.
+
+    Returns
+    -------
+    numpy.ndarray | array.array
+        Tolerance in metres for every point, infinite for the ends of the blocks.
+    """
+    n = len(lat)
+    if np is None:
+        return _importancePython(lat, lon, tolerance)
+    result = np.zeros(n, dtype="float64")
+    if n == 0:
+        return result
+    starts = np.arange(0, n - 1, BLOCK_SIZE)
+    ends = np.minimum(starts + BLOCK_SIZE, n - 1)
+    result[starts] = np.inf
+    result[-1] = np.inf
+    # Segments that may still be split, as the indices of their start and end points
+    keep = ends - starts > 1
+    starts = starts[keep]
+    ends = ends[keep]
+    if len(starts) == 0:
+        return result
+    x, y = _project(lat, lon)
+    positions = np.arange(n)
+    while len(starts):
+        # Interior points of the segments, grouped by segment
+        counts = ends - starts - 1
+        segment = np.repeat(np.arange(len(starts)), counts)
+        points = positions[: counts.sum()] - np.repeat(np.cumsum(counts) - counts, counts) + starts[segment] + 1
+        a = starts[segment]
+        b = ends[segment]
+        distance = _segmentDistance(x[points], y[points], x[a], y[a], x[b], y[b])
+        offsets = np.cumsum(counts) - counts
+        largest = np.maximum.reduceat(distance, offsets)
+        split = largest > tolerance
+        if not split.any():
+            break
+        # First point reaching the largest distance of every segment that is split
+        candidates = np.flatnonzero((distance == largest[segment]) & split[segment])
+        first = np.unique(segment[candidates], return_index=True)[1]
+        chosen = points[candidates[first]]
+        parents = np.flatnonzero(split)
+        result[chosen] = np.minimum(largest[parents], np.minimum(result[starts[parents]], result[ends[parents]]))
+        # Each split segment gives two new ones, kept only if they have interior points
+        new_starts = np.concatenate((starts[parents], chosen))
+        new_ends = np.concatenate((chosen, ends[parents]))
+        keep = new_ends - new_starts > 1
+        starts = new_starts[keep]
+        ends = new_ends[keep]
+    return result
+
+
+def _importancePython(lat, lon, tolerance: float) -> array:
+    """
+    Compute ``importance`` without NumPy.
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in degrees.
+    lon : array_like
+        Longitudes in degrees.
+    tolerance : float
+        Finest tolerance in metres.
+
+    Returns
+    -------
+    array.array
+        Tolerance in metres for every point.
+    """
+    n = len(lat)
+    result = array("d", [0.0]) * n
+    if n == 0:
+        return result
+    result[-1] = math.inf
+    for start in range(0, n - 1, BLOCK_SIZE):
+        result[start] = math.inf
+    scale = EARTH_RADIUS * 1000 * math.pi / 180
+    cos_lat = math.cos(math.radians(lat[0]))
+    x = [(value - lon[0]) * scale * cos_lat for value in lon]
+    y = [(value - lat[0]) * scale for value in lat]
+    stack = [(start, min(start + BLOCK_SIZE, n - 1)) for start in range(0, n - 1, BLOCK_SIZE)]
+    while stack:
+        start, end = stack.pop()
+        largest = -1.0
+        chosen = None
+        for i in range(start + 1, end):
+            distance = _segmentDistance(x[i], y[i], x[start], y[start], x[end], y[end])
+            if distance > largest:
+                largest = distance
+                chosen = i
+        if chosen is None or largest <= tolerance:
+            continue
+        result[chosen] = min(largest, result[start], result[end])
+        stack.append((start, chosen))
+        stack.append((chosen, end))
+    return result
+
+
+def simplify(lat, lon, tolerance: float) -> list[int]:
+    """
+    Simplify a track with the Douglas-Peucker algorithm.
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in degrees.
+    lon : array_like
+        Longitudes in degrees.
+    tolerance : float
+        Largest distance in metres between the track and its simplified line.
+
+    Returns
+    -------
+    list[int]
+        Indices of the points kept, in order.
+    """
+    return select(importance(lat, lon, tolerance), tolerance)
+
+
+def select(weights, tolerance: float) -> list[int]:
+    """
+    Select the points of a level of detail.
+
+    Parameters
+    ----------
+    weights : array_like
+        Result of ``importance`` computed with a tolerance of at most ``tolerance``.
+    tolerance : float
+        Tolerance of the level in metres.
+
+    Returns
+    -------
+    list[int]
+        Indices of the points kept, in order.
+    """
+    if np is not None:
+        return np.flatnonzero(np.asarray(weights) > tolerance).tolist()
+    return [i for i, weight in enumerate(weights) if weight > tolerance]
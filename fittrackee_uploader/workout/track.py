@@ -0,0 +1,371 @@
+"""Columnar storage for the points of a workout."""
+
+import calendar
+import datetime
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# pylint: disable=too-many-arguments
+
+#: Sentinel stored in the timestamp column for points without a time.
+TIMESTAMP_MISSING = -(2**63)
+
+#: Column names and their ``array`` typecodes; ``q`` is int64, ``d`` float64 and ``f`` float32.
+COLUMNS = {
+    "timestamp": "q",
+    "lat": "d",
+    "lon": "d",
+    "altitude": "f",
+    "speed": "f",
+    "heart_rate": "f",
+    "cadence": "f",
+    "temperature": "f",
+}
+
+_DTYPES = {"q": "int64", "d": "float64", "f": "float32"}
+
+
+def to_epoch(timestamp: datetime.datetime | None) -> int:
+    """
+    Convert a timestamp to whole seconds since the Unix epoch.
+
+    Naive timestamps are assumed to be UTC.
+
+    Parameters
+    ----------
+    timestamp : datetime.datetime | None
+        Timestamp to convert.
+
+    Returns
+    -------
+    int
+        Seconds since the epoch or ``TIMESTAMP_MISSING``.
+    """
+    if timestamp is None:
+        return TIMESTAMP_MISSING
+    if timestamp.tzinfo is None:
+        return calendar.timegm(timestamp.timetuple())
+    return int(timestamp.timestamp())
+
+
+def from_epoch(seconds: int) -> datetime.datetime | None:
+    """
+    Convert seconds since the Unix epoch to a UTC timestamp.
+
+    Parameters
+    ----------
+    seconds : int
+        Seconds since the epoch or ``TIMESTAMP_MISSING``.
+
+    Returns
+    -------
+    datetime.datetime | None
+        Timezone aware timestamp or None.
+    """
+    if seconds == TIMESTAMP_MISSING:
+        return None
+    return datetime.datetime.fromtimestamp(int(seconds), tz=datetime.timezone.utc)
+
+
+def _optional(value: float) -> float | None:
+    """
+    Convert NaN to None.
+
+    Parameters
+    ----------
+    value : float
+        Value read from a float column.
+
+    Returns
+    -------
+    float | None
+        Value or None if it is missing.
+    """
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return value
+
+
+class Track:
+    """
+    Columnar track storage.
+
+    Each column is a contiguous typed array: int64 epoch seconds for ``timestamp``, float64 for ``lat``/``lon`` and
+    float32 for the remaining sensor columns with NaN marking missing values. Columns are NumPy arrays when NumPy is
+    installed and ``array.array`` otherwise.
+
+    Parameters
+    ----------
+    columns : dict | None
+        Mapping of column name to array like values, all of the same length. Missing columns are filled with NaN.
+    """
+
+    def __init__(self, columns: dict | None = None) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        columns : dict | None
+            Mapping of column name to array like values, all of the same length. Missing columns are filled with NaN.
+        """
+        columns = columns or {}
+        length = len(columns["lat"]) if "lat" in columns else 0
+        for name, typecode in COLUMNS.items():
+            if name in columns:
+                column = self._asColumn(columns[name], typecode)
+            elif typecode == "q":
+                column = self._asColumn(array(typecode, [TIMESTAMP_MISSING]) * length, typecode)
+            else:
+                column = self._asColumn(array(typecode, [math.nan]) * length, typecode)
+            if len(column) != length:
+                raise ValueError(f"Column '{name}' has {len(column)} values, expected {length}.")
+            setattr(self, name, column)
+
+    @staticmethod
+    def _asColumn(values, typecode: str):
+        """
+        Convert values to the column storage type.
+
+        Parameters
+        ----------
+        values : array_like
+            Values of the column.
+        typecode : str
+            ``array`` typecode of the column.
+
+        Returns
+        -------
+        numpy.ndarray | array.array
+            Column in the preferred storage type.
+        """
+        if np is not None:
+            if isinstance(values, array):
+                return np.frombuffer(values, dtype=_DTYPES[typecode])
+            return np.asarray(values, dtype=_DTYPES[typecode])
+        if isinstance(values, array) and values.typecode == typecode:
+            return values
+        return array(typecode, values)
+
+    @classmethod
+    def fromPoints(cls, points: list) -> "Track":
+        """
+        Build a track from a list of ``Point`` objects.
+
+        Parameters
+        ----------
+        points : list
+            List of ``Point`` objects.
+
+        Returns
+        -------
+        Track
+            Track holding the points.
+        """
+        builder = TrackBuilder()
+        for point in points:
+            builder.append(
+                to_epoch(point.timestamp),
+                point.position[0],
+                point.position[1],
+                point.altitude,
+                point.speed,
+                point.heart_rate,
+                point.cadence,
+                point.temperature,
+            )
+        return builder.build()
+
+    def __len__(self) -> int:
+        """
+        Return the number of points.
+
+        Returns
+        -------
+        int
+            Number of points in the track.
+        """
+        return len(self.lat)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the columns.
+
+        Returns
+        -------
+        int
+            Size of all columns in bytes.
+        """
+        return sum(len(getattr(self, name)) * array(typecode).itemsize for name, typecode in COLUMNS.items())
+
+    def getColumns(self) -> dict:
+        """
+        Get all columns.
+
+        Returns
+        -------
+        dict
+            Mapping of column name to column.
+        """
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def getRow(self, index: int) -> tuple:
+        """
+        Get the values of a single row.
+
+        Parameters
+        ----------
+        index : int
+            Row of the point, negative values count from the end.
+
+        Returns
+        -------
+        tuple
+            Timestamp, ``(lat, lon)`` position, altitude, speed, heart rate, cadence and temperature, in the order of
+            the ``Point`` arguments.
+        """
+        return (
+            from_epoch(self.timestamp[index]),
+            (float(self.lat[index]), float(self.lon[index])),
+            _optional(self.altitude[index]),
+            _optional(self.speed[index]),
+            _optional(self.heart_rate[index]),
+            _optional(self.cadence[index]),
+            _optional(self.temperature[index]),
+        )
+
+    def getPath(self) -> list[tuple[float, float]]:
+        """
+        Get latitude/longitude pairs.
+
+        Returns
+        -------
+        list[tuple[float, float]]
+            Latitude and longitude of every point.
+        """
+        if np is not None:
+            return list(zip(self.lat.tolist(), self.lon.tolist()))
+        return list(zip(self.lat, self.lon))
+
+    def take(self, indices) -> "Track":
+        """
+        Build a new track from a subset of rows.
+
+        Parameters
+        ----------
+        indices : array_like
+            Rows to keep, in order.
+
+        Returns
+        -------
+        Track
+            Track holding the selected rows.
+        """
+        if np is not None:
+            indices = np.asarray(indices, dtype="intp")
+            return Track({name: column[indices] for name, column in self.getColumns().items()})
+        return Track(
+            {name: array(COLUMNS[name], (column[i] for i in indices)) for name, column in self.getColumns().items()}
+        )
+
+    def sortByTime(self) -> "Track":
+        """
+        Sort the rows by timestamp.
+
+        Returns
+        -------
+        Track
+            This track if it is already sorted, else a sorted copy.
+        """
+        timestamps = self.timestamp
+        if np is not None:
+            if len(timestamps) < 2 or bool(np.all(timestamps[1:] >= timestamps[:-1])):
+                return self
+            return self.take(np.argsort(timestamps, kind="stable"))
+        if all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            return self
+        return self.take(sorted(range(len(timestamps)), key=timestamps.__getitem__))
+
+
+class TrackBuilder:
+    """
+    Incrementally build a ``Track`` one point at a time.
+
+    Values are appended to ``array.array`` buffers so no per-point objects are kept while loading.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the class."""
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+    def __len__(self) -> int:
+        """
+        Return the number of points appended so far.
+
+        Returns
+        -------
+        int
+            Number of points.
+        """
+        return len(self.columns["lat"])
+
+    def append(
+        self,
+        timestamp: int,
+        lat: float,
+        lon: float,
+        altitude: float = None,
+        speed: float = None,
+        heart_rate: float = None,
+        cadence: float = None,
+        temperature: float = None,
+    ) -> None:
+        """
+        Append a point.
+
+        Parameters
+        ----------
+        timestamp : int
+            Seconds since the epoch or ``TIMESTAMP_MISSING``.
+        lat : float
+            Latitude in degrees.
+        lon : float
+            Longitude in degrees.
+        altitude : float
+            Altitude in metres.
+        speed : float
+            Speed in metres per second.
+        heart_rate : float
+            Heart rate in beats per minute.
+        cadence : float
+            Cadence.
+        temperature : float
+            Temperature in degrees Celsius.
+        """
+        columns = self.columns
+        columns["timestamp"].append(timestamp)
+        columns["lat"].append(lat)
+        columns["lon"].append(lon)
+        columns["altitude"].append(math.nan if altitude is None else altitude)
+        columns["speed"].append(math.nan if speed is None else speed)
+        columns["heart_rate"].append(math.nan if heart_rate is None else heart_rate)
+        columns["cadence"].append(math.nan if cadence is None else cadence)
+        columns["temperature"].append(math.nan if temperature is None else temperature)
+
+    def build(self) -> Track:
+        """
+        Build the track.
+
+        Returns
+        -------
+        Track
+            Track holding the appended points.
+        """
+        return Track(self.columns)
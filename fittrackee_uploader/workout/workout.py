@@ -1,9 +1,15 @@
 """Sub-module for working with a worklout."""
 
-import math
+import datetime
+import io
+from collections.abc import Sequence
 from pathlib import Path
+from typing import BinaryIO
 
-import gpxpy
+from .geometry import Geometry
+from .gpxwriter import write_gpx
+from .simplify import TOLERANCES, importance, select
+from .track import Track
 
 # pylint: disable=too-many-arguments
 # pylint: disable=too-many-instance-attributes
@@ -13,10 +19,14 @@ class Workout:
     """
     Workout class.
 
+    The points are held in a columnar ``Track``; ``points`` is a lazy view creating ``Point`` objects on access. A
+    workout created without points is lazy: only its summary is known and subclasses decode the track in
+    ``_loadTrack`` the first time ``track``, ``points`` or one of the methods using them is accessed.
+
     Parameters
     ----------
-    points : None
-        GPS points.
+    points : Track | list | None
+        GPS points, either as a ``Track`` or a list of ``Point`` objects, None to load them on demand.
     path : str | Path
         Path to file.
     stats : str
@@ -33,9 +43,15 @@ class Workout:
         Descent of workout.
     """
 
+    #: Attributes that are not part of the state returned by ``getState``.
+    transient: tuple = ("_track", "_geometry", "_detail")
+
+    #: Whether the file itself is uploaded, keeping data the track does not hold, rather than written from the track.
+    uploads_file: bool = False
+
     def __init__(
         self,
-        points: None,
+        points: Track | list | None,
         path: str | Path,
         stats: str = "",
         date: str = None,
@@ -49,8 +65,8 @@ class Workout:
 
         Parameters
         ----------
-        points : None
-            GPS points.
+        points : Track | list | None
+            GPS points, either as a ``Track`` or a list of ``Point`` objects, None to load them on demand.
         path : str | Path
             Path to file.
         stats : str
@@ -66,7 +82,12 @@ class Workout:
         descent : int | float
             Descent of workout.
         """
-        self.points = points
+        if points is None or isinstance(points, Track):
+            self._track = points
+        else:
+            self._track = Track.fromPoints(points)
+        self._geometry = None
+        self._detail = None
         self.stats = stats
         self.path = path
         self.date = date
@@ -75,6 +96,89 @@ class Workout:
         self.ascent = ascent
         self.descent = descent
 
+    @property
+    def track(self) -> Track:
+        """
+        Columnar track of the workout, decoded on first access for lazy workouts.
+
+        Returns
+        -------
+        Track
+            Track of the workout.
+        """
+        if self._track is None:
+            self._track = self._loadTrack()
+        return self._track
+
+    def _loadTrack(self) -> Track:
+        """
+        Decode the track of a lazy workout.
+
+        Returns
+        -------
+        Track
+            Track of the workout.
+        """
+        return Track()
+
+    def getState(self) -> dict:
+        """
+        Get the summary attributes of the workout, everything but the track.
+
+        Returns
+        -------
+        dict
+            Mapping of attribute name to value.
+        """
+        return {key: value for key, value in vars(self).items() if key not in self.transient}
+
+    @classmethod
+    def fromState(cls, state: dict, track: Track | None = None) -> "Workout":
+        """
+        Recreate a workout from its state without reading the file.
+
+        Parameters
+        ----------
+        state : dict
+            Summary attributes as returned by ``getState``.
+        track : Track | None
+            Track of the workout, None to decode it from the file on demand.
+
+        Returns
+        -------
+        Workout
+            Workout of the same class as the one the state was taken from.
+        """
+        workout = cls.__new__(cls)
+        for key in cls.transient:
+            setattr(workout, key, None)
+        workout.__dict__.update(state)
+        workout._track = track  # pylint: disable=protected-access
+        return workout
+
+    def isLoaded(self) -> bool:
+        """
+        Whether the track has been decoded.
+
+        Returns
+        -------
+        bool
+            Boolean indicating whether the track is in memory.
+        """
+        return self._track is not None
+
+    @property
+    def points(self) -> "Points":
+        """
+        Lazy view of the track as ``Point`` objects.
+
+        Returns
+        -------
+        Points
+            Sequence of ``Point`` objects.
+        """
+        return Points(self.track)
+
     def getExtent(self) -> list[tuple[float, float], tuple[float, float]]:
         """
         Extract bounding box for track.
@@ -84,20 +188,7 @@ class Workout:
         tuple
             Minimum and Maximum latitude/longitude which forms a bounding box around GPS points.
         """
-        min_lat = self.points[0].getLat()
-        max_lat = min_lat
-        min_lon = self.points[0].getLong()
-        max_lon = min_lon
-
-        for point in self.points:
-            lat = point.getLat()
-            lon = point.getLong()
-            max_lat = max(lat, max_lat)
-            min_lat = min(lat, min_lat)
-            max_lon = max(lon, max_lon)
-            min_lon = min(lon, min_lon)
-
-        return [(min_lat, min_lon), (max_lat, max_lon)]
+        return self.getGeometry().extent
 
     def getCenter(self) -> tuple[float, float]:
         """
@@ -108,12 +199,46 @@ class Workout:
         tuple[float, float]
             Latitude and Longitude of mid-point of bounding box.
         """
-        extent = self.getExtent()
-        min_coord = extent[0]
-        max_coord = extent[1]
-        center_lat = ((max_coord[0] - min_coord[0]) / 2) + min_coord[0]
-        center_lon = ((max_coord[1] - min_coord[1]) / 2) + min_coord[1]
-        return (center_lat, center_lon)
+        return self.getGeometry().center
+
+    def getGeometry(self) -> Geometry:
+        """
+        Get the geometry of the track.
+
+        The geometry is computed once per track and cached.
+
+        Returns
+        -------
+        Geometry
+            Distances, bounding box and center of the track.
+        """
+        track = self.track
+        if self._geometry is None or self._geometry[0] is not track:
+            self._geometry = (track, Geometry(track.lat, track.lon))
+        return self._geometry[1]
+
+    def getLevels(self, tolerances: tuple[float, ...] = TOLERANCES) -> list[list[tuple[float, float]]]:
+        """
+        Get simplified paths of the track for the map.
+
+        The importance of every point is computed once per track and cached, each level is then a selection of
+        points. The full track is left untouched for the upload.
+
+        Parameters
+        ----------
+        tolerances : tuple[float, ...]
+            Largest distance in metres between the track and each simplified path.
+
+        Returns
+        -------
+        list[list[tuple[float, float]]]
+            Latitude and longitude of the points of every level, in the order of ``tolerances``.
+        """
+        track = self.track
+        finest = min(tolerances, default=0.0)
+        if self._detail is None or self._detail[0] is not track or self._detail[1] > finest:
+            self._detail = (track, finest, importance(track.lat, track.lon, finest))
+        return [track.take(select(self._detail[2], tolerance)).getPath() for tolerance in tolerances]
 
     def getPath(self) -> list[float]:
         """
@@ -124,41 +249,44 @@ class Workout:
         list
             List of GPS latitude and longitude.
         """
-        path = []
-        for point in self.points:
-            path.append(point.position)
-        return path
+        return self.track.getPath()
 
-    def getGPX(self, precision: int = 3) -> str:
+    def getGPX(
+        self, precision: int = 3, version: str = "1.0", coordinate_precision: int | None = None, out=None
+    ) -> bytes | None:
         """
         Extract GPX data.
 
-        Extracts latitude, longitude, altitude, timestamp and speed from GPX returning as XML.
+        Writes latitude, longitude, altitude, timestamp and speed of every point as GPX, see ``write_gpx``.
 
         Parameters
         ----------
         precision : int
             Decimal places to round altitude to.
+        version : str
+            GPX version, ``"1.0"`` or ``"1.1"``.
+        coordinate_precision : int | None
+            Decimal places of latitude and longitude, None to keep them exact.
+        out : file-like | None
+            Binary file-like object to write to, None to return the GPX.
 
         Returns
         -------
-        str
-            XML version of GPX track.
-        """
-        gpx = gpxpy.gpx.GPX()
-        # Create first track in our GPX:
-        gpx_track = gpxpy.gpx.GPXTrack()
-        gpx.tracks.append(gpx_track)
-        # Create first segment in our GPX track:
-        gpx_segment = gpxpy.gpx.GPXTrackSegment()
-        gpx_track.segments.append(gpx_segment)
-        # Create points:
-        for point in self.points:
-            point = gpxpy.gpx.GPXTrackPoint(
-                point.getLat(), point.getLong(), round(point.altitude, precision), point.timestamp, speed=point.speed
-            )
-            gpx_segment.points.append(point)
-        return gpx.to_xml(version="1.0")
+        bytes | None
+            GPX track as XML if ``out`` is None.
+        """
+        return write_gpx(self.track, out, version, coordinate_precision, precision)
+
+    def openGPX(self) -> BinaryIO:
+        """
+        Open the GPX data for uploading.
+
+        Returns
+        -------
+        BinaryIO
+            Binary file-like object with the GPX track.
+        """
+        return io.BytesIO(self.getGPX())
 
     def getStats(self) -> dict:
         """
@@ -182,6 +310,37 @@ class Workout:
         """
         return self.path
 
+    def _summaryStart(self) -> datetime.datetime | None:
+        """
+        Get the start of the workout from its summary, for lazy workouts whose track is not decoded yet.
+
+        Returns
+        -------
+        datetime.datetime | None
+            Start time or None if the summary does not tell it.
+        """
+        return None
+
+    def getStart(self) -> datetime.datetime | None:
+        """
+        Get the time of the first point, by which FitTrackee dates a workout uploaded as GPX.
+
+        Lazy workouts take it from their summary when it is known, without decoding the track.
+
+        Returns
+        -------
+        datetime.datetime | None
+            Start time, the date of the workout if it has no points or its first point has no time, None if neither is
+            known.
+        """
+        if not self.isLoaded():
+            start = self._summaryStart()
+            if start is not None:
+                return start
+        if len(self.points) > 0 and self.points[0].timestamp is not None:
+            return self.points[0].timestamp
+        return self.getDate()
+
     def getDate(self) -> str:
         """
         Get date.
@@ -218,44 +377,63 @@ class Workout:
             Distance.
         """
         if self.distance is None:
-            distance = 0.0
-            for i in range(len(self.points) - 1):
-                distance += self._distance(self.points[i].position, self.points[i + 1].position)
-            return distance
+            return self.getGeometry().distance
         return self.distance
 
-    def _distance(self, origin: tuple, destination: tuple) -> float:
-        """
-        Calculate distance in kilometres between two points.
 
-        Uses the `Great-circle distance https://en.wikipedia.org/wiki/Great-circle_distance` method to calculate the
-        distance between two points on the surface of a sphere, in this case the Earth's  surface.
+class Points(Sequence):
+    """
+    Lazy sequence of ``Point`` objects backed by a ``Track``.
+
+    Points are only created when indexed, so iterating a long track does not keep them all alive.
+
+    Parameters
+    ----------
+    track : Track
+        Track to view.
+    """
+
+    def __init__(self, track: Track) -> None:
+        """
+        Initialise the class.
 
         Parameters
         ----------
-        origin : tuple
-            Starting latitude/longitude.
-        destination : tuple
-            Finishing latitude/longitude.
+        track : Track
+            Track to view.
+        """
+        self.track = track
+
+    def __len__(self) -> int:
+        """
+        Return the number of points.
 
         Returns
         -------
-        float
-            Distance between two points in km.
+        int
+            Number of points in the track.
         """
-        lat1, lon1 = origin
-        lat2, lon2 = destination
-        radius = 6371  # km
+        return len(self.track)
 
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat / 2) * math.sin(dlat / 2) + math.cos(math.radians(lat1)) * math.cos(
-            math.radians(lat2)
-        ) * math.sin(dlon / 2) * math.sin(dlon / 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        d = radius * c
+    def __getitem__(self, index: int | slice):
+        """
+        Get a point or a list of points.
 
-        return d
+        Parameters
+        ----------
+        index : int | slice
+            Index or slice of points.
+
+        Returns
+        -------
+        Point | list
+            Point at ``index`` or list of points for a slice.
+        """
+        if isinstance(index, slice):
+            return [Point(*self.track.getRow(i)) for i in range(*index.indices(len(self.track)))]
+        if not -len(self.track) <= index < len(self.track):
+            raise IndexError("point index out of range")
+        return Point(*self.track.getRow(index))
 
 
 class Point:
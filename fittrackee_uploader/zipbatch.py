@@ -0,0 +1,267 @@
+"""Pack many workouts into zip archives uploaded in a single request each."""
+
+import datetime
+import tempfile
+import time
+import zipfile
+import zlib
+from email.utils import parsedate_to_datetime
+
+from .fittrackee import FitTrackee
+
+# pylint: disable=too-few-public-methods
+
+#: Limits of a FitTrackee server with its default configuration, used if the server does not give them.
+DEFAULT_LIMITS = {"file_limit_import": 10, "max_single_file_size": 1024**2, "max_zip_file_size": 10 * 1024**2}
+
+#: Seconds to wait for the workouts of an archive accepted without them, and between two looks for them.
+ARCHIVE_TIMEOUT = 120
+ARCHIVE_POLL_INTERVAL = 5
+
+#: Archives are kept in memory up to this size and spill to a temporary file beyond.
+SPOOL_SIZE = 8 * 1024**2
+
+#: Bytes of the headers of an entry, besides twice its name, and of the end of the archive.
+_ENTRY_OVERHEAD = 30 + 46
+_END_OVERHEAD = 22
+
+
+class Chunk:
+    """Zip archive of GPX files within the limits of the server."""
+
+    def __init__(self) -> None:
+        """Initialise the class."""
+        self.paths = []
+        self.dates = {}
+        self.size = _END_OVERHEAD
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)  # pylint: disable=consider-using-with
+        self.archive = zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED)  # pylint: disable=consider-using-with
+
+    def add(self, path: str, date: datetime.datetime, gpx: bytes, name: str) -> None:
+        """
+        Add a GPX file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        date : datetime.datetime
+            Start of the workout, to find it in the answer of the server.
+        gpx : bytes
+            GPX file.
+        name : str
+            Name of the entry.
+        """
+        self.archive.writestr(name, gpx)
+        self.paths.append(path)
+        self.dates[path] = date
+
+    def close(self) -> None:
+        """Finish the archive and rewind it for the upload."""
+        self.archive.close()
+        self.file.seek(0)
+
+
+class ZipPacker:
+    """
+    Pack GPX files into archives holding as many as the server accepts.
+
+    The compressed size of every file is measured before adding it, with the same compressor as ``zipfile``, so an
+    archive is closed before it would grow beyond ``max_zip_file_size``.
+
+    Parameters
+    ----------
+    limits : dict
+        ``file_limit_import`` (``gpx_limit_import`` before FitTrackee 0.8), ``max_single_file_size`` and
+        ``max_zip_file_size`` as given by the server.
+    """
+
+    def __init__(self, limits: dict) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        limits : dict
+            ``file_limit_import`` (``gpx_limit_import`` before FitTrackee 0.8), ``max_single_file_size`` and
+            ``max_zip_file_size`` as given by the server.
+        """
+        max_files = limits.get("file_limit_import") or limits.get("gpx_limit_import")
+        self.max_files = max(1, int(max_files or DEFAULT_LIMITS["file_limit_import"]))
+        self.max_file_size = int(limits.get("max_single_file_size") or DEFAULT_LIMITS["max_single_file_size"])
+        self.max_size = int(limits.get("max_zip_file_size") or DEFAULT_LIMITS["max_zip_file_size"])
+        self.count = 0
+        self.chunk = None
+
+    def add(self, path: str, workout, gpx: bytes | None = None) -> Chunk | None:
+        """
+        Add a workout with GPS records.
+
+        Parameters
+        ----------
+        path : str
+            Path to the workout file.
+        workout : Workout
+            Workout to add.
+        gpx : bytes | None
+            GPX payload prepared in advance, read from the workout if None.
+
+        Returns
+        -------
+        Chunk | None
+            Archive completed to make room for the workout, ready for the upload.
+
+        Raises
+        ------
+        ValueError
+            If the GPX file of the workout is larger than the server accepts, or the workout has no start time.
+        """
+        # FitTrackee dates a workout from a GPX file by its first point, the workout is found back by that time
+        start = workout.points[0].timestamp if len(workout.points) > 0 else None
+        start = start or workout.getDate()
+        if start is None:
+            raise ValueError("Workout without a start time")
+        if gpx is None:
+            with workout.openGPX() as gpx_file:
+                gpx = gpx_file.read()
+        if len(gpx) > self.max_file_size:
+            raise ValueError(f"GPX file of {len(gpx)} bytes, the server accepts up to {self.max_file_size}")
+        name = f"{self.count:06d}.gpx"
+        self.count += 1
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        size = len(compressor.compress(gpx)) + len(compressor.flush()) + _ENTRY_OVERHEAD + 2 * len(name)
+        done = None
+        if self.chunk is not None and (
+            len(self.chunk.paths) >= self.max_files or self.chunk.size + size > self.max_size
+        ):
+            done = self.flush()
+        if self.chunk is None:
+            self.chunk = Chunk()
+        self.chunk.add(path, start, gpx, name)
+        self.chunk.size += size
+        return done
+
+    def flush(self) -> Chunk | None:
+        """
+        Complete the current archive.
+
+        Returns
+        -------
+        Chunk | None
+            Archive ready for the upload or None if it is empty.
+        """
+        chunk = self.chunk
+        self.chunk = None
+        if chunk is not None:
+            chunk.close()
+        return chunk
+
+
+def match_workouts(
+    dates: dict[str, datetime.datetime], workouts: list[dict], tolerance: float = 60
+) -> dict[str, str | None]:
+    """
+    Map the workouts created from an archive back to their files by their start times.
+
+    Parameters
+    ----------
+    dates : dict[str, datetime.datetime]
+        Start of the workout of every file.
+    workouts : list[dict]
+        Workouts returned by the server.
+    tolerance : float
+        Largest difference in seconds between the start times.
+
+    Returns
+    -------
+    dict[str, str | None]
+        ID of the workout created from every file, None if there is none.
+    """
+    remaining = {workout["id"]: parsedate_to_datetime(workout["workout_date"]) for workout in workouts}
+    result = {}
+    for path, date in sorted(dates.items(), key=lambda item: item[1]):
+        best = None
+        for workout_id, workout_date in remaining.items():
+            difference = abs((workout_date - date).total_seconds())
+            if difference <= tolerance and (best is None or difference < best[1]):
+                best = (workout_id, difference)
+        result[path] = None if best is None else best[0]
+        if best is not None:
+            del remaining[best[0]]
+    return result
+
+
+def upload_chunk(
+    api: FitTrackee, chunk: Chunk, sport_id: int, equipment_id: str, title: str = ""
+) -> dict[str, str | None]:
+    """
+    Upload an archive.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API.
+    chunk : Chunk
+        Archive to upload.
+    sport_id : int
+        Sport ID.
+    equipment_id : str
+        Equipment ID.
+    title : str
+        Title for every workout.
+
+    Returns
+    -------
+    dict[str, str | None]
+        ID of the workout created from every file, None for all of them if the server rejected the archive.
+    """
+    try:
+        workouts = api.post_archive(chunk.file, sport_id, equipment_id, title=title)
+    finally:
+        chunk.file.close()
+    if workouts is None:
+        return dict.fromkeys(chunk.paths)
+    if workouts:
+        return match_workouts(chunk.dates, workouts)
+    return find_created(api, chunk.dates)
+
+
+def find_created(
+    api: FitTrackee, dates: dict[str, datetime.datetime], timeout: float = ARCHIVE_TIMEOUT
+) -> dict[str, str | None]:
+    """
+    Look for the workouts of an archive the server accepted without listing them, while it creates them.
+
+    Every look lists the workouts of the days of the archive at once, rather than looking up every file.
+
+    Parameters
+    ----------
+    api : FitTrackee
+        Logged in API.
+    dates : dict[str, datetime.datetime]
+        Start of the workout of every file.
+    timeout : float
+        Longest wait in seconds for the workouts to show up.
+
+    Returns
+    -------
+    dict[str, str | None]
+        ID of the workout created from every file, None if it did not show up in time.
+    """
+    # A day around the starts covers the dates of the server, which may be in another time zone
+    date_from = min(dates.values()) - datetime.timedelta(days=1)
+    date_to = max(dates.values()) + datetime.timedelta(days=1)
+    deadline = time.monotonic() + timeout
+    while True:
+        workouts = []
+        page = 1
+        while True:
+            found, pagination = api.get_workouts(page, date_from=date_from, date_to=date_to)
+            workouts += found
+            if not pagination.get("has_next"):
+                break
+            page += 1
+        result = match_workouts(dates, workouts)
+        if all(result.values()) or time.monotonic() >= deadline:
+            return result
+        time.sleep(ARCHIVE_POLL_INTERVAL)
@@ -0,0 +1 @@
+"""Tests of fittrackee_uploader."""
@@ -0,0 +1,298 @@
+"""Fixtures for the tests."""
+
+import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from fittrackee_uploader.outbox import Outbox
+
+# pylint: disable=redefined-outer-name,too-many-arguments,too-many-positional-arguments,too-many-instance-attributes
+
+#: Folder of the sample files.
+DATA = Path(__file__).parent / "data"
+
+#: Start of the workouts of the tests.
+START = datetime.datetime(2024, 5, 1, 7, 30, tzinfo=datetime.timezone.utc)
+
+GPX = b'<?xml version="1.0" encoding="UTF-8"?>\n<gpx version="1.1"></gpx>\n'
+
+
+def write_gpx_file(
+    path, count: int = 100, name: str = "Morning ride", timed: bool = True, start: datetime.datetime = START
+):
+    """
+    Write a GPX file with a track heading north-east at about 5 m/s.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+    count : int
+        Number of track points, one per second.
+    name : str
+        Name of the track.
+    timed : bool
+        Whether the points have a time.
+    start : datetime.datetime
+        Time of the first point.
+
+    Returns
+    -------
+    Path
+        Path to the file.
+    """
+    points = []
+    for i in range(count):
+        time = (start + datetime.timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        points.append(
+            f'<trkpt lat="{47.3 + i * 3e-5:.6f}" lon="{8.5 + i * 4e-5:.6f}"><ele>{400 + i % 7}</ele>'
+            + (f"<time>{time}</time>" if timed else "")
+            + "</trkpt>"
+        )
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="tests" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk><name>{name}</name><trkseg>{''.join(points)}</trkseg></trk></gpx>\n"
+    )
+    return path
+
+
+class FakeWorkout:
+    """
+    Workout with what the outbox reads from it.
+
+    Parameters
+    ----------
+    with_points : bool
+        Whether the workout has GPS points.
+    """
+
+    def __init__(self, with_points: bool = True) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        with_points : bool
+            Whether the workout has GPS points.
+        """
+        self.points = [SimpleNamespace(timestamp=START)] if with_points else []
+        self.ascent = 120.0
+        self.descent = 118.0
+
+    def getDate(self) -> datetime.datetime:
+        """
+        Get the start of the workout.
+
+        Returns
+        -------
+        datetime.datetime
+            Start of the workout.
+        """
+        return START
+
+    def getTime(self) -> datetime.timedelta:
+        """
+        Get the duration of the workout.
+
+        Returns
+        -------
+        datetime.timedelta
+            Duration of the workout.
+        """
+        return datetime.timedelta(hours=1)
+
+    def getDistance(self) -> float:
+        """
+        Get the distance of the workout.
+
+        Returns
+        -------
+        float
+            Distance in kilometres.
+        """
+        return 30.0
+
+
+class FakeFitTrackee:
+    """
+    FitTrackee API recording the requests, whose answers are set by the tests.
+
+    Attributes
+    ----------
+    posts : list[dict]
+        Workouts posted with a GPX file.
+    no_gpx : list[dict]
+        Workouts created without a GPX file.
+    titles : list[tuple[str, str]]
+        Workout ID and title of every title set.
+    finds : list[datetime.datetime]
+        Dates looked up.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the class."""
+        self.posts = []
+        self.no_gpx = []
+        self.titles = []
+        self.finds = []
+        #: Message of the connection error raised by the next post, as if the connection dropped after the server
+        #: created the workout, empty for none.
+        self.post_failure = ""
+        #: Whether the server sets the title given with the GPX file.
+        self.title_in_data = True
+        #: Whether the server accepts titles set afterwards.
+        self.title_ok = True
+        #: Whether the server accepts workouts without a GPX file.
+        self.no_gpx_ok = True
+        #: Workouts on the server by start time.
+        self.workouts = {}
+
+    def post_workout(self, file, sport_id: int, equipment_id: str, notes: str = "", title: str = "") -> dict | None:
+        """
+        Create a workout from a GPX file.
+
+        Parameters
+        ----------
+        file : file-like
+            GPX payload.
+        sport_id : int
+            Sport ID.
+        equipment_id : str
+            Equipment ID.
+        notes : str
+            Notes of the workout.
+        title : str
+            Title of the workout.
+
+        Returns
+        -------
+        dict | None
+            The new workout.
+        """
+        workout_id = f"w{len(self.posts) + 1}"
+        self.posts.append(
+            {"payload": file.read(), "sport_id": sport_id, "equipment_id": equipment_id, "notes": notes, "title": title}
+        )
+        self.workouts[START] = workout_id
+        if self.post_failure:
+            message, self.post_failure = self.post_failure, ""
+            raise ConnectionError(message)
+        return {"id": workout_id, "title": title if self.title_in_data else "Cycling workout"}
+
+    def add_workout_no_gpx(self, date: str, duration, distance, sport_id, title, notes, ascent, descent) -> bool:
+        """
+        Create a workout without a GPX file.
+
+        Parameters
+        ----------
+        date : str
+            Start of the workout.
+        duration : float
+            Duration in seconds.
+        distance : float
+            Distance in kilometres.
+        sport_id : int
+            Sport ID.
+        title : str
+            Title of the workout.
+        notes : str
+            Notes of the workout.
+        ascent : float
+            Ascent in metres.
+        descent : float
+            Descent in metres.
+
+        Returns
+        -------
+        bool
+            Whether the server accepted the workout.
+        """
+        self.no_gpx.append(
+            {
+                "date": date,
+                "duration": duration,
+                "distance": distance,
+                "sport_id": sport_id,
+                "title": title,
+                "notes": notes,
+                "ascent": ascent,
+                "descent": descent,
+            }
+        )
+        return self.no_gpx_ok
+
+    def set_title(self, workout_id: str, title: str) -> bool:
+        """
+        Set the title of a workout.
+
+        Parameters
+        ----------
+        workout_id : str
+            Workout ID.
+        title : str
+            New title.
+
+        Returns
+        -------
+        bool
+            Whether the server accepted the title.
+        """
+        self.titles.append((workout_id, title))
+        return self.title_ok
+
+    def find_workout(self, date: datetime.datetime, tolerance: float = 60) -> str | None:
+        """
+        Look up a workout by its start.
+
+        Parameters
+        ----------
+        date : datetime.datetime
+            Start of the workout.
+        tolerance : float
+            Largest difference in seconds.
+
+        Returns
+        -------
+        str | None
+            Workout ID or None if there is none.
+        """
+        self.finds.append(date)
+        for start, workout_id in self.workouts.items():
+            if abs((start - date).total_seconds()) <= tolerance:
+                return workout_id
+        return None
+
+
+@pytest.fixture()
+def api() -> FakeFitTrackee:
+    """Create a fake FitTrackee API."""
+    return FakeFitTrackee()
+
+
+@pytest.fixture()
+def outbox(tmp_path):
+    """Open an empty outbox."""
+    box = Outbox(tmp_path / "outbox")
+    yield box
+    box.close()
+
+
+@pytest.fixture()
+def config(tmp_path) -> SimpleNamespace:
+    """Make a configuration moving uploaded files to their own folder."""
+    uploaded = tmp_path / "uploaded"
+    uploaded.mkdir()
+    return SimpleNamespace(move_after_upload=True, uploaded_folder=str(uploaded), add_info_to_file_name=False)
+
+
+@pytest.fixture()
+def workout_file(tmp_path):
+    """Write a workout file waiting for its upload."""
+    folder = tmp_path / "workouts"
+    folder.mkdir()
+    path = folder / "ride.fit"
+    path.write_bytes(b"FIT")
+    return path
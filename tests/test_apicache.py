@@ -0,0 +1,73 @@
+"""Tests of the cache of the API resources."""
+
+from types import SimpleNamespace
+
+from fittrackee_uploader.apicache import ApiCache
+
+SERVER = "https://fittrackee.example/"
+SPORTS = [{"id": 1, "label": "Cycling (Sport)"}, {"id": 2, "label": "Ski de fond à Zürich"}]
+
+
+def _api(answers: list, url: str = SERVER) -> SimpleNamespace:
+    """
+    Make an API answering the given resources in turn and recording the ETags sent.
+
+    Parameters
+    ----------
+    answers : list
+        Status, data and ETag of every answer.
+    url : str
+        URL of the server.
+
+    Returns
+    -------
+    SimpleNamespace
+        API with ``url``, ``get_json`` and the ETags sent in ``etags``.
+    """
+    etags = []
+
+    def get_json(path: str, etag: str | None = None) -> tuple:
+        """Answer the next request."""
+        assert path == "api/sports"
+        etags.append(etag)
+        return answers.pop(0)
+
+    return SimpleNamespace(url=url, get_json=get_json, etags=etags)
+
+
+def test_refresh(tmp_path) -> None:
+    """Resources are stored with their ETag, sent back on the next refresh, and read back from the file."""
+    path = tmp_path / "api.json"
+    cache = ApiCache(path)
+    api = _api([(200, SPORTS, '"v1"'), (304, None, '"v1"')])
+    assert cache.get(SERVER, "sports") is None
+    assert cache.refresh(api, "sports") == (200, True)
+    assert cache.refresh(api, "sports") == (304, False)
+    assert api.etags == [None, '"v1"']
+    assert ApiCache(path).get(SERVER, "sports") == SPORTS
+
+
+def test_refresh_errors(tmp_path) -> None:
+    """Errors and a 304 without a cached copy leave the cache as it is."""
+    cache = ApiCache(tmp_path / "api.json")
+    assert cache.refresh(_api([(304, None, '"v1"')]), "sports") == (304, False)
+    assert cache.refresh(_api([(500, None, None)]), "sports") == (500, False)
+    assert cache.get(SERVER, "sports") is None
+
+
+def test_server_and_age(tmp_path) -> None:
+    """Resources of another server and too old ones are not used, clearing forgets all of them."""
+    path = tmp_path / "api.json"
+    cache = ApiCache(path)
+    cache.refresh(_api([(200, SPORTS, '"v1"')]), "sports")
+    assert cache.get("https://other.example/", "sports") is None
+    assert ApiCache(path, max_age=-1).get(SERVER, "sports") is None
+    cache.clear()
+    assert ApiCache(path).get(SERVER, "sports") is None
+
+
+def test_broken_file(tmp_path) -> None:
+    """A file that is not JSON is ignored."""
+    path = tmp_path / "api.json"
+    path.write_text("{", encoding="utf-8")
+    assert ApiCache(path).get(SERVER, "sports") is None
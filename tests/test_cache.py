@@ -0,0 +1,112 @@
+"""Tests of the cache of parsed workouts."""
+
+import os
+
+import pytest
+
+from fittrackee_uploader.workout import cache as cache_module
+from fittrackee_uploader.workout.cache import WorkoutCache, decode, encode
+from fittrackee_uploader.workout.gpx import GPX
+from fittrackee_uploader.workout.loader import Loader
+
+from .conftest import write_gpx_file
+
+
+def _same(first, second) -> None:
+    """
+    Check two workouts hold the same summary and track.
+
+    Parameters
+    ----------
+    first : Workout
+        Workout parsed from its file.
+    second : Workout
+        Workout read from the cache.
+    """
+    assert second.getDate() == first.getDate()
+    assert second.getTime() == first.getTime()
+    assert second.name == first.name
+    assert len(second.track) == len(first.track)
+    for column, values in first.track.getColumns().items():
+        for value, copy in zip(values, getattr(second.track, column)):
+            assert copy == pytest.approx(value, abs=1e-6, nan_ok=True), column
+
+
+def test_round_trip(tmp_path) -> None:
+    """A workout encoded and decoded again is the same, up to the quantization of its coordinates."""
+    workout = GPX(str(write_gpx_file(tmp_path / "ride.gpx")))
+    copy = decode(encode(workout), GPX)
+    assert copy.getDate() == workout.getDate()
+    assert copy.name == workout.name
+    assert list(copy.track.timestamp) == list(workout.track.timestamp)
+    assert max(abs(a - b) for a, b in zip(copy.track.lat, workout.track.lat)) < 1e-6
+
+
+def test_hit(tmp_path) -> None:
+    """A file loaded again comes from the cache, also in a new session once the index is saved."""
+    path = str(write_gpx_file(tmp_path / "ride.gpx"))
+    cache = WorkoutCache(tmp_path / "cache")
+    loader = Loader(cache)
+    first = loader.loadFile(path)
+    second = loader.loadFile(path)
+    _same(first, second)
+    assert cache.getStats()["hits"] == 1
+    cache.save()
+    again = WorkoutCache(tmp_path / "cache")
+    _same(first, again.get(path, GPX))
+
+
+def test_changed(tmp_path) -> None:
+    """An entry is dropped once its file changes, but not if only its modification time changed."""
+    path = write_gpx_file(tmp_path / "ride.gpx")
+    cache = WorkoutCache(tmp_path / "cache")
+    cache.put(GPX(str(path)))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # Files cached without a digest are parsed again once, the lookup taking the digest for the new entry
+    assert cache.get(str(path), GPX) is None
+    cache.put(GPX(str(path)))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    assert cache.get(str(path), GPX) is not None
+    write_gpx_file(path, count=101)
+    assert cache.get(str(path), GPX) is None
+    assert cache.getStats()["entries"] == 0
+
+
+def test_evict(tmp_path) -> None:
+    """The least recently used entries are removed once the cache is full."""
+    paths = [str(write_gpx_file(tmp_path / f"ride{i}.gpx")) for i in range(3)]
+    size = len(encode(GPX(paths[0])))
+    cache = WorkoutCache(tmp_path / "cache", max_size=2 * size)
+    cache.put(GPX(paths[0]))
+    cache.put(GPX(paths[1]))
+    assert cache.get(paths[0], GPX) is not None
+    cache.put(GPX(paths[2]))
+    assert cache.get(paths[1], GPX) is None
+    assert cache.get(paths[0], GPX) is not None
+    assert cache.get(paths[2], GPX) is not None
+    assert cache.getStats()["size"] <= 2 * size
+
+
+def test_index_saved_in_batches(tmp_path, monkeypatch) -> None:
+    """The index is not written with every entry, only every ``SAVE_EVERY`` entries and by ``save``."""
+    monkeypatch.setattr(cache_module, "SAVE_EVERY", 2)
+    paths = [str(write_gpx_file(tmp_path / f"ride{i}.gpx")) for i in range(3)]
+    cache = WorkoutCache(tmp_path / "cache")
+    cache.put(GPX(paths[0]))
+    assert not cache.index_path.exists()
+    cache.put(GPX(paths[1]))
+    assert len(WorkoutCache(tmp_path / "cache").index["entries"]) == 2
+    cache.put(GPX(paths[2]))
+    assert len(WorkoutCache(tmp_path / "cache").index["entries"]) == 2
+    cache.save()
+    assert len(WorkoutCache(tmp_path / "cache").index["entries"]) == 3
+
+
+def test_disabled(tmp_path) -> None:
+    """A cache of size 0 stores nothing."""
+    path = str(write_gpx_file(tmp_path / "ride.gpx"))
+    cache = WorkoutCache(tmp_path / "cache", max_size=0)
+    cache.put(GPX(path))
+    assert cache.get(path, GPX) is None
+    assert not (tmp_path / "cache").exists()
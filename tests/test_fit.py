@@ -0,0 +1,83 @@
+"""Tests of the FIT workouts and of the streaming FIT decoder."""
+
+import pytest
+
+from fittrackee_uploader.workout.fit import PROJECTION, FitFile
+from fittrackee_uploader.workout.fitstream import FitDecodeError, FitStream
+
+from .conftest import DATA
+
+fitdecode = pytest.importorskip("fitdecode")
+
+#: Sample file with a session and GPS records.
+SHORT = DATA / "short.fit"
+
+
+def _rows(workout: FitFile) -> list[tuple]:
+    """
+    Get all points of a workout.
+
+    Parameters
+    ----------
+    workout : FitFile
+        Workout.
+
+    Returns
+    -------
+    list[tuple]
+        Values of every point.
+    """
+    return [workout.track.getRow(i) for i in range(len(workout.track))]
+
+
+def test_records_as_fitdecode() -> None:
+    """The projected fields of the records are decoded to the values of ``fitdecode``."""
+    fields = PROJECTION["record"]
+    expected = [
+        {field.name: field.value for field in frame.fields if field.name in fields and field.value is not None}
+        for frame in fitdecode.FitReader(SHORT)
+        if frame.frame_type == fitdecode.FIT_FRAME_DATA and frame.name == "record"
+    ]
+    records = [
+        {name: value for name, value in values.items() if value is not None}
+        for name, values in FitStream(SHORT, {"record": fields})
+        if name == "record"
+    ]
+    assert len(records) > 0
+    assert records == pytest.approx(expected)
+
+
+def test_workout_as_fitdecode() -> None:
+    """A workout read with the streaming decoder is the same as one read with ``fitdecode``."""
+    stream = FitFile(SHORT)
+    full = FitFile(SHORT, projection=None)
+    assert len(stream.track) > 0
+    assert _rows(stream) == _rows(full)
+    assert (stream.date, stream.time, stream.distance, stream.ascent, stream.descent) == (
+        full.date,
+        full.time,
+        full.distance,
+        full.ascent,
+        full.descent,
+    )
+    assert stream.getStats() == full.getStats()
+
+
+def test_lazy() -> None:
+    """A lazy workout has the summary of a full one and decodes the same track when needed."""
+    lazy = FitFile(SHORT, lazy=True)
+    full = FitFile(SHORT)
+    assert not lazy.isLoaded()
+    assert (lazy.date, lazy.time, lazy.distance) == (full.date, full.time, full.distance)
+    assert _rows(lazy) == _rows(full)
+    assert lazy.isLoaded()
+
+
+def test_invalid(tmp_path) -> None:
+    """Files that are not FIT files and unknown fields are refused."""
+    path = tmp_path / "broken.fit"
+    path.write_bytes(b"not a fit file at all")
+    with pytest.raises(FitDecodeError):
+        list(FitStream(path, PROJECTION))
+    with pytest.raises(ValueError, match="Unknown fields"):
+        FitStream(SHORT, {"record": ("power",)})
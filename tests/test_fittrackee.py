@@ -0,0 +1,95 @@
+"""Tests of the FitTrackee API client."""
+
+import io
+import logging
+
+import pytest
+import requests
+
+from fittrackee_uploader.fittrackee import FitTrackee
+
+# pylint: disable=redefined-outer-name,too-few-public-methods
+
+
+class Answer:
+    """
+    Answer of the server to a request.
+
+    Parameters
+    ----------
+    status_code : int
+        Status of the answer.
+    text : str
+        Body of the answer.
+    json : dict | None
+        Body decoded as JSON, None if it is not JSON.
+    """
+
+    def __init__(self, status_code: int, text: str = "", json: dict | None = None) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        status_code : int
+            Status of the answer.
+        text : str
+            Body of the answer.
+        json : dict | None
+            Body decoded as JSON, None if it is not JSON.
+        """
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = text
+        self._json = json
+
+    def json(self) -> dict:
+        """
+        Decode the body.
+
+        Returns
+        -------
+        dict
+            Body decoded as JSON.
+
+        Raises
+        ------
+        requests.JSONDecodeError
+            If the body is not JSON.
+        """
+        if self._json is None:
+            raise requests.JSONDecodeError("Expecting value", self.text, 0)
+        return self._json
+
+
+@pytest.fixture()
+def api(monkeypatch):
+    """Create an API whose POST requests get the answer set by the test."""
+    client = FitTrackee()
+    client.setUrl("https://fittrackee.example")
+    client.answers = []
+    monkeypatch.setattr(client.session, "post", lambda *args, **kwargs: client.answers.pop(0))
+    yield client
+    client.close()
+
+
+def test_post_archive_created(api) -> None:
+    """The workouts created from an archive are returned."""
+    workouts = [{"id": "w1", "title": "Ride"}]
+    api.answers.append(Answer(201, json={"data": {"workouts": workouts}}))
+    assert api.post_archive(io.BytesIO(b"zip"), 1, "", title="Ride") == workouts
+
+
+def test_post_archive_accepted(api) -> None:
+    """An archive accepted for processing in the background gives no workouts, but is not rejected."""
+    api.answers.append(Answer(202, text=""))
+    assert api.post_archive(io.BytesIO(b"zip"), 1, "") == []
+
+
+def test_post_archive_rejected(api, caplog) -> None:
+    """An archive rejected by a proxy with an HTML page is logged with its status, not decoded."""
+    api.answers.append(Answer(413, text="<html><body>Request Entity Too Large</body></html>"))
+    with caplog.at_level(logging.WARNING):
+        assert api.post_archive(io.BytesIO(b"zip"), 1, "") is None
+    assert "413" in caplog.text
+    assert "Request Entity Too Large" in caplog.text
@@ -0,0 +1,142 @@
+"""Tests of the GPX workouts."""
+
+import datetime
+import io
+
+import pytest
+
+from fittrackee_uploader.workout.gpx import GPX, parse_time
+from fittrackee_uploader.workout.track import TIMESTAMP_MISSING, to_epoch
+
+from .conftest import START, write_gpx_file
+
+WAYPOINTS = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="tests" xmlns="http://www.topografix.com/GPX/1/1">
+  <wpt lat="47.3" lon="8.5"><name>Coffee stop</name></wpt>
+  <trk>
+    <name>Evening ride</name>
+    <trkseg>
+      <trkpt lat="47.3" lon="8.5"><time>2024-05-01T07:30:00Z</time></trkpt>
+      <trkpt lat="47.301" lon="8.501"><time>2024-05-01T07:31:40Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+EXTENSIONS = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="tests" xmlns="http://www.topografix.com/GPX/1/1"
+  xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <metadata><name>Commute</name></metadata>
+  <trk>
+    <name>Track</name>
+    <trkseg>
+      <trkpt lat="47.3" lon="8.5">
+        <ele>401.5</ele><time>2024-05-01T09:30:00+02:00</time>
+        <extensions><gpxtpx:TrackPointExtension>
+          <gpxtpx:atemp>18</gpxtpx:atemp><gpxtpx:hr>132</gpxtpx:hr><gpxtpx:cad>85</gpxtpx:cad>
+        </gpxtpx:TrackPointExtension></extensions>
+      </trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="47.301" lon="8.501"><ele>n/a</ele><time>2024-05-01T07:30:05Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+ROUTE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="tests" xmlns="http://www.topografix.com/GPX/1/1">
+  <wpt lat="46.0" lon="7.0"/>
+  <rte><rtept lat="47.3" lon="8.5"/><rtept lat="47.4" lon="8.6"/></rte>
+</gpx>
+"""
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("2024-05-01T07:30:00Z", START),
+        ("2024-05-01T07:30:00.750Z", START),
+        ("2024-05-01 07:30:00", START),
+        ("2024-05-01T09:30:00+02:00", START),
+        ("2024-05-01T05:00:00-0230", START),
+    ],
+)
+def test_parse_time(text: str, expected: datetime.datetime) -> None:
+    """Timestamps are read as UTC seconds, with or without fractions and timezone."""
+    assert parse_time(text) == to_epoch(expected)
+
+
+@pytest.mark.parametrize("text", [None, "", "yesterday", "2024-05-01"])
+def test_parse_time_invalid(text: str | None) -> None:
+    """Missing and invalid timestamps are marked as missing."""
+    assert parse_time(text) == TIMESTAMP_MISSING
+
+
+def test_parse(tmp_path) -> None:
+    """The points of all segments are read with their extensions, the name from the metadata."""
+    path = tmp_path / "ride.gpx"
+    path.write_text(EXTENSIONS)
+    workout = GPX(str(path))
+    assert workout.name == "Commute"
+    assert workout.track.getRow(0) == (START, (47.3, 8.5), 401.5, None, 132.0, 85.0, 18.0)
+    assert workout.track.getRow(1) == (
+        START + datetime.timedelta(seconds=5),
+        (47.301, 8.501),
+        None,
+        None,
+        None,
+        None,
+        None,
+    )
+
+
+def test_parse_route(tmp_path) -> None:
+    """A file without tracks is read as its route rather than its waypoints."""
+    path = tmp_path / "route.gpx"
+    path.write_text(ROUTE)
+    workout = GPX(str(path))
+    assert workout.track.getPath() == [(47.3, 8.5), (47.4, 8.6)]
+    assert workout.getDate() is None
+
+
+def test_passthrough(tmp_path) -> None:
+    """The original file is uploaded as it is, and only written again when options are given."""
+    path = tmp_path / "ride.gpx"
+    path.write_text(EXTENSIONS)
+    workout = GPX(str(path), lazy=True)
+    assert workout.getGPX() == path.read_bytes()
+    out = io.BytesIO()
+    assert workout.getGPX(out=out) is None
+    assert out.getvalue() == path.read_bytes()
+    with workout.openGPX() as gpx_file:
+        assert gpx_file.read() == path.read_bytes()
+    assert not workout.isLoaded()
+    rewritten = workout.getGPX(version="1.1")
+    assert rewritten != path.read_bytes()
+    assert b"<trkpt" in rewritten
+
+
+def test_lazy_summary(tmp_path) -> None:
+    """The summary read without parsing the track is the one of the full parse."""
+    path = str(write_gpx_file(tmp_path / "ride.gpx", count=300))
+    lazy = GPX(path, lazy=True)
+    assert not lazy.isLoaded()
+    full = GPX(path)
+    assert lazy.name == full.name == "Morning ride"
+    assert lazy.getDate() == full.getDate() == START
+    assert lazy.getTime() == full.getTime() == datetime.timedelta(seconds=299)
+    assert not lazy.isLoaded()
+    assert len(lazy.track) == 300
+    assert lazy.name == "Morning ride"
+
+
+def test_lazy_name_not_from_waypoint(tmp_path) -> None:
+    """The name of a waypoint before the track is not taken as the name of the workout."""
+    path = tmp_path / "ride.gpx"
+    path.write_text(WAYPOINTS)
+    lazy = GPX(str(path), lazy=True)
+    assert lazy.name == "Evening ride"
+    assert GPX(str(path)).name == "Evening ride"
+    assert len(lazy.points) == 2
+    assert lazy.name == "Evening ride"
@@ -0,0 +1,113 @@
+"""Tests of the streaming GPX writer."""
+
+import datetime
+
+import pytest
+
+from fittrackee_uploader.workout import gpxwriter
+from fittrackee_uploader.workout import track as track_module
+from fittrackee_uploader.workout.gpxwriter import CREATOR, write_gpx
+from fittrackee_uploader.workout.track import Track, to_epoch
+
+from .conftest import START
+
+gpxpy = pytest.importorskip("gpxpy")
+
+
+def _rows() -> list[tuple]:
+    """
+    Make the points of a short ride, with speeds as recorded by FIT devices.
+
+    Returns
+    -------
+    list[tuple]
+        Latitude, longitude, elevation, time and speed of every point.
+    """
+    return [
+        (47.3 + i * 1e-4, 8.5 + i * 2e-4, 400 + i * 0.2, START + datetime.timedelta(seconds=i), 5.432 + i * 0.001)
+        for i in range(50)
+    ]
+
+
+def _baseline(rows: list[tuple], version: str) -> str:
+    """
+    Serialise points with gpxpy, as uploads were written before the streaming writer.
+
+    Parameters
+    ----------
+    rows : list[tuple]
+        Latitude, longitude, elevation, time and speed of every point.
+    version : str
+        GPX version.
+
+    Returns
+    -------
+    str
+        GPX document.
+    """
+    gpx = gpxpy.gpx.GPX()
+    gpx.creator = CREATOR
+    track = gpxpy.gpx.GPXTrack()
+    gpx.tracks.append(track)
+    segment = gpxpy.gpx.GPXTrackSegment()
+    track.segments.append(segment)
+    for lat, lon, elevation, time, speed in rows:
+        segment.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon, round(elevation, 3), time, speed=round(speed, 3)))
+    return gpx.to_xml(version=version)
+
+
+def _track(rows: list[tuple]) -> Track:
+    """
+    Store points in track columns.
+
+    Parameters
+    ----------
+    rows : list[tuple]
+        Latitude, longitude, elevation, time and speed of every point.
+
+    Returns
+    -------
+    Track
+        Track of the points.
+    """
+    lat, lon, elevation, time, speed = zip(*rows)
+    return Track(
+        {"lat": lat, "lon": lon, "altitude": elevation, "timestamp": [to_epoch(t) for t in time], "speed": speed}
+    )
+
+
+@pytest.mark.parametrize("version", ["1.0", "1.1"])
+def test_same_as_baseline(version: str) -> None:
+    """The writer gives the document gpxpy gives for the same points, float32 speeds without noise."""
+    rows = _rows()
+    document = write_gpx(_track(rows), version=version).decode()
+    assert document == _baseline(rows, version)
+    if version == "1.0":
+        assert "<speed>5.432</speed>" in document
+
+
+def test_same_without_numpy(monkeypatch) -> None:
+    """The fallback on ``array`` columns writes the same document."""
+    rows = _rows()
+    monkeypatch.setattr(track_module, "np", None)
+    monkeypatch.setattr(gpxwriter, "np", None)
+    assert write_gpx(_track(rows)).decode() == _baseline(rows, "1.0")
+
+
+def test_chunks_to_file(tmp_path, monkeypatch) -> None:
+    """Writing to a file in several chunks gives the same document."""
+    rows = _rows()
+    monkeypatch.setattr(gpxwriter, "CHUNK_SIZE", 7)
+    path = tmp_path / "ride.gpx"
+    with path.open("wb") as out:
+        assert write_gpx(_track(rows), out) is None
+    assert path.read_text() == _baseline(rows, "1.0")
+
+
+def test_missing_values() -> None:
+    """Missing elevations, times and speeds are left out of their points."""
+    document = write_gpx(Track({"lat": [47.3], "lon": [8.5]})).decode()
+    assert '<trkpt lat="47.3" lon="8.5">\n      </trkpt>' in document
+    assert "<ele>" not in document
+    assert "<time>" not in document
+    assert "<speed>" not in document
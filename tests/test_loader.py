@@ -0,0 +1,59 @@
+"""Tests of the parallel loader."""
+
+import shutil
+
+import pytest
+
+from fittrackee_uploader.workout.cache import WorkoutCache
+from fittrackee_uploader.workout.fit import FitFile
+from fittrackee_uploader.workout.gpx import GPX
+from fittrackee_uploader.workout.loader import Loader
+
+from .conftest import DATA, write_gpx_file
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def folder(tmp_path):
+    """Write a folder with GPX and FIT files, a broken file and a file of another type."""
+    for i in range(3):
+        write_gpx_file(tmp_path / f"ride{i}.gpx", count=50 + i)
+    shutil.copy(DATA / "short.fit", tmp_path / "short.FIT")
+    (tmp_path / "broken.gpx").write_text("<gpx><trk>")
+    (tmp_path / "notes.txt").write_text("Notes")
+    return tmp_path
+
+
+def test_load_files(folder) -> None:
+    """Workers give the same workouts as parsing in this process, with errors and unsupported files reported."""
+    paths = sorted(str(path) for path in folder.iterdir())
+    results = {path: (workout, error) for path, workout, error in Loader().loadFiles(paths, max_workers=2)}
+    assert set(results) == set(paths)
+    assert results[str(folder / "notes.txt")] == (None, None)
+    assert results[str(folder / "broken.gpx")][0] is None
+    assert results[str(folder / "broken.gpx")][1] is not None
+    assert isinstance(results[str(folder / "short.FIT")][0], FitFile)
+    for path in paths:
+        workout = results[path][0]
+        if workout is None:
+            continue
+        expected = Loader().loadFile(path)
+        assert type(workout) is type(expected)
+        assert workout.getDate() == expected.getDate()
+        assert workout.getDistance() == pytest.approx(expected.getDistance())
+        assert len(workout.track) == len(expected.track)
+        assert list(workout.track.timestamp) == list(expected.track.timestamp)
+        assert list(workout.track.lat) == list(expected.track.lat)
+
+
+def test_load_files_cached(folder, tmp_path_factory) -> None:
+    """Parsed workouts are cached, and returned from the cache by the next load."""
+    cache = WorkoutCache(tmp_path_factory.mktemp("cache"))
+    paths = [str(folder / f"ride{i}.gpx") for i in range(3)]
+    list(Loader(cache).loadFiles(paths, max_workers=2))
+    assert cache.getStats()["entries"] == 3
+    assert cache.index_path.exists()
+    workouts = [workout for _, workout, _ in Loader(cache).loadFiles(paths, max_workers=2)]
+    assert cache.getStats()["hits"] == 3
+    assert all(isinstance(workout, GPX) for workout in workouts)
@@ -0,0 +1,209 @@
+"""Tests of the outbox."""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from fittrackee_uploader import outbox as outbox_module
+from fittrackee_uploader.outbox import ARCHIVED, FAILED, POSTED, QUEUED, TITLED, Outbox, UploadBusy
+from fittrackee_uploader.workout.gpx import GPX as GPXWorkout
+
+from .conftest import GPX, START, FakeWorkout, write_gpx_file
+
+# pylint: disable=protected-access
+
+
+def test_add(outbox, workout_file) -> None:
+    """A new upload is queued with its payload stored."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    entry = outbox.get(upload_id)
+    assert entry["state"] == QUEUED
+    assert entry["step"] == QUEUED
+    assert (outbox.folder / entry["payload"]).read_bytes() == GPX
+    assert [pending["id"] for pending in outbox.getPending()] == [upload_id]
+
+
+def test_add_untimed(outbox, workout_file, tmp_path) -> None:
+    """A workout whose points have no time is dated by the workout, and refused when that is unknown too."""
+    workout = FakeWorkout()
+    workout.points[0].timestamp = None
+    upload_id = outbox.add(workout_file, workout, GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    assert json.loads(outbox.get(upload_id)["workout"])["start"] == START.isoformat()
+    path = write_gpx_file(tmp_path / "untimed.gpx", timed=False)
+    with pytest.raises(ValueError, match="start time"):
+        outbox.add(str(path), GPXWorkout(str(path)), None, 1, "Cycling (Sport)", "", "Ride", "Notes")
+
+
+def test_process(outbox, api, config, workout_file) -> None:
+    """An upload goes through all steps and its payload and file are cleaned up."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    payload = outbox.folder / outbox.get(upload_id)["payload"]
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert entry["workout_id"] == "w1"
+    assert entry["payload"] is None
+    assert len(api.posts) == 1
+    assert api.posts[0]["payload"] == GPX
+    assert api.titles == []
+    assert not payload.exists()
+    assert not workout_file.exists()
+    assert (Path(config.uploaded_folder) / workout_file.name).exists()
+    assert outbox.getPending() == []
+
+
+def test_resume_after_failed_post(outbox, api, config, workout_file) -> None:
+    """A post whose answer was lost is found on the server when resumed, not posted again."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    api.post_failure = "Connection reset"
+    with pytest.raises(ConnectionError):
+        outbox.process(upload_id, api, config)
+    entry = outbox.get(upload_id)
+    assert entry["state"] == FAILED
+    assert entry["step"] == QUEUED
+    assert entry["attempts"] == 1
+    assert entry["error"] == "Connection reset"
+    assert entry["owner"] is None
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert entry["workout_id"] == "w1"
+    assert api.finds == [START]
+    assert len(api.posts) == 1
+
+
+def test_resume_posts_missing_workout(outbox, api, config, workout_file) -> None:
+    """A failed post that did not reach the server is posted again."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    api.post_failure = "Connection refused"
+    with pytest.raises(ConnectionError):
+        outbox.process(upload_id, api, config)
+    api.workouts.clear()
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert entry["attempts"] == 2
+    assert len(api.posts) == 2
+
+
+def test_title_fallback(outbox, api, config, workout_file) -> None:
+    """Servers ignoring the title of the post get it set afterwards."""
+    api.title_in_data = False
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert api.titles == [("w1", "Ride")]
+
+
+def test_title_rejected(outbox, api, config, workout_file) -> None:
+    """A rejected title fails the upload at the posted step, resuming only sets the title."""
+    api.title_in_data = False
+    api.title_ok = False
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == FAILED
+    assert entry["step"] == POSTED
+    assert entry["error"] == "Title not set by the server"
+    assert workout_file.exists()
+    api.title_ok = True
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert len(api.posts) == 1
+    assert api.titles == [("w1", "Ride"), ("w1", "Ride")]
+
+
+def test_no_gpx(outbox, api, config, workout_file) -> None:
+    """Workouts without GPS points are created from their summary, with their title."""
+    upload_id = outbox.add(workout_file, FakeWorkout(with_points=False), None, 1, "Cycling (Sport)", "", "Ride", "")
+    entry = outbox.get(upload_id)
+    assert entry["payload"] is None
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert api.posts == []
+    assert api.titles == []
+    assert api.no_gpx == [
+        {
+            "date": START.strftime("%Y-%m-%d %H:%M"),
+            "duration": 3600.0,
+            "distance": 30.0,
+            "sport_id": 1,
+            "title": "Ride",
+            "notes": "",
+            "ascent": 120.0,
+            "descent": 118.0,
+        }
+    ]
+
+
+def test_no_gpx_rejected(outbox, api, config, workout_file) -> None:
+    """A rejected workout without GPS points stays queued."""
+    api.no_gpx_ok = False
+    upload_id = outbox.add(workout_file, FakeWorkout(with_points=False), None, 1, "Cycling (Sport)", "", "Ride", "")
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == FAILED
+    assert entry["step"] == QUEUED
+    assert entry["error"] == "Rejected by the server"
+    assert workout_file.exists()
+
+
+def test_archived_file_missing(outbox, api, config, workout_file) -> None:
+    """A file moved by an interrupted attempt does not fail the upload."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "", "")
+    outbox._advance(upload_id, TITLED, workout_id="w1")  # pylint: disable=protected-access
+    workout_file.unlink()
+    entry = outbox.process(upload_id, api, config)
+    assert entry["state"] == ARCHIVED
+    assert api.posts == []
+
+
+def test_claim(outbox, api, config, workout_file) -> None:
+    """An upload claimed by another live process or thread is not run."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "")
+    other = Outbox(outbox.folder)
+    try:
+        assert other.claim(upload_id)
+        assert not outbox.claim(upload_id)
+        with pytest.raises(UploadBusy):
+            outbox.process(upload_id, api, config)
+        assert api.posts == []
+        other.release(upload_id)
+        assert outbox.process(upload_id, api, config)["state"] == ARCHIVED
+    finally:
+        other.close()
+
+
+def test_claim_expired(outbox, workout_file) -> None:
+    """Claims of a process gone or of another machine without progress are taken over."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "")
+    outbox.db.execute("UPDATE uploads SET owner = ? WHERE id = ?", ("elsewhere:1", upload_id))
+    assert not outbox.claim(upload_id)
+    outbox.db.execute(
+        "UPDATE uploads SET updated = ? WHERE id = ?", (time.time() - outbox_module.LEASE_TIME - 1, upload_id)
+    )
+    assert outbox.claim(upload_id)
+
+
+def test_purge(outbox, api, config, workout_file) -> None:
+    """Archived uploads and old payloads without an upload are removed, young ones are kept."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "")
+    outbox.process(upload_id, api, config)
+    young = outbox.folder / "young.gpx"
+    young.write_bytes(GPX)
+    old = outbox.folder / "old.gpx"
+    old.write_bytes(GPX)
+    past = time.time() - outbox_module.PAYLOAD_GRACE - 1
+    os.utime(old, (past, past))
+    outbox.purge()
+    assert outbox.get(upload_id) is None
+    assert young.exists()
+    assert not old.exists()
+
+
+def test_update_columns(outbox, workout_file) -> None:
+    """Only the columns changed by the steps can be updated, the others are kept."""
+    upload_id = outbox.add(workout_file, FakeWorkout(), GPX, 1, "Cycling (Sport)", "", "Ride", "Notes")
+    outbox._update(upload_id, state=FAILED, error="Rejected")
+    entry = outbox.get(upload_id)
+    assert (entry["state"], entry["step"], entry["error"], entry["title"]) == (FAILED, QUEUED, "Rejected", "Ride")
+    with pytest.raises(ValueError, match="title"):
+        outbox._update(upload_id, title="Other")
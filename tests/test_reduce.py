@@ -0,0 +1,99 @@
+"""Tests of the reduction of the points of the upload payloads."""
+
+import pytest
+
+from fittrackee_uploader.workout import reduce as reduce_module
+from fittrackee_uploader.workout.gpx import GPX
+from fittrackee_uploader.workout.reduce import Reduction, reduce_gpx
+from fittrackee_uploader.workout.track import Track, to_epoch
+from fittrackee_uploader.workout.workout import Workout
+
+from .conftest import START, write_gpx_file
+
+# pylint: disable=redefined-outer-name
+
+#: Degrees of latitude of about a metre.
+METRE = 1 / 111_195
+
+
+def _ride() -> Track:
+    """
+    Make a ride at 5 m/s, with a stop of a minute and a gap in the recording of two minutes.
+
+    Returns
+    -------
+    Track
+        Track of one point per second.
+    """
+    lat, timestamps = [], []
+    position = 47.3
+    second = to_epoch(START)
+    for i in range(400):
+        # Standing still from 100 to 160 s, wandering by half a metre
+        if 100 <= i < 160:
+            position += (0.5 if i % 2 else -0.5) * METRE
+        else:
+            position += 5 * METRE
+        # Recording paused between 300 and 420 s
+        second += 121 if i == 300 else 1
+        lat.append(position)
+        timestamps.append(second)
+    return Track({"lat": lat, "lon": [8.5] * len(lat), "timestamp": timestamps, "altitude": [400.0] * len(lat)})
+
+
+@pytest.fixture(params=["numpy", "python"])
+def reduction(request, monkeypatch) -> Reduction:
+    """Make a reduction with the default settings, with and without NumPy."""
+    if request.param == "python":
+        monkeypatch.setattr(reduce_module, "np", None)
+    return Reduction()
+
+
+def test_select(reduction) -> None:
+    """Points are kept every 5 s and 5 m, stops keep their ends, the ends of the track and of the gap are kept."""
+    track = _ride()
+    indices = reduction.select(track)
+    assert indices[0] == 0
+    assert indices[-1] == len(track) - 1
+    assert indices == sorted(set(indices))
+    assert 300 in indices
+    assert 301 in indices
+    stopped = [i for i in indices if 100 <= i < 160]
+    assert len(stopped) <= 3
+    # Away from the stop and the gap, points are 5 s apart
+    riding = [i for i in indices if i < 95]
+    assert all(b - a >= 5 for a, b in zip(riding, riding[1:]))
+    assert len(indices) < len(track) / 4
+
+
+def test_select_same_with_and_without_numpy(monkeypatch) -> None:
+    """The NumPy and the plain Python selections keep the same points."""
+    track = _ride()
+    expected = Reduction().select(track)
+    monkeypatch.setattr(reduce_module, "np", None)
+    assert Reduction().select(track) == expected
+
+
+def test_disabled() -> None:
+    """A reduction of zeros keeps every point."""
+    track = _ride()
+    assert Reduction(0, 0, 0, 0).apply(track) is track
+
+
+def test_reduce_gpx(tmp_path) -> None:
+    """Workouts written from their track are reduced, the size of the whole track being estimated closely."""
+    workout = Workout(_ride(), tmp_path / "ride.fit")
+    gpx, report = reduce_gpx(workout, Reduction())
+    assert report.points_before == 400
+    assert report.points_after == gpx.count(b"<trkpt")
+    assert report.bytes_after == len(gpx)
+    assert report.bytes_before == pytest.approx(len(workout.getGPX()), rel=0.02)
+
+
+def test_reduce_gpx_file_kept(tmp_path) -> None:
+    """GPX files are uploaded as they are, keeping their extensions."""
+    path = write_gpx_file(tmp_path / "ride.gpx", count=200)
+    gpx, report = reduce_gpx(GPX(str(path)), Reduction())
+    assert gpx is None
+    assert report.points_before == report.points_after == 200
+    assert report.bytes_before == report.bytes_after == path.stat().st_size
@@ -0,0 +1,133 @@
+"""Tests of the index of the workouts on the server."""
+
+import datetime
+from email.utils import format_datetime
+
+import pytest
+
+from fittrackee_uploader.remoteindex import RemoteIndex, parse_duration
+
+from .conftest import START
+
+# pylint: disable=too-few-public-methods
+
+
+class PagedApi:
+    """
+    Server listing workouts a page at a time.
+
+    Parameters
+    ----------
+    workouts : list[dict]
+        Workouts of the user, newest first.
+    """
+
+    def __init__(self, workouts: list[dict]) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        workouts : list[dict]
+            Workouts of the user, newest first.
+        """
+        self.url = "https://fittrackee.example/"
+        self.user = "me"
+        self.workouts = workouts
+        self.pages = []
+
+    def get_workouts(self, page: int = 1, per_page: int = 100) -> tuple[list[dict], dict]:
+        """
+        Get a page of workouts.
+
+        Parameters
+        ----------
+        page : int
+            Page, starting at 1.
+        per_page : int
+            Workouts per page.
+
+        Returns
+        -------
+        tuple[list[dict], dict]
+            Workouts of the page and the pagination.
+        """
+        self.pages.append(page)
+        workouts = self.workouts[(page - 1) * per_page : page * per_page]
+        return workouts, {"has_next": page * per_page < len(self.workouts), "total": len(self.workouts)}
+
+
+def _workout(number: int, duration: str = "1:00:00", distance: float = 30.0) -> dict:
+    """
+    Make a workout of the server starting ``number`` days after ``START``.
+
+    Parameters
+    ----------
+    number : int
+        Days after ``START``, also the ID.
+    duration : str
+        Duration as the server gives it.
+    distance : float
+        Distance in kilometres.
+
+    Returns
+    -------
+    dict
+        Workout.
+    """
+    start = START + datetime.timedelta(days=number)
+    return {"id": str(number), "workout_date": format_datetime(start), "duration": duration, "distance": distance}
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"), [("1:02:03", 3723.0), ("2 days, 1:00:00", 176400.0), ("", 0.0), (None, 0.0)]
+)
+def test_parse_duration(text: str | None, expected: float) -> None:
+    """Durations of the server are read as seconds."""
+    assert parse_duration(text) == expected
+
+
+def test_sync(tmp_path) -> None:
+    """Every page is read once, then only the new workouts until a known page."""
+    index = RemoteIndex(tmp_path / "index.sqlite")
+    api = PagedApi([_workout(number) for number in range(5, 0, -1)])
+    assert index.sync(api, per_page=2) == 5
+    assert api.pages == [1, 2, 3]
+    api.workouts.insert(0, _workout(6))
+    api.pages.clear()
+    assert index.sync(api, per_page=2) == 1
+    assert api.pages == [1]
+    assert index.count() == 6
+
+
+def test_sync_changes(tmp_path) -> None:
+    """Changed workouts are updated and the deleted ones are removed."""
+    index = RemoteIndex(tmp_path / "index.sqlite")
+    api = PagedApi([_workout(2), _workout(1)])
+    index.sync(api)
+    api.workouts = [_workout(2, distance=42.0)]
+    assert index.sync(api, full=True) == 1
+    assert index.count() == 1
+    assert index.find(START + datetime.timedelta(days=2), 3600, 42.0) == "2"
+
+
+def test_sync_other_user(tmp_path) -> None:
+    """The workouts of another user are forgotten."""
+    index = RemoteIndex(tmp_path / "index.sqlite")
+    api = PagedApi([_workout(1)])
+    index.sync(api)
+    api.user = "other"
+    api.workouts = [_workout(2)]
+    index.sync(api)
+    assert index.find(START + datetime.timedelta(days=1), 3600, 30.0) is None
+
+
+def test_find(tmp_path) -> None:
+    """Workouts are found by their start, duration and distance within the tolerances."""
+    index = RemoteIndex(tmp_path / "index.sqlite")
+    index.sync(PagedApi([_workout(0)]))
+    assert index.find(START + datetime.timedelta(seconds=30), 3630, 30.5) == "0"
+    assert index.find(START, 3600, None) == "0"
+    assert index.find(START + datetime.timedelta(minutes=5), 3600, 30.0) is None
+    assert index.find(START, 7200, 30.0) is None
+    assert index.find(START, 3600, 40.0) is None
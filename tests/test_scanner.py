@@ -0,0 +1,59 @@
+"""Tests of the folder scanner."""
+
+import os
+
+from fittrackee_uploader.workout.scanner import FolderScanner
+
+
+def test_scan(tmp_path) -> None:
+    """Supported files are reported as added, then changed or removed in the following scans."""
+    (tmp_path / "a.gpx").write_text("a")
+    (tmp_path / "b.FIT").write_text("b")
+    (tmp_path / "notes.txt").write_text("c")
+    scanner = FolderScanner([".gpx", ".fit"])
+    changes = scanner.scan(str(tmp_path))
+    assert changes.added == [str(tmp_path / "a.gpx"), str(tmp_path / "b.FIT")]
+    assert not scanner.scan(str(tmp_path))
+    (tmp_path / "a.gpx").write_text("longer")
+    (tmp_path / "b.FIT").unlink()
+    (tmp_path / "c.gpx").write_text("c")
+    changes = scanner.scan(str(tmp_path))
+    assert (changes.added, changes.changed, changes.removed) == (
+        [str(tmp_path / "c.gpx")],
+        [str(tmp_path / "a.gpx")],
+        [str(tmp_path / "b.FIT")],
+    )
+
+
+def test_modification_time(tmp_path) -> None:
+    """A file rewritten with the same size is reported as changed."""
+    path = tmp_path / "a.gpx"
+    path.write_text("a")
+    scanner = FolderScanner([".gpx"])
+    scanner.scan(str(tmp_path))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert scanner.scan(str(tmp_path)).changed == [str(path)]
+
+
+def test_recursive(tmp_path) -> None:
+    """Subfolders are scanned only when recursive, hidden ones never."""
+    (tmp_path / "2024").mkdir()
+    (tmp_path / "2024" / "a.gpx").write_text("a")
+    (tmp_path / ".trash").mkdir()
+    (tmp_path / ".trash" / "b.gpx").write_text("b")
+    assert not FolderScanner([".gpx"]).scan(str(tmp_path))
+    assert FolderScanner([".gpx"], recursive=True).scan(str(tmp_path)).added == [str(tmp_path / "2024" / "a.gpx")]
+
+
+def test_other_folder_and_reset(tmp_path) -> None:
+    """Every file is new when another folder is scanned or after a reset."""
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "a.gpx").write_text("a")
+    scanner = FolderScanner([".gpx"])
+    scanner.scan(str(tmp_path / "one"))
+    assert scanner.scan(str(tmp_path / "two")).added == [str(tmp_path / "two" / "a.gpx")]
+    scanner.reset()
+    assert scanner.scan(str(tmp_path / "two")).added == [str(tmp_path / "two" / "a.gpx")]
+    assert FolderScanner([".gpx"]).scan(str(tmp_path / "missing")).added == []
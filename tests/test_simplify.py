@@ -0,0 +1,157 @@
+"""Tests of the Douglas-Peucker simplification."""
+
+import math
+
+import pytest
+
+from fittrackee_uploader.workout import simplify as simplify_module
+from fittrackee_uploader.workout.geometry import EARTH_RADIUS
+from fittrackee_uploader.workout.simplify import TOLERANCES, importance, select, simplify
+
+#: Metres per degree of latitude.
+SCALE = EARTH_RADIUS * 1000 * math.pi / 180
+
+
+def _wiggly(count: int, seed: int = 1) -> tuple[list[float], list[float]]:
+    """
+    Make a track heading east with irregular bends of a few metres.
+
+    Parameters
+    ----------
+    count : int
+        Number of points.
+    seed : int
+        Changes the bends.
+
+    Returns
+    -------
+    tuple[list[float], list[float]]
+        Latitudes and longitudes.
+    """
+    lat = [47.3 + 20 * math.sin(i * (1.7 + seed)) * math.sin(i * 0.31) / SCALE for i in range(count)]
+    lon = [8.5 + i * 3e-5 for i in range(count)]
+    return lat, lon
+
+
+def _plane(lat: list[float], lon: list[float]) -> list[tuple[float, float]]:
+    """
+    Project a track onto a plane in metres around its first point.
+
+    Parameters
+    ----------
+    lat, lon : list[float]
+        Coordinates of the track.
+
+    Returns
+    -------
+    list[tuple[float, float]]
+        x and y of every point.
+    """
+    cos_lat = math.cos(math.radians(lat[0]))
+    return [((x - lon[0]) * SCALE * cos_lat, (y - lat[0]) * SCALE) for y, x in zip(lat, lon)]
+
+
+def _distance(points: list[tuple[float, float]], i: int, a: int, b: int) -> float:
+    """
+    Distance in metres of a point to the segment between two others.
+
+    Parameters
+    ----------
+    points : list[tuple[float, float]]
+        Track projected by ``_plane``.
+    i : int
+        Point.
+    a, b : int
+        Ends of the segment.
+
+    Returns
+    -------
+    float
+        Distance.
+    """
+    (x, y), (ax, ay), (bx, by) = points[i], points[a], points[b]
+    dx, dy = bx - ax, by - ay
+    t = min(max(((x - ax) * dx + (y - ay) * dy) / (dx * dx + dy * dy), 0.0), 1.0)
+    return math.hypot(x - ax - t * dx, y - ay - t * dy)
+
+
+def _reference(lat: list[float], lon: list[float], tolerance: float) -> list[int]:
+    """
+    Simplify a track with the recursive Douglas-Peucker algorithm.
+
+    Parameters
+    ----------
+    lat, lon : list[float]
+        Coordinates of the track.
+    tolerance : float
+        Tolerance in metres.
+
+    Returns
+    -------
+    list[int]
+        Indices of the points kept.
+    """
+    points = _plane(lat, lon)
+    kept = {0, len(lat) - 1}
+    stack = [(0, len(lat) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = {i: _distance(points, i, start, end) for i in range(start + 1, end)}
+        chosen = max(distances, key=distances.get)
+        if distances[chosen] > tolerance:
+            kept.add(chosen)
+            stack.extend([(start, chosen), (chosen, end)])
+    return sorted(kept)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def implementation(request, monkeypatch) -> str:
+    """Simplify with NumPy, and without as if it was not installed."""
+    if request.param == "python":
+        monkeypatch.setattr(simplify_module, "np", None)
+    return request.param
+
+
+@pytest.mark.usefixtures("implementation")
+@pytest.mark.parametrize("tolerance", TOLERANCES)
+def test_as_recursive(tolerance: float) -> None:
+    """The points kept are those of the recursive algorithm."""
+    lat, lon = _wiggly(500)
+    assert simplify(lat, lon, tolerance) == _reference(lat, lon, tolerance)
+
+
+@pytest.mark.usefixtures("implementation")
+def test_levels() -> None:
+    """Every level keeps the points of the coarser ones, and the dropped points are within its tolerance."""
+    lat, lon = _wiggly(500)
+    weights = importance(lat, lon)
+    levels = [select(weights, tolerance) for tolerance in TOLERANCES]
+    points = _plane(lat, lon)
+    assert len(levels[0]) < len(levels[1]) < len(levels[2]) < len(lat)
+    for coarse, fine in zip(levels, levels[1:]):
+        assert set(coarse) <= set(fine)
+    for tolerance, kept in zip(TOLERANCES, levels):
+        for start, end in zip(kept, kept[1:]):
+            assert all(_distance(points, i, start, end) <= tolerance for i in range(start + 1, end))
+
+
+@pytest.mark.usefixtures("implementation")
+def test_blocks(monkeypatch) -> None:
+    """The ends of the blocks are always kept, a straight line keeps nothing else."""
+    monkeypatch.setattr(simplify_module, "BLOCK_SIZE", 64)
+    lat = [47.3] * 200
+    lon = [8.5 + i * 3e-5 for i in range(200)]
+    assert simplify(lat, lon, 1.0) == [0, 64, 128, 192, 199]
+    assert simplify([], [], 1.0) == []
+    assert simplify([47.3], [8.5], 1.0) == [0]
+
+
+def test_same_without_numpy(monkeypatch) -> None:
+    """Both implementations give the same tolerances."""
+    monkeypatch.setattr(simplify_module, "BLOCK_SIZE", 128)
+    lat, lon = _wiggly(1000, seed=2)
+    expected = list(importance(lat, lon))
+    monkeypatch.setattr(simplify_module, "np", None)
+    assert list(importance(lat, lon)) == pytest.approx(expected)
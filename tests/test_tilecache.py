@@ -0,0 +1,61 @@
+"""Tests of the map tile cache."""
+
+import json
+
+from fittrackee_uploader import tilecache
+from fittrackee_uploader.tilecache import TileCache, tile_range
+
+TILE = b"\x89PNG tile"
+
+
+def test_tile_range() -> None:
+    """The whole world is a single tile at zoom 0, and a bounding box covers the tiles around it."""
+    assert tile_range(-90, -180, 90, 180, 0) == (range(1), range(1))
+    columns, rows = tile_range(47.3, 8.5, 47.4, 8.6, 12)
+    assert list(columns) == [2144, 2145]
+    assert list(rows) == [1433, 1434, 1435]
+
+
+def test_put_lookup(tmp_path) -> None:
+    """Stored tiles are served without network access and counted as hits."""
+    cache = TileCache(tmp_path)
+    assert cache.lookup(12, 1, 2) == (None, False)
+    cache.put(12, 1, 2, TILE)
+    assert cache.isFresh(12, 1, 2)
+    assert cache.lookup(12, 1, 2) == (TILE, True)
+    stats = cache.getStats()
+    assert (stats["tiles"], stats["size"], stats["hits"], stats["misses"]) == (1, len(TILE), 1, 1)
+
+
+def test_evict(tmp_path) -> None:
+    """The least recently used tiles are removed once the cache is full."""
+    cache = TileCache(tmp_path, max_size=2 * len(TILE))
+    for x in range(3):
+        cache.put(12, x, 0, TILE)
+    assert not cache.isFresh(12, 0, 0)
+    assert not (tmp_path / "12" / "0" / "0.png").exists()
+    assert cache.getStats()["tiles"] == 2
+
+
+def test_save_periodically(tmp_path, monkeypatch) -> None:
+    """The index is written every few stored tiles, not only at exit."""
+    monkeypatch.setattr(tilecache, "SAVE_EVERY", 3)
+    cache = TileCache(tmp_path)
+    for x in range(4):
+        cache.put(12, x, 0, TILE)
+    tiles = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))["tiles"]
+    assert sorted(tiles) == ["12/0/0", "12/1/0", "12/2/0"]
+    cache.save()
+    assert TileCache(tmp_path).getStats()["tiles"] == 4
+
+
+def test_rebuild(tmp_path) -> None:
+    """Tiles are indexed from their files when the index is missing or broken."""
+    cache = TileCache(tmp_path)
+    cache.put(12, 1, 2, TILE)
+    cache.put(13, 3, 4, TILE)
+    (tmp_path / "index.json").write_text("{", encoding="utf-8")
+    (tmp_path / "12" / "1" / "notes.png").write_bytes(TILE)
+    cache = TileCache(tmp_path)
+    assert cache.getStats()["tiles"] == 2
+    assert cache.lookup(13, 3, 4) == (TILE, True)
@@ -0,0 +1,97 @@
+"""Tests of the columnar track storage."""
+
+import datetime
+import math
+from array import array
+
+import pytest
+
+from fittrackee_uploader.workout import track as track_module
+from fittrackee_uploader.workout.track import TIMESTAMP_MISSING, Track, TrackBuilder, from_epoch, to_epoch
+
+from .conftest import START
+
+# pylint: disable=redefined-outer-name,no-member
+
+
+@pytest.fixture(params=["numpy", "array"])
+def storage(request, monkeypatch) -> str:
+    """Store the columns as NumPy arrays, and as ``array.array`` as if NumPy was not installed."""
+    if request.param == "array":
+        monkeypatch.setattr(track_module, "np", None)
+    return request.param
+
+
+def _build(count: int = 5) -> Track:
+    """
+    Build a track of points one second apart, the second one without a time and the third without a speed.
+
+    Parameters
+    ----------
+    count : int
+        Number of points.
+
+    Returns
+    -------
+    Track
+        Track.
+    """
+    builder = TrackBuilder()
+    for i in range(count):
+        timestamp = TIMESTAMP_MISSING if i == 1 else to_epoch(START) + i
+        builder.append(timestamp, 47.3 + i * 1e-4, 8.5 + i * 1e-4, 400.0 + i, None if i == 2 else 5.5, heart_rate=140)
+    return builder.build()
+
+
+def test_epoch() -> None:
+    """Timestamps are stored as seconds, naive ones taken as UTC, and missing ones read back as None."""
+    assert from_epoch(to_epoch(START)) == START
+    assert to_epoch(START.replace(tzinfo=None)) == to_epoch(START)
+    assert to_epoch(None) == TIMESTAMP_MISSING
+    assert from_epoch(TIMESTAMP_MISSING) is None
+
+
+def test_build(storage: str) -> None:
+    """Points are read back as the values appended, missing values as None."""
+    track = _build()
+    assert len(track) == 5
+    assert track.getRow(0) == (START, (47.3, 8.5), 400.0, 5.5, 140.0, None, None)
+    assert track.getRow(1)[0] is None
+    assert track.getRow(2)[3] is None
+    assert track.getRow(-1)[0] == START + datetime.timedelta(seconds=4)
+    assert isinstance(track.lat, array) == (storage == "array")
+    assert track.nbytes == 5 * (8 + 8 + 8 + 5 * 4)
+
+
+@pytest.mark.usefixtures("storage")
+def test_missing_columns() -> None:
+    """Missing columns are filled, columns of different lengths are refused."""
+    track = Track({"lat": [47.3, 47.4], "lon": [8.5, 8.6]})
+    assert [track.timestamp[i] for i in range(2)] == [TIMESTAMP_MISSING] * 2
+    assert all(math.isnan(value) for value in track.speed)
+    assert len(Track()) == 0
+    with pytest.raises(ValueError, match="'lon' has 1 values"):
+        Track({"lat": [47.3, 47.4], "lon": [8.5]})
+
+
+@pytest.mark.usefixtures("storage")
+def test_take_and_sort() -> None:
+    """Rows are selected in the order given, and sorted by time only when needed."""
+    track = _build()
+    assert track.take([4, 0]).getPath() == [track.getPath()[4], track.getPath()[0]]
+    sorted_track = track.take([0, 2, 3])
+    assert sorted_track.sortByTime() is sorted_track
+    shuffled = track.take([3, 0, 2])
+    assert [row[0] for row in (shuffled.sortByTime().getRow(i) for i in range(3))] == [
+        START,
+        START + datetime.timedelta(seconds=2),
+        START + datetime.timedelta(seconds=3),
+    ]
+
+
+@pytest.mark.usefixtures("storage")
+def test_columns_round_trip() -> None:
+    """A track rebuilt from its columns holds the same points."""
+    track = _build()
+    copy = Track(track.getColumns())
+    assert [copy.getRow(i) for i in range(len(copy))] == [track.getRow(i) for i in range(len(track))]
@@ -0,0 +1,198 @@
+"""Tests of the zip archives of the batch upload."""
+
+import datetime
+import zipfile
+from email.utils import format_datetime
+
+import pytest
+
+from fittrackee_uploader import zipbatch
+from fittrackee_uploader.workout.gpx import GPX
+from fittrackee_uploader.zipbatch import ZipPacker, find_created, match_workouts, upload_chunk
+
+from .conftest import START, write_gpx_file
+
+
+def _workout(workout_id: str, start: datetime.datetime) -> dict:
+    """
+    Make a workout as listed by the server.
+
+    Parameters
+    ----------
+    workout_id : str
+        Workout ID.
+    start : datetime.datetime
+        Start of the workout.
+
+    Returns
+    -------
+    dict
+        Workout with its ID and date.
+    """
+    return {"id": workout_id, "workout_date": format_datetime(start, usegmt=True)}
+
+
+class ArchiveApi:
+    """
+    FitTrackee API listing the workouts of an archive after a number of looks.
+
+    Parameters
+    ----------
+    workouts : list[dict]
+        Workouts created from the archive.
+    ready : int
+        Number of looks before the workouts are listed.
+    """
+
+    def __init__(self, workouts: list[dict], ready: int = 0) -> None:
+        """
+        Initialise the class.
+
+        Parameters
+        ----------
+        workouts : list[dict]
+            Workouts created from the archive.
+        ready : int
+            Number of looks before the workouts are listed.
+        """
+        self.workouts = workouts
+        self.ready = ready
+        self.requests = []
+        self.archives = []
+
+    def post_archive(self, archive, sport_id: int, equipment_id: str, title: str = "") -> list[dict]:
+        """
+        Accept an archive without listing its workouts.
+
+        Parameters
+        ----------
+        archive : file-like
+            Zip archive.
+        sport_id : int
+            Sport ID.
+        equipment_id : str
+            Equipment ID.
+        title : str
+            Title of the workouts.
+
+        Returns
+        -------
+        list[dict]
+            No workouts.
+        """
+        with zipfile.ZipFile(archive) as zip_file:
+            self.archives.append((zip_file.namelist(), sport_id, equipment_id, title))
+        return []
+
+    def get_workouts(self, page: int = 1, per_page: int = 100, date_from=None, date_to=None) -> tuple[list, dict]:
+        """
+        List a page of workouts, one per page.
+
+        Parameters
+        ----------
+        page : int
+            Page number.
+        per_page : int
+            Workouts per page.
+        date_from : datetime.datetime | None
+            First day.
+        date_to : datetime.datetime | None
+            Last day.
+
+        Returns
+        -------
+        tuple[list, dict]
+            Workouts and pagination.
+        """
+        self.requests.append((page, per_page, date_from, date_to))
+        if page == 1:
+            self.ready -= 1
+        workouts = self.workouts if self.ready < 0 else []
+        return workouts[page - 1 : page], {"has_next": page < len(workouts)}
+
+
+@pytest.mark.parametrize(
+    ("limits", "expected"),
+    [({"file_limit_import": 3}, 3), ({"gpx_limit_import": 4}, 4), ({}, 10), ({"file_limit_import": 0}, 10)],
+)
+def test_limits(limits: dict, expected: int) -> None:
+    """The files per archive are read from the current and the former setting of the server."""
+    assert ZipPacker(limits).max_files == expected
+
+
+def test_pack(tmp_path) -> None:
+    """Archives are closed once they hold as many files as the server accepts."""
+    packer = ZipPacker({"file_limit_import": 2})
+    paths = [str(write_gpx_file(tmp_path / f"ride{i}.gpx", count=20)) for i in range(5)]
+    chunks = [packer.add(path, GPX(path)) for path in paths]
+    chunks.append(packer.flush())
+    chunks = [chunk for chunk in chunks if chunk is not None]
+    assert [chunk.paths for chunk in chunks] == [paths[:2], paths[2:4], paths[4:]]
+    with zipfile.ZipFile(chunks[0].file) as archive:
+        assert archive.namelist() == ["000000.gpx", "000001.gpx"]
+        assert archive.read("000000.gpx") == (tmp_path / "ride0.gpx").read_bytes()
+    assert chunks[0].dates[paths[0]] == START
+
+
+def test_pack_untimed(tmp_path) -> None:
+    """A workout whose points have no time is dated by the workout, and refused when that is unknown too."""
+    path = str(write_gpx_file(tmp_path / "ride.gpx", count=20, timed=False))
+    workout = GPX(path)
+    packer = ZipPacker({})
+    with pytest.raises(ValueError, match="start time"):
+        packer.add(path, workout)
+    workout.date = START
+    packer.add(path, workout)
+    assert packer.flush().dates[path] == START
+
+
+def test_pack_size(tmp_path) -> None:
+    """Files larger than the server accepts are refused, archives stay within the size limit."""
+    path = str(write_gpx_file(tmp_path / "ride.gpx", count=200))
+    size = (tmp_path / "ride.gpx").stat().st_size
+    with pytest.raises(ValueError, match="server accepts"):
+        ZipPacker({"max_single_file_size": size - 1}).add(path, GPX(path))
+    packer = ZipPacker({"max_zip_file_size": 1})
+    assert packer.add(path, GPX(path)) is None
+    assert packer.add(path, GPX(path)) is not None
+
+
+def test_match_workouts() -> None:
+    """Workouts are matched to the files by the closest start within the tolerance."""
+    dates = {"a": START, "b": START + datetime.timedelta(seconds=30), "c": START + datetime.timedelta(hours=1)}
+    workouts = [
+        _workout("w2", START + datetime.timedelta(seconds=31)),
+        _workout("w1", START + datetime.timedelta(seconds=1)),
+    ]
+    assert match_workouts(dates, workouts) == {"a": "w1", "b": "w2", "c": None}
+
+
+def test_find_created(monkeypatch) -> None:
+    """Workouts created in the background are found with one listing of the days of the archive per look."""
+    monkeypatch.setattr(zipbatch, "ARCHIVE_POLL_INTERVAL", 0)
+    dates = {"a": START, "b": START + datetime.timedelta(days=2)}
+    api = ArchiveApi([_workout("w1", dates["a"]), _workout("w2", dates["b"])], ready=2)
+    assert find_created(api, dates, timeout=10) == {"a": "w1", "b": "w2"}
+    assert [request[0] for request in api.requests] == [1, 1, 1, 2]
+    assert {request[2:] for request in api.requests} == {
+        (START - datetime.timedelta(days=1), START + datetime.timedelta(days=3))
+    }
+
+
+def test_find_created_timeout(monkeypatch) -> None:
+    """Workouts not showing up in time are not found."""
+    monkeypatch.setattr(zipbatch, "ARCHIVE_POLL_INTERVAL", 0)
+    api = ArchiveApi([], ready=0)
+    assert find_created(api, {"a": START}, timeout=0) == {"a": None}
+    assert len(api.requests) == 1
+
+
+def test_upload_chunk(tmp_path, monkeypatch) -> None:
+    """An archive accepted without its workouts is looked up on the server."""
+    monkeypatch.setattr(zipbatch, "ARCHIVE_POLL_INTERVAL", 0)
+    path = str(write_gpx_file(tmp_path / "ride.gpx", count=20))
+    packer = ZipPacker({})
+    packer.add(path, GPX(path))
+    api = ArchiveApi([_workout("w1", START)])
+    assert upload_chunk(api, packer.flush(), 1, "", "Ride") == {path: "w1"}
+    assert api.archives == [(["000000.gpx"], 1, "", "Ride")]